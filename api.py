@@ -2,19 +2,79 @@
 Coretax Data Parser API
 FastAPI application untuk parsing invoice PDF Coretax
 """
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import hmac
+import os
+import re
+import time
 import parser as pdf_parser
+import worker_pool
+from archive import InvalidArchive, discard_members, extract_pdf_members
+from cache import content_digest, make_cache_key, result_cache
+from export import EXPORT_FORMATS, ExportUnavailable, export_batch
+from jobs import JobManager, JobQueueFull, JOB_RETRY_AFTER
+from invoice_index import build_duplicate_result, check_identity, decode_filename_identity, invoice_index
+from invoice_store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, invoice_store
+from metrics import metrics, timing_view
+from reports import aggregate_columns, aggregate_results
+from serialization import dumps, format_batch, format_result, json_response, loads, resolve_response_format
+from uploads import (
+    UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_REQUEST_BYTES, InvalidUpload, RequestSizeLimitMiddleware, UploadTooLarge,
+    discard_uploads, read_request_uploads, source_size, upload_request_body
+)
+
+# Token untuk endpoint admin (kosong = endpoint admin nonaktif)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Media type untuk mode streaming /parse-multiple
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Content type format teks Prometheus untuk /metrics
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+# Format tanggal filter GET /invoices
+ISO_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Mode parsing untuk query ?fields=...: fungsi parser yang dipakai per mode
+PARSE_FUNCTIONS = {
+    "all": pdf_parser.parse_pdf_file,
+    "metadata": pdf_parser.parse_pdf_metadata
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Siapkan process pool untuk parsing PDF di background (pdfplumber di-import & warm-up);
+    /health melaporkan "starting" sampai semua worker selesai warm-up.
+    Saat aplikasi berhenti, tutup worker job dan process pool
+    """
+    worker_pool.start_pool_background()
+    job_manager.start()
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        worker_pool.shutdown_pool()
+
 
 # Inisialisasi FastAPI
 app = FastAPI(
     title="Coretax Data Parser API",
     description="API untuk mengekstrak dan memvalidasi data faktur pajak dari PDF Coretax",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Tolak body request di atas UPLOAD_MAX_REQUEST_BYTES sebelum dibaca (413);
+# didaftarkan sebelum CORS agar response 413 tetap mendapat header CORS
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # CORS middleware untuk membolehkan akses dari web client
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +85,300 @@ app.add_middleware(
 )
 
 
+def with_identity_check(result: Dict[str, Any], identity: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    """Tambahkan hasil pencocokan identitas nama file vs metadata PDF (jika keduanya tersedia)"""
+    if not identity or not result.get("metadata"):
+        return result
+    return dict(result, identity_check=check_identity(identity, result["metadata"]))
+
+
+def index_result(
+    result: Dict[str, Any],
+    identity: Optional[Dict[str, str]],
+    fields: str,
+    digest: str
+) -> Dict[str, Any]:
+    """Catat di invoice index: hanya hasil lengkap yang identitas nama file-nya cocok dengan isi PDF"""
+    if (invoice_index is not None and identity and fields == "all"
+            and result["status"] == "success" and result["identity_check"]["matches"]):
+        invoice_index.put(identity, result["filename"], result["metadata"], digest)
+    return result
+
+
+def store_result(result: Dict[str, Any], fields: str) -> Dict[str, Any]:
+    """Simpan hasil parse lengkap yang sukses ke invoice store (GET /invoices)"""
+    if invoice_store is not None and fields == "all":
+        invoice_store.put(result)
+    return result
+
+
+def resolve_parse_fields(fields: Optional[str]) -> str:
+    """Validasi query ?fields=; None berarti parse lengkap ("all")"""
+    fields = fields or "all"
+    if fields not in PARSE_FUNCTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nilai fields tidak valid: '{fields}'. Pilihan: {', '.join(PARSE_FUNCTIONS)}"
+        )
+    return fields
+
+
+def find_known_result(
+    filename: str,
+    content: Any,
+    fields: str
+) -> Tuple[Optional[str], Optional[Dict[str, Any]], str, str, Optional[Dict[str, str]]]:
+    """
+    Cari hasil yang tidak perlu diparse: duplikat di invoice index dulu, lalu cache hasil parse.
+    Blocking (hash isi file spool, SQLite, cache disk), jadi dijalankan di thread pool.
+    Kembalikan (source "index"/"cache" atau None, hasil, key cache, hash isi, identitas nama file).
+    """
+    identity = decode_filename_identity(filename)
+    digest = content_digest(content)
+    if identity and invoice_index is not None:
+        indexed = invoice_index.get(identity, digest)
+        if indexed is not None:
+            return "index", build_duplicate_result(indexed, filename, identity), "", digest, identity
+    
+    key = make_cache_key(digest, "" if fields == "all" else fields)
+    cached = result_cache.get(key)
+    if cached is None:
+        return None, None, key, digest, identity
+    result = with_identity_check(dict(cached, filename=filename), identity)
+    return "cache", index_result(result, identity, fields, digest), key, digest, identity
+
+
+def save_parsed_result(
+    result: Dict[str, Any],
+    key: str,
+    digest: str,
+    identity: Optional[Dict[str, str]],
+    fields: str
+) -> Dict[str, Any]:
+    """Simpan hasil parse baru ke cache, invoice store, dan invoice index (blocking, dijalankan di thread pool)"""
+    result_cache.put(key, result)
+    store_result(result, fields)
+    return index_result(with_identity_check(result, identity), identity, fields, digest)
+
+
+def observe_result(
+    result: Dict[str, Any],
+    source: str,
+    profile: Optional[Dict[str, Any]] = None,
+    debug_timing: bool = False
+) -> Dict[str, Any]:
+    """Catat hasil ke /metrics; dengan debug_timing rincian waktu ditambahkan ke response"""
+    metrics.observe_result(result, source, profile)
+    if debug_timing:
+        result = dict(result, timing=timing_view(source, profile))
+    return result
+
+
+async def iter_parse_contents(
+    files_data: List[tuple],
+    fields: str = "all",
+    debug_timing: bool = False
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Parse list (filename, content) lewat cache hasil parse; file yang belum ada
+    di cache diparse paralel di process pool. Yield (index, hasil) segera setelah
+    masing-masing file selesai (hasil dari index/cache lebih dulu).
+    fields="metadata" memakai fast path metadata-only.
+    
+    Faktur dengan nama file Coretax yang identitas, hash isi, dan versi parser-nya
+    sudah ada di invoice index langsung dikembalikan tanpa parse ulang.
+    
+    Hashing, lookup/simpan cache disk, dan commit SQLite berjalan di thread pool agar
+    batch besar tidak menahan request lain di event loop.
+    """
+    pending = []
+    
+    for idx, (filename, content) in enumerate(files_data):
+        metrics.observe_upload(source_size(content))
+        source, result, key, digest, identity = await run_in_threadpool(find_known_result, filename, content, fields)
+        if result is not None:
+            yield idx, observe_result(result, source, debug_timing=debug_timing)
+        else:
+            pending.append((idx, key, digest, identity, filename, content))
+    
+    if pending:
+        async for pending_idx, (result, profile) in iter_parse_pending(pending, fields):
+            idx, key, digest, identity, filename, _ = pending[pending_idx]
+            result = await run_in_threadpool(save_parsed_result, result, key, digest, identity, fields)
+            yield idx, observe_result(result, "parse", profile, debug_timing)
+
+
+async def parse_page_ranges(
+    content: Any,
+    filename: str,
+    ranges: List[range]
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Parse satu PDF panjang dengan setiap range halaman dikerjakan di worker berbeda, lalu
+    digabung berurutan. Kembalikan (hasil, profile) seperti pdf_parser.profile_parse.
+    """
+    start = time.perf_counter()
+    try:
+        parts = await worker_pool.run_batch_in_pool(
+            pdf_parser.extract_page_range, [(content, pages) for pages in ranges], concurrency=len(ranges)
+        )
+    except Exception as e:
+        return pdf_parser.error_result(filename, e), None
+    result, timings = pdf_parser.merge_page_ranges(filename, parts)
+    return result, {"total": time.perf_counter() - start, "stages": timings, "pages": ranges[-1].stop}
+
+
+async def iter_parse_pending(pending: List[tuple], fields: str) -> AsyncIterator[Tuple[int, Tuple[Dict[str, Any], Any]]]:
+    """
+    Parse file yang tidak ada di cache di process pool, yield (index di pending, (hasil, profile)).
+    Satu PDF panjang (mis. POST /parse) dibagi per range halaman ke semua worker agar
+    latency-nya turun; batch banyak file tetap diparalelkan per file.
+    """
+    await worker_pool.wait_ready()
+    if len(pending) == 1 and fields == "all" and worker_pool.get_pool() is not None:
+        filename, content = pending[0][-2:]
+        ranges = await run_in_threadpool(pdf_parser.split_page_ranges, content, worker_pool.PARSER_WORKERS)
+        if ranges:
+            yield 0, await parse_page_ranges(content, filename, ranges)
+            return
+
+    async for pending_idx, parsed in worker_pool.iter_batch_in_pool(
+        pdf_parser.profile_parse,
+        [(PARSE_FUNCTIONS[fields], content, filename) for *_, filename, content in pending]
+    ):
+        yield pending_idx, parsed
+
+
+def check_pdf_filename(filename: str) -> None:
+    """Tolak file non-PDF sebelum isinya dibaca"""
+    if not filename.lower().endswith('.pdf'):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File '{filename}' bukan PDF. Semua file harus berformat PDF"
+        )
+
+
+async def read_upload_files(
+    request: Request,
+    field_name: str,
+    check_filename: Callable[[str], None] = check_pdf_filename,
+    max_file_bytes: int = UPLOAD_MAX_FILE_BYTES
+) -> List[tuple]:
+    """
+    Baca file di field multipart field_name ke list (filename, source); file besar
+    di-spool ke disk. 413 jika melebihi batas, 400 jika body bukan multipart atau tanpa file.
+    """
+    try:
+        files_data = await read_request_uploads(
+            request, field_name, max_file_bytes=max_file_bytes, check_filename=check_filename
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    except InvalidUpload as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    
+    if not files_data:
+        raise HTTPException(
+            status_code=400,
+            detail="Minimal harus upload 1 file"
+        )
+    return files_data
+
+
+async def parse_contents(
+    files_data: List[tuple],
+    fields: str = "all",
+    debug_timing: bool = False
+) -> List[Dict[str, Any]]:
+    """Seperti iter_parse_contents, tetapi mengembalikan list hasil sesuai urutan input"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(files_data)
+    async for idx, result in iter_parse_contents(files_data, fields, debug_timing):
+        results[idx] = result
+    return results
+
+
+# Antrian job asinkron (POST /jobs); worker memakai pipeline cache + process pool yang sama
+job_manager = JobManager(iter_parse_contents)
+
+
+async def stream_parse_results(
+    files_data: List[tuple],
+    fields: str = "all",
+    debug_timing: bool = False,
+    response_format: str = "full"
+) -> AsyncIterator[bytes]:
+    """
+    Generator NDJSON: satu baris per file (urutan selesai, dengan field "index"),
+    diakhiri satu baris ringkasan batch. Hanya counter yang disimpan, bukan hasil.
+    File spool upload dihapus oleh background task response, bukan oleh generator
+    (generator tidak pernah berjalan jika client putus sebelum stream dimulai).
+    """
+    status_counts = {"success": 0, "error": 0, "duplicate": 0}
+    
+    async for idx, result in iter_parse_contents(files_data, fields, debug_timing):
+        status_counts[result["status"]] = status_counts.get(result["status"], 0) + 1
+        yield dumps(dict(format_result(result, response_format), index=idx)) + b"\n"
+    
+    summary = {
+        "status": "completed",
+        "total_files": len(files_data),
+        "total_success": status_counts["success"],
+        "total_failed": status_counts["error"],
+        "total_duplicate": status_counts["duplicate"]
+    }
+    yield dumps(summary) + b"\n"
+
+
+def resolve_export_format(export: Optional[str]) -> Optional[str]:
+    """Validasi query ?export=; None berarti response JSON biasa"""
+    if export is not None and export not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nilai export tidak valid: '{export}'. Pilihan: {', '.join(EXPORT_FORMATS)}"
+        )
+    return export
+
+
+def export_response(summary: Dict[str, Any], export_format: str, response_format: str = "full") -> Response:
+    """Response file export biner (msgpack, atau ZIP berisi tabel invoices & items)"""
+    try:
+        content = export_batch(summary, export_format, response_format)
+    except ExportUnavailable as e:
+        raise HTTPException(
+            status_code=501,
+            detail=str(e)
+        )
+    extension = "msgpack" if export_format == "msgpack" else f"{export_format}.zip"
+    return Response(
+        content=content,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="coretax-export.{extension}"'}
+    )
+
+
+def verify_admin_token(token: Optional[str]) -> None:
+    """
+    Validasi header X-Admin-Token. Tanpa ADMIN_TOKEN endpoint admin ditolak, karena
+    API terbuka untuk semua origin (CORS "*")
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=503,
+            detail="Endpoint admin nonaktif (ADMIN_TOKEN kosong)"
+        )
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=403,
+            detail="Admin token tidak valid"
+        )
+
+
 @app.get("/")
 async def root():
     """
@@ -36,7 +390,17 @@ async def root():
         "endpoints": {
             "POST /parse": "Parse single PDF file",
             "POST /parse-multiple": "Parse multiple PDF files",
-            "GET /health": "Health check"
+            "POST /parse-archive": "Parse PDF files from a ZIP archive",
+            "GET /health": "Health check",
+            "POST /jobs": "Create async parse job",
+            "GET /jobs/{job_id}": "Async parse job status and result",
+            "GET /invoices": "Search stored invoices",
+            "GET /invoices/{invoice_number}": "Stored invoice with items",
+            "POST /reports/aggregate": "Aggregate report for posted parse results",
+            "GET /reports/aggregate": "Aggregate report for stored invoices",
+            "GET /metrics": "Prometheus metrics",
+            "GET /admin/cache": "Parse cache statistics",
+            "DELETE /admin/cache": "Purge parse cache"
         }
     }
 
@@ -44,91 +408,463 @@ async def root():
 @app.get("/health")
 async def health_check():
     """
-    Health check endpoint
+    Health check endpoint (503 "starting" selama worker parser masih warm-up)
     """
+    if not worker_pool.is_ready():
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "starting",
+                "service": "Coretax Data Parser API"
+            }
+        )
     return {
         "status": "healthy",
         "service": "Coretax Data Parser API"
     }
 
 
-@app.post("/parse")
-async def parse_single_pdf(file: UploadFile = File(...)):
+def check_single_pdf_filename(filename: str) -> None:
+    if not filename.lower().endswith('.pdf'):
+        raise HTTPException(
+            status_code=400,
+            detail="File harus berformat PDF"
+        )
+
+
+@app.post("/parse", openapi_extra=upload_request_body("file"))
+async def parse_single_pdf(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    debug_timing: bool = Query(False),
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept_encoding: Optional[str] = Header(None)
+):
     """
     Parse single PDF file
     
     Args:
-        file: PDF file yang akan diparse
+        request: Body multipart dengan field "file" berisi PDF yang akan diparse
+        fields: "metadata" untuk fast path (hanya metadata, tanpa tabel item)
+        debug_timing: 1 untuk menambahkan rincian waktu per tahap ke response
+        response_format: "compact" (tanpa field *_formatted) atau "columnar" (compact + items per kolom)
+        accept_encoding: Header Accept-Encoding; response besar dikompres gzip/brotli
     
     Returns:
         JSON response dengan data invoice yang sudah diekstrak
     """
-    # Validasi tipe file
-    if not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(
-            status_code=400,
-            detail="File harus berformat PDF"
-        )
+    fields = resolve_parse_fields(fields)
+    response_format = resolve_response_format(response_format)
+    
+    # Baca konten file (validasi tipe file sebelum isinya dibaca; file besar di-spool ke disk)
+    files_data = await read_upload_files(request, "file", check_single_pdf_filename)
     
     try:
-        # Baca konten file
-        content = await file.read()
+        if len(files_data) > 1:
+            raise HTTPException(
+                status_code=400,
+                detail="Endpoint ini hanya menerima 1 file; gunakan /parse-multiple"
+            )
         
-        # Parse PDF
-        result = pdf_parser.parse_pdf_file(content, file.filename)
+        # Parse PDF (cache dulu, lalu process pool agar event loop tidak terblokir)
+        result = (await parse_contents(files_data, fields, debug_timing))[0]
         
-        return JSONResponse(content=result)
+        return await json_response(format_result(result, response_format), accept_encoding)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing file: {str(e)}"
         )
+    finally:
+        discard_uploads(files_data)
 
 
-@app.post("/parse-multiple")
-async def parse_multiple_pdfs(files: List[UploadFile] = File(...)):
+@app.post("/parse-multiple", openapi_extra=upload_request_body("files", multiple=True))
+async def parse_multiple_pdfs(
+    request: Request,
+    accept: Optional[str] = Header(None),
+    fields: Optional[str] = Query(None),
+    debug_timing: bool = Query(False),
+    response_format: Optional[str] = Query(None, alias="format"),
+    export: Optional[str] = Query(None),
+    accept_encoding: Optional[str] = Header(None)
+):
     """
     Parse multiple PDF files sekaligus
     
     Args:
-        files: List of PDF files yang akan diparse
+        request: Body multipart dengan field "files" (boleh berulang) berisi PDF yang akan diparse
+        accept: Header Accept; "application/x-ndjson" mengaktifkan mode streaming
+        fields: "metadata" untuk fast path (hanya metadata, tanpa tabel item)
+        debug_timing: 1 untuk menambahkan rincian waktu per tahap ke hasil tiap file
+        response_format: "compact" (tanpa field *_formatted) atau "columnar" (compact + items per kolom)
+        export: "msgpack", "arrow", atau "parquet" untuk export biner (arrow/parquet: ZIP
+            berisi tabel invoices & items yang berelasi lewat invoice_number)
+        accept_encoding: Header Accept-Encoding; response besar dikompres gzip/brotli (bukan mode streaming)
     
     Returns:
-        JSON response dengan hasil parsing semua file
+        JSON response dengan hasil parsing semua file, atau stream NDJSON
+        (satu baris per file segera setelah selesai + baris ringkasan di akhir),
+        atau file export biner
     """
-    # Validasi minimal 1 file
-    if not files:
+    fields = resolve_parse_fields(fields)
+    response_format = resolve_response_format(response_format)
+    export = resolve_export_format(export)
+    
+    # Baca semua file: minimal 1 file dan semuanya PDF (file besar di-spool ke disk,
+    # 413 jika melebihi batas)
+    files_data = await read_upload_files(request, "files")
+    
+    # Mode streaming: kirim hasil tiap file begitu selesai; file spool dihapus setelah
+    # response selesai atau client putus (juga jika stream belum sempat dimulai)
+    if accept and NDJSON_MEDIA_TYPE in accept and not export:
+        try:
+            return StreamingResponse(
+                stream_parse_results(files_data, fields, debug_timing, response_format),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"X-Accel-Buffering": "no"},  # Matikan buffering nginx agar baris langsung terkirim
+                background=BackgroundTask(discard_uploads, files_data)
+            )
+        except Exception:
+            discard_uploads(files_data)
+            raise
+    
+    try:
+        # Parse semua PDF (cache dulu, sisanya paralel di process pool)
+        results = await parse_contents(files_data, fields, debug_timing)
+        result = pdf_parser.summarize_results(results)
+        
+        if export:
+            return export_response(result, export, response_format)
+        return await json_response(format_batch(result, response_format), accept_encoding)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing files: {str(e)}"
+        )
+    finally:
+        discard_uploads(files_data)
+
+
+def check_archive_filename(filename: str) -> None:
+    if not filename.lower().endswith('.zip'):
         raise HTTPException(
             status_code=400,
-            detail="Minimal harus upload 1 file"
+            detail="File harus berformat ZIP"
         )
+
+
+@app.post("/parse-archive", openapi_extra=upload_request_body("file"))
+async def parse_archive(
+    request: Request,
+    fields: Optional[str] = Query(None),
+    debug_timing: bool = Query(False),
+    response_format: Optional[str] = Query(None, alias="format"),
+    export: Optional[str] = Query(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Parse semua PDF di dalam satu file ZIP
+    
+    Args:
+        request: Body multipart dengan field "file" berisi ZIP PDF faktur (member non-PDF dilewati, dicantumkan di skipped_members)
+        fields, debug_timing, response_format, export: sama dengan /parse-multiple
+        accept_encoding: Header Accept-Encoding; response besar dikompres gzip/brotli
     
-    # Validasi semua file adalah PDF
-    for file in files:
-        if not file.filename.lower().endswith('.pdf'):
+    Returns:
+        JSON response dengan bentuk yang sama dengan /parse-multiple (urutan hasil
+        mengikuti urutan member di ZIP), atau file export biner
+    """
+    fields = resolve_parse_fields(fields)
+    response_format = resolve_response_format(response_format)
+    export = resolve_export_format(export)
+    
+    # ZIP besar di-spool ke disk; batasnya sama dengan ukuran maksimal satu request
+    files_data = await read_upload_files(request, "file", check_archive_filename, UPLOAD_MAX_REQUEST_BYTES)
+    
+    members = None
+    try:
+        if len(files_data) > 1:
             raise HTTPException(
                 status_code=400,
-                detail=f"File '{file.filename}' bukan PDF. Semua file harus berformat PDF"
+                detail="Endpoint ini hanya menerima 1 file ZIP"
+            )
+        archive_source = files_data[0][1]
+        
+        # Dekompresi member ke file spool (blocking I/O) di thread pool
+        try:
+            members, skipped = await run_in_threadpool(extract_pdf_members, archive_source)
+        except InvalidArchive as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
+        except UploadTooLarge as e:
+            raise HTTPException(
+                status_code=413,
+                detail=str(e)
+            )
+        
+        if not members:
+            raise HTTPException(
+                status_code=400,
+                detail="ZIP tidak berisi file PDF"
             )
-    
-    try:
-        # Baca semua file
-        files_data = []
-        for file in files:
-            content = await file.read()
-            files_data.append((file.filename, content))
         
-        # Parse semua PDF
-        result = pdf_parser.parse_multiple_pdfs(files_data)
+        extracted = [member for member in members if member.source is not None]
+        parsed = iter(await parse_contents(
+            [(member.filename, member.source) for member in extracted], fields, debug_timing
+        ))
+        results = [
+            next(parsed) if member.source is not None else pdf_parser.error_result(member.filename, member.error)
+            for member in members
+        ]
+        result = dict(pdf_parser.summarize_results(results), skipped_members=skipped)
         
-        return JSONResponse(content=result)
+        if export:
+            return export_response(result, export, response_format)
+        return await json_response(format_batch(result, response_format), accept_encoding)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing files: {str(e)}"
+            detail=f"Error processing archive: {str(e)}"
+        )
+    finally:
+        discard_members(members)
+        discard_uploads(files_data)
+
+
+@app.post("/jobs", status_code=202, openapi_extra=upload_request_body("files", multiple=True))
+async def create_job(request: Request):
+    """
+    Buat job parsing asinkron untuk satu atau banyak PDF
+    
+    Args:
+        request: Body multipart dengan field "files" (boleh berulang) berisi PDF yang akan diparse
+    
+    Returns:
+        Job id dan status awal; pantau lewat GET /jobs/{job_id}.
+        429 + header Retry-After jika antrian job penuh.
+    """
+    files_data = await read_upload_files(request, "files")
+    
+    try:
+        job = job_manager.submit(files_data)
+    except JobQueueFull:
+        discard_uploads(files_data)
+        raise HTTPException(
+            status_code=429,
+            detail="Antrian job penuh, coba lagi nanti",
+            headers={"Retry-After": str(JOB_RETRY_AFTER)}
+        )
+    
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Status, progress, dan hasil job parsing (format & kompresi sama dengan /parse-multiple)
+    """
+    response_format = resolve_response_format(response_format)
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job '{job_id}' tidak ditemukan"
+        )
+    data = job.to_dict()
+    if "result" in data:
+        data["result"] = format_batch(data["result"], response_format)
+    return await json_response(data, accept_encoding)
+
+
+def require_invoice_store() -> None:
+    if invoice_store is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Invoice store nonaktif (INVOICE_STORE_PATH kosong)"
+        )
+
+
+def validate_iso_date(name: str, value: Optional[str]) -> None:
+    if value is not None and not ISO_DATE_PATTERN.match(value):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nilai {name} tidak valid: '{value}'. Format: YYYY-MM-DD"
+        )
+
+
+@app.get("/invoices")
+async def list_invoices(
+    supplier_npwp: Optional[str] = Query(None),
+    buyer_npwp: Optional[str] = Query(None),
+    invoice_number: Optional[str] = Query(None),
+    item_code: Optional[str] = Query(None),
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Cari faktur yang sudah pernah diparse (ringkasan tanpa items), urut tanggal terbaru
+    
+    Args:
+        supplier_npwp, buyer_npwp, invoice_number, item_code: filter sama persis
+        date_from, date_to: rentang tanggal faktur (YYYY-MM-DD, inklusif)
+        page, page_size: pagination (page_size maksimal MAX_PAGE_SIZE)
+    """
+    require_invoice_store()
+    validate_iso_date("date_from", date_from)
+    validate_iso_date("date_to", date_to)
+    
+    filters = {
+        "supplier_npwp": supplier_npwp,
+        "buyer_npwp": buyer_npwp,
+        "invoice_number": invoice_number,
+        "item_code": item_code,
+        "date_from": date_from,
+        "date_to": date_to
+    }
+    total, invoices = await run_in_threadpool(invoice_store.search, filters, page, page_size)
+    return await json_response({
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": (total + page_size - 1) // page_size,
+        "invoices": invoices
+    }, accept_encoding)
+
+
+@app.get("/invoices/{invoice_number}")
+async def get_invoice(
+    invoice_number: str,
+    supplier_npwp: Optional[str] = Query(None),
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Hasil parse lengkap (metadata, items, validation) untuk satu nomor faktur
+    
+    Args:
+        invoice_number: Nomor seri faktur pajak
+        supplier_npwp: Opsional, jika nomor faktur yang sama ada untuk beberapa supplier
+        response_format: "compact" atau "columnar" seperti /parse
+    """
+    require_invoice_store()
+    response_format = resolve_response_format(response_format)
+    
+    result = await run_in_threadpool(invoice_store.get, invoice_number, supplier_npwp)
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Faktur {invoice_number} tidak ditemukan"
+        )
+    return await json_response(format_result(result, response_format), accept_encoding)
+
+
+@app.post("/reports/aggregate")
+async def aggregate_report(request: Request, accept_encoding: Optional[str] = Header(None)):
+    """
+    Laporan agregat dari hasil parse yang dikirim client
+    
+    Body JSON: response /parse-multiple (field results dipakai) atau list hasil parse.
+    
+    Returns:
+        Total per supplier, per item_code, per bulan, dan rollup validasi
+    """
+    try:
+        content = loads(await request.body())
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Body harus JSON hasil /parse-multiple atau list hasil parse"
+        )
+    
+    results = content.get("results") if isinstance(content, dict) else content
+    if not isinstance(results, list) or not all(isinstance(result, dict) for result in results):
+        raise HTTPException(
+            status_code=400,
+            detail="Body harus JSON hasil /parse-multiple atau list hasil parse"
         )
+    
+    report = await run_in_threadpool(aggregate_results, results)
+    return await json_response(report, accept_encoding)
+
+
+@app.get("/reports/aggregate")
+async def aggregate_stored_report(
+    supplier_npwp: Optional[str] = Query(None),
+    buyer_npwp: Optional[str] = Query(None),
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Laporan agregat dari invoice store (faktur yang sudah pernah diparse)
+    
+    Args:
+        supplier_npwp, buyer_npwp: filter sama persis
+        date_from, date_to: rentang tanggal faktur (YYYY-MM-DD, inklusif)
+    """
+    require_invoice_store()
+    validate_iso_date("date_from", date_from)
+    validate_iso_date("date_to", date_to)
+    
+    filters = {
+        "supplier_npwp": supplier_npwp,
+        "buyer_npwp": buyer_npwp,
+        "date_from": date_from,
+        "date_to": date_to
+    }
+    invoices, items = await run_in_threadpool(invoice_store.report_columns, filters)
+    report = await run_in_threadpool(aggregate_columns, invoices, items)
+    return await json_response(report, accept_encoding)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Metrik parser dalam format teks Prometheus (per proses uvicorn)
+    """
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/admin/cache")
+async def cache_stats(x_admin_token: Optional[str] = Header(None)):
+    """
+    Statistik cache hasil parse (hit/miss, jumlah entry)
+    """
+    verify_admin_token(x_admin_token)
+    return result_cache.stats()
+
+
+@app.delete("/admin/cache")
+async def purge_cache(x_admin_token: Optional[str] = Header(None)):
+    """
+    Kosongkan cache hasil parse (memori dan disk)
+    """
+    verify_admin_token(x_admin_token)
+    # Hapus direktori cache disk di thread agar event loop tidak tertahan
+    purged = await run_in_threadpool(result_cache.purge)
+    return {
+        "status": "purged",
+        "purged_entries": purged
+    }
 
 
 @app.get("/api-info")
@@ -155,7 +891,11 @@ async def api_info():
                 "path": "/parse",
                 "description": "Parse single PDF file",
                 "parameters": {
-                    "file": "PDF file (form-data)"
+                    "file": "PDF file (form-data)",
+                    "fields": "Query opsional 'metadata' untuk fast path (hanya metadata)",
+                    "debug_timing": "Query opsional 1 untuk rincian waktu per tahap (field timing)",
+                    "format": "Query opsional 'compact' (tanpa *_formatted) atau 'columnar' (compact + items per kolom)",
+                    "Accept-Encoding": "Header opsional gzip/br untuk kompresi response besar"
                 },
                 "response": {
                     "status": "success/error",
@@ -175,7 +915,13 @@ async def api_info():
                 "path": "/parse-multiple",
                 "description": "Parse multiple PDF files sekaligus",
                 "parameters": {
-                    "files": "Multiple PDF files (form-data)"
+                    "files": "Multiple PDF files (form-data)",
+                    "Accept": "Header opsional 'application/x-ndjson' untuk streaming hasil per file",
+                    "fields": "Query opsional 'metadata' untuk fast path (hanya metadata)",
+                    "debug_timing": "Query opsional 1 untuk rincian waktu per tahap (field timing)",
+                    "format": "Query opsional 'compact' (tanpa *_formatted) atau 'columnar' (compact + items per kolom)",
+                    "export": "Query opsional 'msgpack', 'arrow', atau 'parquet' (ZIP tabel invoices & items)",
+                    "Accept-Encoding": "Header opsional gzip/br untuk kompresi response besar"
                 },
                 "response": {
                     "status": "completed",
@@ -185,6 +931,94 @@ async def api_info():
                     "results": "array hasil parsing tiap file"
                 }
             },
+            {
+                "method": "POST",
+                "path": "/parse-archive",
+                "description": "Parse semua PDF di dalam satu file ZIP (response sama dengan /parse-multiple)",
+                "parameters": {
+                    "file": "ZIP berisi PDF faktur (form-data)",
+                    "fields": "Query opsional 'metadata' untuk fast path (hanya metadata)",
+                    "debug_timing": "Query opsional 1 untuk rincian waktu per tahap (field timing)",
+                    "format": "Query opsional 'compact' atau 'columnar'",
+                    "export": "Query opsional 'msgpack', 'arrow', atau 'parquet'",
+                    "Accept-Encoding": "Header opsional gzip/br untuk kompresi response besar"
+                },
+                "response": {
+                    "status": "completed",
+                    "total_files": "jumlah PDF di dalam ZIP",
+                    "results": "array hasil parsing tiap PDF (urutan sesuai ZIP)",
+                    "skipped_members": "member non-PDF yang dilewati"
+                }
+            },
+            {
+                "method": "POST",
+                "path": "/jobs",
+                "description": "Buat job parsing asinkron (429 + Retry-After jika antrian penuh)",
+                "parameters": {
+                    "files": "Multiple PDF files (form-data)"
+                },
+                "response": {
+                    "job_id": "id job",
+                    "status": "queued/running/completed/failed",
+                    "progress": "processed_files, total_files, percent"
+                }
+            },
+            {
+                "method": "GET",
+                "path": "/jobs/{job_id}",
+                "description": "Status, progress, dan hasil job (field result sama dengan /parse-multiple)"
+            },
+            {
+                "method": "GET",
+                "path": "/invoices",
+                "description": "Cari faktur yang sudah pernah diparse (ringkasan, urut tanggal terbaru)",
+                "parameters": {
+                    "supplier_npwp, buyer_npwp, invoice_number, item_code": "Query filter opsional",
+                    "date_from, date_to": "Query opsional rentang tanggal faktur (YYYY-MM-DD)",
+                    "page, page_size": f"Pagination (default 1 dan {DEFAULT_PAGE_SIZE}, maksimal {MAX_PAGE_SIZE})"
+                }
+            },
+            {
+                "method": "GET",
+                "path": "/invoices/{invoice_number}",
+                "description": "Hasil parse lengkap (metadata, items, validation) dari invoice store",
+                "parameters": {
+                    "supplier_npwp": "Query opsional jika nomor faktur sama ada di beberapa supplier",
+                    "format": "Query opsional 'compact' atau 'columnar'"
+                }
+            },
+            {
+                "method": "POST",
+                "path": "/reports/aggregate",
+                "description": "Total per supplier, per item_code, per bulan, dan rollup validasi dari hasil parse",
+                "parameters": {
+                    "body": "JSON response /parse-multiple atau list hasil parse"
+                }
+            },
+            {
+                "method": "GET",
+                "path": "/reports/aggregate",
+                "description": "Laporan agregat yang sama dari invoice store",
+                "parameters": {
+                    "supplier_npwp, buyer_npwp": "Query filter opsional",
+                    "date_from, date_to": "Query opsional rentang tanggal faktur (YYYY-MM-DD)"
+                }
+            },
+            {
+                "method": "GET",
+                "path": "/metrics",
+                "description": "Metrik Prometheus: latency per tahap, halaman per PDF, item per faktur, ukuran upload, hasil per status"
+            },
+            {
+                "method": "GET",
+                "path": "/admin/cache",
+                "description": "Statistik cache hasil parse (wajib header X-Admin-Token; nonaktif jika ADMIN_TOKEN kosong)"
+            },
+            {
+                "method": "DELETE",
+                "path": "/admin/cache",
+                "description": "Kosongkan cache hasil parse (wajib header X-Admin-Token; nonaktif jika ADMIN_TOKEN kosong)"
+            },
             {
                 "method": "GET",
                 "path": "/api-info",
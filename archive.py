@@ -0,0 +1,147 @@
+"""
+Archive Upload Module
+Ekstraksi PDF dari ZIP untuk endpoint POST /parse-archive (satu upload berisi ratusan
+faktur, menggantikan ratusan part multipart ke /parse-multiple).
+
+- ZIP yang di-upload sudah di-spool ke disk oleh uploads.read_request_uploads jika besar;
+  member dibaca per chunk (streaming decompress) dan ditulis ke file spool masing-masing,
+  sehingga ZIP maupun isi PDF tidak pernah dimuat utuh ke memori
+- Parser menerima path file spool (sama seperti upload besar biasa)
+- Proteksi zip bomb: batas jumlah member, ukuran per member, total ukuran setelah
+  dekompresi, dan rasio kompresi. Ukuran di header ZIP tidak dipercaya: byte yang
+  benar-benar didekompres ikut dihitung.
+
+Konfigurasi via environment variable:
+- ARCHIVE_MAX_MEMBERS     : maksimal jumlah file PDF dalam satu ZIP (default: 1000)
+- ARCHIVE_MAX_TOTAL_BYTES : maksimal total ukuran PDF setelah dekompresi (default: 500 MB)
+- ARCHIVE_MAX_RATIO       : maksimal rasio ukuran asli / ukuran terkompresi per member (default: 100)
+Ukuran maksimal per member mengikuti UPLOAD_MAX_FILE_BYTES.
+"""
+
+import io
+import os
+import tempfile
+import zipfile
+from typing import Any, List, Optional, Tuple
+
+from uploads import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_FILE_BYTES, UPLOAD_SPOOL_DIR, UploadTooLarge, discard_uploads
+
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "1000"))
+ARCHIVE_MAX_TOTAL_BYTES = int(os.getenv("ARCHIVE_MAX_TOTAL_BYTES", str(500 * 1024 * 1024)))
+ARCHIVE_MAX_RATIO = float(os.getenv("ARCHIVE_MAX_RATIO", "100"))
+
+# Direktori metadata yang ditambahkan macOS Finder ke ZIP
+IGNORED_PREFIXES = ("__MACOSX/",)
+
+
+class InvalidArchive(Exception):
+    """Upload bukan ZIP yang valid"""
+
+
+class ArchiveMember:
+    """Satu PDF dalam ZIP: path file spool, atau error jika member tidak bisa diekstrak"""
+
+    def __init__(self, filename: str, source: Optional[str] = None, error: Optional[Exception] = None):
+        self.filename = filename
+        self.source = source
+        self.error = error
+
+
+def open_archive(source: Any) -> zipfile.ZipFile:
+    """Buka ZIP dari path file spool atau bytes"""
+    try:
+        if isinstance(source, str):
+            return zipfile.ZipFile(source)
+        return zipfile.ZipFile(io.BytesIO(source))
+    except (zipfile.BadZipFile, OSError) as e:
+        raise InvalidArchive(f"File bukan ZIP yang valid: {e}")
+
+
+def check_member_header(info: zipfile.ZipInfo) -> None:
+    """Tolak member yang dari header-nya saja sudah terlihat sebagai zip bomb"""
+    if info.file_size > UPLOAD_MAX_FILE_BYTES:
+        raise UploadTooLarge(f"File '{info.filename}' di dalam ZIP melebihi batas {UPLOAD_MAX_FILE_BYTES} byte")
+    if info.compress_size > 0 and info.file_size / info.compress_size > ARCHIVE_MAX_RATIO:
+        raise UploadTooLarge(f"Rasio kompresi file '{info.filename}' di dalam ZIP melebihi {ARCHIVE_MAX_RATIO:g}")
+
+
+def list_pdf_members(archive: zipfile.ZipFile) -> Tuple[List[zipfile.ZipInfo], List[str]]:
+    """Pisahkan member PDF (urutan sesuai ZIP) dari member lain yang dilewati"""
+    pdf_members = []
+    skipped = []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        if info.filename.startswith(IGNORED_PREFIXES) or not info.filename.lower().endswith(".pdf"):
+            skipped.append(info.filename)
+            continue
+        pdf_members.append(info)
+
+    if len(pdf_members) > ARCHIVE_MAX_MEMBERS:
+        raise UploadTooLarge(f"ZIP berisi {len(pdf_members)} PDF, melebihi batas {ARCHIVE_MAX_MEMBERS}")
+    declared_total = sum(info.file_size for info in pdf_members)
+    if declared_total > ARCHIVE_MAX_TOTAL_BYTES:
+        raise UploadTooLarge(f"Total ukuran PDF di dalam ZIP melebihi batas {ARCHIVE_MAX_TOTAL_BYTES} byte")
+    for info in pdf_members:
+        check_member_header(info)
+    return pdf_members, skipped
+
+
+def spool_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, budget: int) -> Tuple[str, int]:
+    """
+    Dekompres satu member per chunk ke file spool. Lempar UploadTooLarge jika byte
+    hasil dekompresi melebihi ukuran di header, batas per file, atau sisa budget total.
+    """
+    limit = min(info.file_size, UPLOAD_MAX_FILE_BYTES, budget)
+    spool = tempfile.NamedTemporaryFile(
+        dir=UPLOAD_SPOOL_DIR or None, prefix="coretax-archive-", suffix=".pdf", delete=False
+    )
+    size = 0
+    try:
+        with spool, archive.open(info) as member:
+            while True:
+                chunk = member.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(f"Isi file '{info.filename}' di dalam ZIP melebihi ukuran yang diizinkan")
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name, size
+
+
+def extract_pdf_members(source: Any) -> Tuple[List[ArchiveMember], List[str]]:
+    """
+    Ekstrak semua PDF dari ZIP ke file spool. Kembalikan (members, nama member non-PDF yang dilewati).
+    Member terenkripsi/rusak menjadi ArchiveMember dengan error; zip bomb melempar UploadTooLarge.
+    File spool milik member dihapus pemanggil lewat discard_members.
+    """
+    members: List[ArchiveMember] = []
+    with open_archive(source) as archive:
+        pdf_members, skipped = list_pdf_members(archive)
+        budget = ARCHIVE_MAX_TOTAL_BYTES
+
+        try:
+            for info in pdf_members:
+                filename = os.path.basename(info.filename)
+                try:
+                    path, size = spool_member(archive, info, budget)
+                except (RuntimeError, zipfile.BadZipFile, NotImplementedError, EOFError) as e:
+                    # RuntimeError: member terenkripsi; BadZipFile: CRC salah; NotImplementedError: metode kompresi
+                    members.append(ArchiveMember(filename, error=e))
+                    continue
+                budget -= size
+                members.append(ArchiveMember(filename, source=path))
+        except BaseException:
+            discard_members(members)
+            raise
+
+    return members, skipped
+
+
+def discard_members(members: Optional[List[ArchiveMember]]) -> None:
+    """Hapus file spool hasil ekstraksi"""
+    discard_uploads([(member.filename, member.source) for member in members or [] if member.source])
@@ -0,0 +1,430 @@
+"""
+Benchmark Parser Coretax
+Menjalankan parse_pdf_file atas korpus sample_pdf/ dan melaporkan waktu per file,
+agregat (wall, CPU, p50/p95/p99, files/sec, peak RSS) serta rincian per tahap
+(open, layout, text, table, items, metadata).
+
+Hasil disimpan sebagai baseline JSON; run berikutnya dibandingkan dengan baseline
+dan exit code 1 jika lebih lambat melebihi threshold.
+
+--startup mengukur waktu start di proses baru (import parser & api, parse pertama vs
+parse berikutnya, dan waktu sampai server.py menjawab /health 200) dengan baseline
+terpisah, agar regresi waktu import ikut tertangkap.
+
+Contoh:
+    python benchmark.py --save-baseline
+    python benchmark.py --repeat 3 --threshold 0.10
+    python benchmark.py sample_pdf/InputTaxInvoice-xxx.pdf --backend pdfium --crop
+    python benchmark.py --metadata-scan --lines 500
+    python benchmark.py --startup --repeat 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from tabulate import tabulate
+
+import parser as pdf_parser
+from main import collect_pdf_paths
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BASE_DIR, "sample_pdf")
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_STARTUP_BASELINE = "benchmark_startup_baseline.json"
+
+# Metrik agregat yang dibandingkan dengan baseline (semakin kecil semakin baik)
+REGRESSION_METRICS = ("wall_total", "cpu_total", "p50", "p95")
+STARTUP_METRICS = ("import_parser", "import_api", "first_parse", "time_to_ready")
+
+# Script yang dijalankan di interpreter baru untuk --startup (mencetak JSON durasi dalam detik)
+STARTUP_PARSER_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import parser as pdf_parser
+import worker_pool
+imported = time.perf_counter()
+with open(worker_pool.WARMUP_SAMPLE_PDF, "rb") as f:
+    content = f.read()
+pdf_parser.parse_pdf_file(content, "warmup_sample.pdf")
+first = time.perf_counter()
+pdf_parser.parse_pdf_file(content, "warmup_sample.pdf")
+print(json.dumps({"import_parser": imported - start, "first_parse": first - imported,
+                  "warm_parse": time.perf_counter() - first}))
+"""
+STARTUP_API_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import api
+print(json.dumps({"import_api": time.perf_counter() - start}))
+"""
+
+# Store persisten dinonaktifkan agar benchmark startup tidak menulis file database
+STARTUP_ENV = {"INVOICE_INDEX_PATH": "", "INVOICE_STORE_PATH": "", "PARSER_LAYOUT_TEMPLATES_PATH": ""}
+
+# Baris item sintetis untuk mensimulasikan faktur dengan ratusan baris
+SYNTHETIC_ITEM_LINE = "{no} 000000 BARANG CONTOH {no} Rp 155.540,54 x 150,00 Lainnya 23.331.081,00\n"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Persentil dengan interpolasi linear (sama dengan numpy.percentile default)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS proses ini dalam MB (ru_maxrss: KB di Linux, byte di macOS)"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return maxrss / (1024 * 1024)
+    return maxrss / 1024
+
+
+def benchmark_file(path: str) -> Dict[str, Any]:
+    """Parse satu file dan ukur wall time, CPU time, serta waktu per tahap"""
+    with open(path, "rb") as f:
+        content = f.read()
+
+    with pdf_parser.collect_stage_timings() as stages:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        # Tanpa template layout supplier agar jalur parse & waktu tidak bergantung pada run sebelumnya
+        result = pdf_parser.parse_pdf_file(content, os.path.basename(path), use_templates=False)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+    return {
+        "filename": os.path.basename(path),
+        "size_bytes": len(content),
+        "status": result["status"],
+        "total_items": result.get("total_items", 0),
+        "wall": wall,
+        "cpu": cpu,
+        "stages": dict(stages)
+    }
+
+
+def run_benchmark(pdf_paths: List[str], repeat: int = 1, warmup: int = 1) -> Dict[str, Any]:
+    """
+    Jalankan benchmark atas semua file. Warm-up tidak diukur (import & cache pdfminer);
+    dengan repeat > 1, waktu per file diambil dari run tercepat untuk mengurangi noise.
+    """
+    for path in pdf_paths[:warmup]:
+        benchmark_file(path)
+
+    best: Dict[str, Dict[str, Any]] = {}
+    for _ in range(max(1, repeat)):
+        for path in pdf_paths:
+            run = benchmark_file(path)
+            if path not in best or run["wall"] < best[path]["wall"]:
+                best[path] = run
+
+    files = [best[path] for path in pdf_paths]
+    walls = [f["wall"] for f in files]
+    wall_total = sum(walls)
+
+    stage_totals: Dict[str, float] = {}
+    for f in files:
+        for name, seconds in f["stages"].items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+
+    return {
+        "environment": {
+            "parser_version": pdf_parser.PARSER_VERSION,
+            "backend": pdf_parser.PARSER_BACKEND,
+            "crop_regions": pdf_parser.CROP_REGIONS,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat
+        },
+        "aggregate": {
+            "files": len(files),
+            "errors": sum(1 for f in files if f["status"] != "success"),
+            "wall_total": wall_total,
+            "cpu_total": sum(f["cpu"] for f in files),
+            "p50": percentile(walls, 50),
+            "p95": percentile(walls, 95),
+            "p99": percentile(walls, 99),
+            "files_per_sec": len(files) / wall_total if wall_total else 0.0,
+            "peak_rss_mb": peak_rss_mb()
+        },
+        "stages": stage_totals,
+        "files": files
+    }
+
+
+def time_call(func: Any, text: str, repeat: int) -> float:
+    """Waktu rata-rata (detik) satu panggilan func(text)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmark_metadata_scan(pdf_paths: List[str], extra_lines: int, repeat: int) -> List[List[Any]]:
+    """
+    Bandingkan scanner metadata satu kali jalan dengan implementasi regex referensi,
+    untuk teks asli dan teks yang ditambah `extra_lines` baris item (faktur panjang).
+    """
+    texts = []
+    for path in pdf_paths:
+        with open(path, "rb") as f:
+            texts.append("".join(text + "\n" for text in pdf_parser.get_backend().iter_page_texts(f)))
+
+    variants = [("asli", texts)]
+    if extra_lines:
+        # Baris item disisipkan sebelum section pembeli dan ditambahkan di akhir dokumen
+        items = "".join(SYNTHETIC_ITEM_LINE.format(no=no) for no in range(1, extra_lines + 1))
+        variants.append((f"+{extra_lines} baris", [
+            text.replace("Pembeli Barang Kena Pajak", items + "Pembeli Barang Kena Pajak", 1) + items
+            for text in texts
+        ]))
+
+    rows = []
+    for label, variant_texts in variants:
+        mismatches = sum(
+            1 for text in variant_texts
+            if pdf_parser.extract_invoice_metadata(text) != pdf_parser.extract_invoice_metadata_regex(text)
+        )
+        regex_time = sum(time_call(pdf_parser.extract_invoice_metadata_regex, text, repeat) for text in variant_texts)
+        scan_time = sum(time_call(pdf_parser.extract_invoice_metadata, text, repeat) for text in variant_texts)
+        avg_lines = sum(text.count("\n") for text in variant_texts) / len(variant_texts)
+        rows.append([
+            label,
+            f"{avg_lines:.0f}",
+            f"{regex_time / len(variant_texts) * 1e6:.1f}",
+            f"{scan_time / len(variant_texts) * 1e6:.1f}",
+            f"{regex_time / scan_time:.2f}x" if scan_time else "-",
+            mismatches
+        ])
+    return rows
+
+
+def startup_env() -> Dict[str, str]:
+    env = dict(os.environ, **STARTUP_ENV)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BASE_DIR, env.get("PYTHONPATH")]))
+    return env
+
+
+def run_startup_script(script: str) -> Dict[str, float]:
+    """Jalankan script pengukuran di interpreter baru dan baca hasil JSON-nya"""
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=BASE_DIR, env=startup_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(workers: int, timeout: float = 120.0) -> float:
+    """Detik dari start server.py sampai /health menjawab 200 (semua worker parser selesai warm-up)"""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, "server.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers)],
+        cwd=BASE_DIR, env=startup_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server.py berhenti dengan exit code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError(f"/health tidak siap dalam {timeout:.0f} detik")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_startup_benchmark(repeat: int = 1, workers: int = 1) -> Dict[str, Any]:
+    """Ukur waktu start di proses baru; dengan repeat > 1 diambil nilai tercepat per metrik"""
+    best: Dict[str, float] = {}
+    for _ in range(max(1, repeat)):
+        run = run_startup_script(STARTUP_PARSER_SCRIPT)
+        run.update(run_startup_script(STARTUP_API_SCRIPT))
+        run["time_to_ready"] = time_to_ready(workers)
+        for metric, seconds in run.items():
+            best[metric] = min(seconds, best.get(metric, seconds))
+
+    return {
+        "environment": {
+            "parser_version": pdf_parser.PARSER_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "server_workers": workers,
+            "parser_workers": os.getenv("PARSER_WORKERS", str(os.cpu_count() or 1)),
+            "repeat": repeat
+        },
+        "aggregate": best
+    }
+
+
+def compare_with_baseline(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    metrics: Tuple[str, ...] = REGRESSION_METRICS
+) -> List[Dict[str, Any]]:
+    """Bandingkan metrik agregat dengan baseline, kembalikan list perbandingan per metrik"""
+    comparisons = []
+    for metric in metrics:
+        old = baseline.get("aggregate", {}).get(metric)
+        new = report["aggregate"][metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        comparisons.append({
+            "metric": metric,
+            "baseline": old,
+            "current": new,
+            "change": change,
+            "regressed": change > threshold
+        })
+    return comparisons
+
+
+def print_report(report: Dict[str, Any], show_files: bool = False) -> None:
+    """Cetak hasil benchmark dalam bentuk tabel"""
+    if show_files:
+        rows = [
+            [f["filename"][:60], f["status"], f["total_items"], f"{f['wall'] * 1000:.1f}", f"{f['cpu'] * 1000:.1f}"]
+            for f in report["files"]
+        ]
+        print(tabulate(rows, headers=["File", "Status", "Items", "Wall (ms)", "CPU (ms)"], tablefmt="simple"))
+        print()
+
+    agg = report["aggregate"]
+    print(tabulate([
+        ["Files", agg["files"]],
+        ["Errors", agg["errors"]],
+        ["Wall total (s)", f"{agg['wall_total']:.3f}"],
+        ["CPU total (s)", f"{agg['cpu_total']:.3f}"],
+        ["p50 (ms)", f"{agg['p50'] * 1000:.1f}"],
+        ["p95 (ms)", f"{agg['p95'] * 1000:.1f}"],
+        ["p99 (ms)", f"{agg['p99'] * 1000:.1f}"],
+        ["Files/sec", f"{agg['files_per_sec']:.2f}"],
+        ["Peak RSS (MB)", f"{agg['peak_rss_mb']:.1f}"]
+    ], headers=["Metrik", "Nilai"], tablefmt="simple"))
+    print()
+
+    total = agg["wall_total"] or 1.0
+    print(tabulate(
+        [[name, f"{seconds:.3f}", f"{100.0 * seconds / total:.1f}%"]
+         for name, seconds in sorted(report["stages"].items(), key=lambda item: -item[1])],
+        headers=["Tahap", "Total (s)", "% wall"],
+        tablefmt="simple"
+    ))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Benchmark parser Faktur Pajak Coretax")
+    arg_parser.add_argument("paths", nargs="*", default=[DEFAULT_CORPUS], help="File PDF atau direktori (default: sample_pdf/)")
+    arg_parser.add_argument("--repeat", type=int, default=1, help="Jumlah pengulangan, diambil waktu tercepat per file")
+    arg_parser.add_argument("--warmup", type=int, default=1, help="Jumlah file warm-up yang tidak diukur")
+    arg_parser.add_argument("--backend", choices=sorted(pdf_parser.BACKENDS), help="Backend ekstraksi (default: PARSER_BACKEND)")
+    arg_parser.add_argument("--crop", action="store_true", help="Aktifkan mode crop region")
+    arg_parser.add_argument("--output", help="Simpan laporan lengkap ke file JSON")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="File baseline JSON untuk perbandingan")
+    arg_parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil run ini sebagai baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.10, help="Batas regresi relatif (default: 0.10 = 10%%)")
+    arg_parser.add_argument("--files", action="store_true", help="Tampilkan waktu per file")
+    arg_parser.add_argument("--metadata-scan", action="store_true", help="Benchmark scanner metadata vs regex referensi")
+    arg_parser.add_argument("--lines", type=int, default=500, help="Baris item tambahan untuk --metadata-scan")
+    arg_parser.add_argument("--startup", action="store_true",
+                            help=f"Benchmark waktu start (import, parse pertama, /health siap); baseline: {DEFAULT_STARTUP_BASELINE}")
+    arg_parser.add_argument("--server-workers", type=int, default=1, help="Jumlah worker server.py untuk --startup")
+    args = arg_parser.parse_args(argv)
+
+    if args.startup:
+        if args.baseline == DEFAULT_BASELINE:
+            args.baseline = DEFAULT_STARTUP_BASELINE
+        report = run_startup_benchmark(repeat=args.repeat, workers=args.server_workers)
+        print(tabulate(
+            [[metric, f"{seconds * 1000:.1f}"] for metric, seconds in report["aggregate"].items()],
+            headers=["Metrik", "Waktu (ms)"],
+            tablefmt="simple"
+        ))
+        return finish_report(report, args, STARTUP_METRICS)
+
+    if args.backend:
+        pdf_parser.PARSER_BACKEND = args.backend
+    if args.crop:
+        pdf_parser.CROP_REGIONS = True
+
+    pdf_paths = collect_pdf_paths(args.paths)
+    if not pdf_paths:
+        print("Tidak ada file PDF yang ditemukan", file=sys.stderr)
+        return 2
+
+    if args.metadata_scan:
+        rows = benchmark_metadata_scan(pdf_paths, args.lines, max(1, args.repeat) * 20)
+        print(tabulate(rows, headers=["Teks", "Baris", "Regex (us)", "Scanner (us)", "Speedup", "Beda"], tablefmt="simple"))
+        return 1 if any(row[-1] for row in rows) else 0
+
+    report = run_benchmark(pdf_paths, repeat=args.repeat, warmup=args.warmup)
+    print_report(report, show_files=args.files)
+    return finish_report(report, args, REGRESSION_METRICS)
+
+
+def finish_report(report: Dict[str, Any], args: argparse.Namespace, metrics: Tuple[str, ...]) -> int:
+    """Simpan laporan/baseline sesuai argumen lalu bandingkan dengan baseline (exit code 1 jika regresi)"""
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline disimpan ke {args.baseline}")
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    comparisons = compare_with_baseline(report, baseline, args.threshold, metrics)
+    print()
+    print(tabulate(
+        [[c["metric"], f"{c['baseline']:.4f}", f"{c['current']:.4f}", f"{c['change'] * 100:+.1f}%", "REGRESI" if c["regressed"] else "OK"]
+         for c in comparisons],
+        headers=["Metrik", "Baseline", "Sekarang", "Perubahan", "Status"],
+        tablefmt="simple"
+    ))
+
+    if any(c["regressed"] for c in comparisons):
+        print(f"\nRegresi performa melebihi threshold {args.threshold * 100:.0f}%", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
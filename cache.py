@@ -0,0 +1,161 @@
+"""
+Parse Result Cache Module
+Cache hasil parsing berdasarkan SHA-256 isi PDF + versi parser.
+- Tier 1: LRU in-memory (per proses uvicorn)
+- Tier 2: direktori disk opsional yang bisa dipakai bersama semua worker uvicorn
+
+Konfigurasi via environment variable:
+- PARSE_CACHE_SIZE : jumlah maksimal entry di memori (default: 256, 0 = nonaktif)
+- PARSE_CACHE_DIR  : direktori cache disk (default: kosong = tanpa disk tier)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+from parser import PARSER_VERSION
+
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "256"))
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "")
+
+
+# Ukuran chunk saat menghitung hash file spool di disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_digest(file_content: Union[bytes, str]) -> str:
+    """
+    SHA-256 isi file PDF (dipakai untuk key cache dan pencocokan invoice index).
+    file_content berupa str dianggap path file spool dan di-hash per chunk.
+    """
+    digest = hashlib.sha256()
+    if isinstance(file_content, str):
+        with open(file_content, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        digest.update(file_content)
+    return digest.hexdigest()
+
+
+def make_cache_key(file_digest: str, variant: str = "") -> str:
+    """
+    Key cache: SHA-256 dari versi parser + hash isi file (content_digest).
+    variant membedakan mode parsing lain (misalnya "metadata") untuk file yang sama.
+    """
+    digest = hashlib.sha256(PARSER_VERSION.encode("utf-8"))
+    if variant:
+        digest.update(b"\0" + variant.encode("utf-8"))
+    digest.update(b"\0" + file_digest.encode("ascii"))
+    return digest.hexdigest()
+
+
+class ParseResultCache:
+    """Cache hasil parse dengan LRU in-memory dan disk tier opsional"""
+
+    def __init__(self, max_entries: int = PARSE_CACHE_SIZE, cache_dir: str = PARSE_CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        """Simpan ke LRU memori dan buang entry paling lama jika melebihi batas"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Ambil hasil dari cache (memori dulu, lalu disk), None jika tidak ada"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = None
+
+            if result is not None:
+                with self._lock:
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Simpan hasil parse yang sukses ke memori dan disk"""
+        if result.get("status") != "success":
+            return
+
+        with self._lock:
+            self._remember(key, result)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Tulis ke file sementara lalu rename agar worker lain tidak membaca file setengah jadi
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+
+    def purge(self) -> int:
+        """Kosongkan cache memori dan disk, kembalikan jumlah entry memori yang dibuang"""
+        with self._lock:
+            purged = len(self._entries)
+            self._entries.clear()
+
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistik hit/miss cache"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "parser_version": PARSER_VERSION,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_dir": self.cache_dir,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Instance global yang dipakai api.py
+result_cache = ParseResultCache()
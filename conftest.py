@@ -0,0 +1,59 @@
+"""
+Konfigurasi pytest
+Konfigurasi aplikasi dibaca dari environment saat modul di-import, jadi environment
+test diset di sini sebelum test mana pun meng-import api.py:
+- Parse di thread pool bawaan (tanpa process pool), tanpa cache disk
+- Invoice index & template layout nonaktif; invoice store dan spool upload di direktori sementara
+- Batas spool & upload kecil agar jalur spool dan 413 bisa dites tanpa file puluhan MB
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PDF_DIR = os.path.join(BASE_DIR, "sample_pdf")
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="coretax-test-")
+
+TEST_SPOOL_THRESHOLD = 256 * 1024
+TEST_MAX_FILE_BYTES = 1024 * 1024
+TEST_MAX_REQUEST_BYTES = 3 * 1024 * 1024
+
+os.environ.update({
+    "PARSER_WORKERS": "0",
+    "PARSE_CACHE_DIR": "",
+    "INVOICE_INDEX_PATH": "",
+    "INVOICE_STORE_PATH": os.path.join(TEST_DATA_DIR, "invoice_store.db"),
+    "PARSER_LAYOUT_TEMPLATES_PATH": "",
+    "UPLOAD_SPOOL_DIR": TEST_DATA_DIR,
+    "UPLOAD_SPOOL_THRESHOLD": str(TEST_SPOOL_THRESHOLD),
+    "UPLOAD_MAX_FILE_BYTES": str(TEST_MAX_FILE_BYTES),
+    "UPLOAD_MAX_REQUEST_BYTES": str(TEST_MAX_REQUEST_BYTES),
+})
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def sample_pdfs():
+    """Path semua PDF di sample_pdf/ (urut nama)"""
+    return sorted(
+        os.path.join(SAMPLE_PDF_DIR, name) for name in os.listdir(SAMPLE_PDF_DIR) if name.lower().endswith(".pdf")
+    )
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient untuk satu sesi test (startup/shutdown aplikasi dijalankan sekali, warm-up ditunggu)"""
+    from fastapi.testclient import TestClient
+
+    import api
+    import worker_pool
+
+    with TestClient(api.app) as test_client:
+        test_client.portal.call(worker_pool.wait_ready)
+        yield test_client
@@ -0,0 +1,177 @@
+"""
+Bulk Export Module
+Export hasil parse batch ke format biner untuk consumer besar (rekonsiliasi keuangan):
+- msgpack : struktur sama dengan JSON /parse-multiple, di-encode MessagePack
+- arrow   : dua tabel datar (invoices & items) dalam Arrow IPC file format
+- parquet : dua tabel datar yang sama dalam format Parquet
+
+Tabel items berelasi ke invoices lewat kolom invoice_number (dan filename, untuk hasil
+tanpa nomor faktur). Untuk response HTTP kedua tabel dibungkus dalam satu ZIP.
+
+Package msgpack dan pyarrow opsional; ExportUnavailable dilempar jika belum terinstall.
+Dipakai oleh api.py (?export=) dan main.py (--format msgpack/arrow/parquet).
+"""
+
+import io
+import os
+import zipfile
+from typing import Any, Dict, List, Tuple
+
+from serialization import format_batch
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Format export -> media type response HTTP
+EXPORT_FORMATS = {
+    "msgpack": "application/msgpack",
+    "arrow": "application/zip",
+    "parquet": "application/zip"
+}
+
+# Ekstensi file tabel per format
+TABLE_EXTENSIONS = {"arrow": "arrow", "parquet": "parquet"}
+
+# Kolom tabel datar: (nama kolom, tipe Arrow)
+INVOICE_COLUMNS = (
+    ("filename", "string"),
+    ("status", "string"),
+    ("invoice_number", "string"),
+    ("invoice_date", "string"),
+    ("supplier_name", "string"),
+    ("supplier_npwp", "string"),
+    ("buyer_name", "string"),
+    ("buyer_npwp", "string"),
+    ("total_items", "int64"),
+    ("calculated_total", "float64"),
+    ("pdf_total", "float64"),
+    ("difference", "float64"),
+    ("is_valid", "bool_"),
+    ("error", "string"),
+)
+ITEM_COLUMNS = (
+    ("invoice_number", "string"),
+    ("filename", "string"),
+    ("no", "string"),
+    ("item_code", "string"),
+    ("nama_barang", "string"),
+    ("quantity", "float64"),
+    ("unit", "string"),
+    ("unit_price", "float64"),
+    ("discount", "float64"),
+    ("total", "float64"),
+)
+
+METADATA_FIELDS = ("invoice_number", "invoice_date", "supplier_name", "supplier_npwp", "buyer_name", "buyer_npwp")
+VALIDATION_FIELDS = ("calculated_total", "pdf_total", "difference", "is_valid")
+
+
+class ExportUnavailable(Exception):
+    """Package untuk format export belum terinstall"""
+
+
+def flatten_results(results: List[Dict[str, Any]]) -> Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]:
+    """Ubah list hasil parse menjadi dua tabel kolom: invoices dan items"""
+    invoices: Dict[str, List[Any]] = {name: [] for name, _ in INVOICE_COLUMNS}
+    items: Dict[str, List[Any]] = {name: [] for name, _ in ITEM_COLUMNS}
+
+    for result in results:
+        metadata = result.get("metadata") or {}
+        validation = result.get("validation") or {}
+
+        invoices["filename"].append(result.get("filename"))
+        invoices["status"].append(result.get("status"))
+        for field in METADATA_FIELDS:
+            invoices[field].append(metadata.get(field))
+        invoices["total_items"].append(result.get("total_items"))
+        for field in VALIDATION_FIELDS:
+            invoices[field].append(validation.get(field))
+        invoices["error"].append(result.get("error"))
+
+        for item in result.get("items") or []:
+            items["invoice_number"].append(metadata.get("invoice_number"))
+            items["filename"].append(result.get("filename"))
+            for name, _ in ITEM_COLUMNS[2:]:
+                items[name].append(item.get(name))
+
+    return invoices, items
+
+
+def check_export_format(export_format: str) -> None:
+    """Lempar ExportUnavailable jika package untuk format export belum terinstall"""
+    if export_format == "msgpack" and msgpack is None:
+        raise ExportUnavailable("Format msgpack membutuhkan package 'msgpack' (pip install msgpack)")
+    if export_format in TABLE_EXTENSIONS and pa is None:
+        raise ExportUnavailable("Format arrow/parquet membutuhkan package 'pyarrow' (pip install pyarrow)")
+
+
+def export_msgpack(content: Any) -> bytes:
+    """Encode hasil (struktur sama dengan JSON) ke MessagePack"""
+    check_export_format("msgpack")
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def build_arrow_tables(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Bangun tabel Arrow invoices & items dengan schema tetap"""
+    check_export_format("arrow")
+
+    invoices, items = flatten_results(results)
+    tables = {}
+    for name, columns, data in (("invoices", INVOICE_COLUMNS, invoices), ("items", ITEM_COLUMNS, items)):
+        schema = pa.schema([(column, getattr(pa, type_name)()) for column, type_name in columns])
+        tables[name] = pa.table(data, schema=schema)
+    return tables
+
+
+def serialize_table(table: Any, export_format: str) -> bytes:
+    """Serialisasi satu tabel Arrow ke Arrow IPC file atau Parquet"""
+    sink = io.BytesIO()
+    if export_format == "parquet":
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def export_tables_zip(results: List[Dict[str, Any]], export_format: str) -> bytes:
+    """ZIP berisi invoices.<ext> dan items.<ext> (tanpa kompresi ZIP, format tabel sudah ringkas)"""
+    tables = build_arrow_tables(results)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, table in tables.items():
+            archive.writestr(f"{name}.{TABLE_EXTENSIONS[export_format]}", serialize_table(table, export_format))
+    return buffer.getvalue()
+
+
+def write_tables(results: List[Dict[str, Any]], export_format: str, output_dir: str) -> List[str]:
+    """Tulis invoices.<ext> dan items.<ext> ke direktori (dipakai main.py), kembalikan path file"""
+    tables = build_arrow_tables(results)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        path = os.path.join(output_dir, f"{name}.{TABLE_EXTENSIONS[export_format]}")
+        with open(path, "wb") as f:
+            f.write(serialize_table(table, export_format))
+        paths.append(path)
+    return paths
+
+
+def export_batch(summary: Dict[str, Any], export_format: str, response_format: str = "full") -> bytes:
+    """
+    Export ringkasan batch (/parse-multiple) ke format biner yang diminta.
+    response_format (full/compact/columnar) hanya berlaku untuk msgpack; tabel Arrow selalu datar.
+    """
+    if export_format == "msgpack":
+        return export_msgpack(format_batch(summary, response_format))
+    return export_tables_zip(summary["results"], export_format)
+
@@ -0,0 +1,189 @@
+"""
+Invoice Identity Index Module
+Decode identitas faktur dari nama file export Coretax:
+    InputTaxInvoice-<uuid>-<NPWP supplier>-<nomor seri faktur>-<NPWP pembeli>.pdf
+lalu catat faktur yang sudah pernah diimport di index SQLite persisten, sehingga upload
+ulang faktur yang sama langsung ditolak sebagai duplikat tanpa menjalankan pdfplumber.
+
+Index hanya menjawab "faktur ini sudah pernah diimport?", bukan menyimpan hasil parse:
+hasil parse untuk isi PDF yang sama dilayani cache (cache.py, per PARSER_VERSION, bisa
+di-evict/purge). Index tidak pernah di-evict dan tidak bergantung pada versi parser,
+sehingga duplikat tetap dikenali setelah restart, purge cache, atau upgrade parser.
+
+Setiap baris menyimpan SHA-256 isi PDF; upload hanya dianggap duplikat jika identitas
+nama file dan isi PDF-nya sama. PDF koreksi yang di-upload ulang dengan nama file yang
+sama (atau file lain yang diberi nama faktur yang sudah dikenal) diparse seperti biasa,
+lalu barisnya diganti.
+
+Index bersifat opt-in: tanpa INVOICE_INDEX_PATH tidak ada file yang dibuat. Koneksi baru
+dibuka saat index pertama kali dipakai dan dibuka ulang per proses (tidak lintas fork).
+
+Konfigurasi via environment variable:
+- INVOICE_INDEX_PATH : path file SQLite index (default: kosong = nonaktif)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+INVOICE_INDEX_PATH = os.getenv("INVOICE_INDEX_PATH", "")
+
+FILENAME_PATTERN = re.compile(
+    r'^InputTaxInvoice-'
+    r'(?P<uuid>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})-'
+    r'(?P<supplier_npwp>\d{15,16})-'
+    r'(?P<invoice_number>\d+)-'
+    r'(?P<buyer_npwp>\d{15,16})\.pdf$',
+    re.IGNORECASE
+)
+
+# Field identitas yang dicocokkan dengan metadata hasil ekstraksi PDF
+IDENTITY_FIELDS = ("supplier_npwp", "invoice_number", "buyer_npwp")
+
+
+def decode_filename_identity(filename: str) -> Optional[Dict[str, str]]:
+    """Decode identitas faktur dari nama file Coretax, None jika format tidak cocok"""
+    match = FILENAME_PATTERN.match(os.path.basename(filename or ""))
+    if not match:
+        return None
+    return match.groupdict()
+
+
+def identity_key(identity: Dict[str, str]) -> str:
+    """Key index: NPWP supplier + nomor seri faktur + NPWP pembeli (uuid export diabaikan)"""
+    return "-".join(identity[field] for field in IDENTITY_FIELDS)
+
+
+def check_identity(identity: Dict[str, str], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Bandingkan identitas dari nama file dengan metadata hasil ekstraksi PDF"""
+    mismatched = [
+        field for field in IDENTITY_FIELDS
+        if metadata.get(field) is not None and metadata.get(field) != identity[field]
+    ]
+    return {
+        "filename_identity": {field: identity[field] for field in IDENTITY_FIELDS},
+        "matches": not mismatched,
+        "mismatched_fields": mismatched
+    }
+
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS invoice_index ("
+    " identity_key TEXT PRIMARY KEY,"
+    " supplier_npwp TEXT NOT NULL,"
+    " invoice_number TEXT NOT NULL,"
+    " buyer_npwp TEXT NOT NULL,"
+    " filename TEXT,"
+    " content_sha256 TEXT NOT NULL,"
+    " metadata_json TEXT NOT NULL,"
+    " indexed_at REAL NOT NULL"
+    ")"
+)
+
+
+class InvoiceIndex:
+    """Index persisten (SQLite) identitas faktur -> isi PDF yang sudah pernah diimport"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Koneksi milik proses ini, dibuka saat pertama dipakai (dipanggil dengan _lock)"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            # WAL agar beberapa worker uvicorn bisa membaca/menulis bersamaan
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate(self._conn)
+            self._conn.execute(SCHEMA)
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Index lama menyimpan hasil parse lengkap (result_json): pertahankan baris yang punya hash isi, cukup metadata-nya"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(invoice_index)")}
+        if "result_json" not in columns:
+            return
+        conn.execute("ALTER TABLE invoice_index RENAME TO invoice_index_old")
+        conn.execute(SCHEMA)
+        if "content_sha256" in columns:
+            conn.execute(
+                "INSERT INTO invoice_index"
+                " SELECT identity_key, supplier_npwp, invoice_number, buyer_npwp, filename, content_sha256,"
+                " json_extract(result_json, '$.metadata'), indexed_at"
+                " FROM invoice_index_old WHERE content_sha256 IS NOT NULL"
+            )
+        conn.execute("DROP TABLE invoice_index_old")
+
+    def get(self, identity: Dict[str, str], content_sha256: str) -> Optional[Dict[str, Any]]:
+        """
+        Catatan import sebelumnya (filename, metadata, indexed_at) untuk identitas faktur,
+        None jika belum pernah diimport atau isi PDF-nya berbeda
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT filename, metadata_json, indexed_at FROM invoice_index"
+                " WHERE identity_key = ? AND content_sha256 = ?",
+                (identity_key(identity), content_sha256)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"filename": row[0], "metadata": json.loads(row[1] or "{}"), "indexed_at": row[2]}
+
+    def put(self, identity: Dict[str, str], filename: str, metadata: Dict[str, Any], content_sha256: str) -> None:
+        """Catat (atau ganti) import faktur beserta hash isi PDF-nya"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO invoice_index"
+                " (identity_key, supplier_npwp, invoice_number, buyer_npwp, filename, content_sha256,"
+                " metadata_json, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    identity_key(identity),
+                    identity["supplier_npwp"],
+                    identity["invoice_number"],
+                    identity["buyer_npwp"],
+                    filename,
+                    content_sha256,
+                    json.dumps(metadata, ensure_ascii=False),
+                    time.time()
+                )
+            )
+            conn.commit()
+
+    def close(self) -> None:
+        """Tutup koneksi proses ini; koneksi dibuka ulang saat dipakai lagi"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def count(self) -> int:
+        """Jumlah faktur yang sudah ada di index"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM invoice_index").fetchone()[0]
+
+
+def build_duplicate_result(indexed: Dict[str, Any], filename: str, identity: Dict[str, str]) -> Dict[str, Any]:
+    """Response untuk faktur yang sudah pernah diimport (tanpa items; hasil parse lengkap ada di cache/invoice store)"""
+    return {
+        "status": "duplicate",
+        "filename": filename,
+        "identity": {field: identity[field] for field in IDENTITY_FIELDS},
+        "metadata": indexed["metadata"],
+        "first_imported": {"filename": indexed["filename"], "indexed_at": indexed["indexed_at"]}
+    }
+
+
+# Instance global yang dipakai api.py (None jika index dinonaktifkan)
+invoice_index = InvoiceIndex(INVOICE_INDEX_PATH) if INVOICE_INDEX_PATH else None
@@ -0,0 +1,274 @@
+"""
+Invoice Store Module
+Penyimpanan persisten (SQLite, WAL) untuk setiap faktur yang berhasil diparse, sehingga
+ASIK dan skrip rekonsiliasi bisa mencari faktur & item lewat GET /invoices tanpa
+meng-upload ulang PDF.
+
+Tabel:
+- invoices : satu baris per faktur (unik per nomor faktur + NPWP supplier), kolom metadata,
+             validasi, dan hasil parse lengkap (result_json)
+- items    : satu baris per item faktur
+Index: invoice_number, supplier_npwp, buyer_npwp, invoice_date (ISO YYYY-MM-DD), item_code.
+
+Store bersifat opt-in: tanpa INVOICE_STORE_PATH tidak ada file yang dibuat dan GET /invoices
+membalas 503. Koneksi baru dibuka saat store pertama kali dipakai (bukan saat import) dan
+dibuka ulang per proses, karena koneksi SQLite tidak boleh dipakai lintas fork.
+
+Konfigurasi via environment variable:
+- INVOICE_STORE_PATH : path file SQLite (default: kosong = nonaktif)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from parser import MONTH_NAMES
+
+INVOICE_STORE_PATH = os.getenv("INVOICE_STORE_PATH", "")
+
+# Batas ukuran halaman GET /invoices
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+MONTH_NUMBERS = {name: index for index, name in enumerate(MONTH_NAMES.split("|"), start=1)}
+DATE_PATTERN = re.compile(r'^(\d{1,2})\s+(\w+)\s+(\d{4})$')
+
+# Kolom ringkasan faktur untuk response GET /invoices
+SUMMARY_COLUMNS = (
+    "invoice_number", "invoice_date", "supplier_name", "supplier_npwp", "buyer_name", "buyer_npwp",
+    "filename", "total_items", "calculated_total", "pdf_total", "difference", "is_valid", "stored_at"
+)
+
+# Filter query GET /invoices: nama parameter -> kondisi SQL
+FILTER_CONDITIONS = {
+    "supplier_npwp": "invoices.supplier_npwp = ?",
+    "buyer_npwp": "invoices.buyer_npwp = ?",
+    "invoice_number": "invoices.invoice_number = ?",
+    "date_from": "invoices.invoice_date >= ?",
+    "date_to": "invoices.invoice_date <= ?",
+    "item_code": "invoices.id IN (SELECT invoice_id FROM items WHERE item_code = ?)"
+}
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS invoices ("
+    " id INTEGER PRIMARY KEY,"
+    " invoice_number TEXT NOT NULL,"
+    " invoice_date TEXT,"
+    " supplier_name TEXT,"
+    " supplier_npwp TEXT NOT NULL DEFAULT '',"
+    " buyer_name TEXT,"
+    " buyer_npwp TEXT,"
+    " filename TEXT,"
+    " total_items INTEGER NOT NULL,"
+    " calculated_total REAL,"
+    " pdf_total REAL,"
+    " difference REAL,"
+    " is_valid INTEGER,"
+    " result_json TEXT NOT NULL,"
+    " stored_at REAL NOT NULL,"
+    " UNIQUE (invoice_number, supplier_npwp)"
+    ")",
+    "CREATE TABLE IF NOT EXISTS items ("
+    " invoice_id INTEGER NOT NULL REFERENCES invoices(id) ON DELETE CASCADE,"
+    " no TEXT,"
+    " item_code TEXT,"
+    " nama_barang TEXT,"
+    " quantity REAL,"
+    " unit TEXT,"
+    " unit_price REAL,"
+    " discount REAL,"
+    " total REAL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_invoice_number ON invoices (invoice_number)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_supplier_npwp ON invoices (supplier_npwp)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_buyer_npwp ON invoices (buyer_npwp)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_invoice_date ON invoices (invoice_date)",
+    "CREATE INDEX IF NOT EXISTS idx_items_item_code ON items (item_code)",
+    "CREATE INDEX IF NOT EXISTS idx_items_invoice_id ON items (invoice_id)",
+)
+
+
+def iso_date(invoice_date: Optional[str]) -> Optional[str]:
+    """Ubah tanggal faktur "06 November 2025" menjadi "2025-11-06" (None jika format tidak dikenal)"""
+    match = DATE_PATTERN.match((invoice_date or "").strip())
+    if not match or match.group(2) not in MONTH_NUMBERS:
+        return None
+    day, month, year = match.groups()
+    return f"{year}-{MONTH_NUMBERS[month]:02d}-{int(day):02d}"
+
+
+class InvoiceStore:
+    """Store faktur & item hasil parse (SQLite)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Koneksi milik proses ini, dibuka saat pertama dipakai (dipanggil dengan _lock)"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.row_factory = sqlite3.Row
+            # WAL: pembaca GET /invoices tidak terblokir oleh penulisan hasil parse
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self) -> None:
+        """Tutup koneksi proses ini; koneksi dibuka ulang saat dipakai lagi"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _where(filters: Dict[str, Optional[str]]) -> Tuple[str, List[Any]]:
+        """Klausa WHERE dari filter FILTER_CONDITIONS (nilai None diabaikan)"""
+        conditions = []
+        params: List[Any] = []
+        for name, value in filters.items():
+            if value is not None:
+                conditions.append(FILTER_CONDITIONS[name])
+                params.append(value)
+        return (f" WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+    def put(self, result: Dict[str, Any]) -> bool:
+        """
+        Simpan satu hasil parse sukses (parse ulang faktur yang sama menggantikan data lama).
+        Hasil tanpa nomor faktur atau tanpa items (fast path metadata) tidak disimpan.
+        """
+        metadata = result.get("metadata") or {}
+        invoice_number = metadata.get("invoice_number")
+        if result.get("status") != "success" or not invoice_number or "items" not in result:
+            return False
+
+        validation = result.get("validation") or {}
+        stored = {key: value for key, value in result.items() if key not in ("duplicate", "identity_check", "timing")}
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "DELETE FROM invoices WHERE invoice_number = ? AND supplier_npwp = ?",
+                    (invoice_number, metadata.get("supplier_npwp") or "")
+                )
+                cursor = conn.execute(
+                    "INSERT INTO invoices"
+                    " (invoice_number, invoice_date, supplier_name, supplier_npwp, buyer_name, buyer_npwp, filename,"
+                    "  total_items, calculated_total, pdf_total, difference, is_valid, result_json, stored_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        invoice_number,
+                        iso_date(metadata.get("invoice_date")),
+                        metadata.get("supplier_name"),
+                        metadata.get("supplier_npwp") or "",
+                        metadata.get("buyer_name"),
+                        metadata.get("buyer_npwp"),
+                        result.get("filename"),
+                        result.get("total_items", len(result["items"])),
+                        validation.get("calculated_total"),
+                        validation.get("pdf_total"),
+                        validation.get("difference"),
+                        validation.get("is_valid"),
+                        json.dumps(stored, ensure_ascii=False),
+                        time.time()
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO items (invoice_id, no, item_code, nama_barang, quantity, unit, unit_price, discount, total)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            cursor.lastrowid, item.get("no"), item.get("item_code"), item.get("nama_barang"),
+                            item.get("quantity"), item.get("unit"), item.get("unit_price"), item.get("discount"),
+                            item.get("total")
+                        )
+                        for item in result["items"]
+                    ]
+                )
+        return True
+
+    def get(self, invoice_number: str, supplier_npwp: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Hasil parse lengkap untuk nomor faktur (terbaru jika ada beberapa supplier), None jika tidak ada"""
+        query = "SELECT result_json FROM invoices WHERE invoice_number = ?"
+        params: List[Any] = [invoice_number]
+        if supplier_npwp:
+            query += " AND supplier_npwp = ?"
+            params.append(supplier_npwp)
+        query += " ORDER BY stored_at DESC LIMIT 1"
+
+        with self._lock:
+            row = self._connection().execute(query, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(
+        self,
+        filters: Dict[str, Optional[str]],
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Cari faktur dengan filter FILTER_CONDITIONS (nilai None diabaikan), urut tanggal terbaru.
+        Kembalikan (jumlah total yang cocok, ringkasan faktur di halaman ini).
+        """
+        where, params = self._where(filters)
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM invoices{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM invoices{where}"
+                " ORDER BY invoice_date DESC, id DESC LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+
+        invoices = []
+        for row in rows:
+            invoice = dict(row)
+            invoice["is_valid"] = None if invoice["is_valid"] is None else bool(invoice["is_valid"])
+            invoices.append(invoice)
+        return total, invoices
+
+    def report_columns(self, filters: Dict[str, Optional[str]]) -> Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]:
+        """
+        Kolom untuk reports.aggregate_columns langsung dari tabel (tanpa decode result_json):
+        invoices (status, supplier, month, total & validasi) dan items faktur yang cocok dengan filter.
+        """
+        where, params = self._where(filters)
+        with self._lock:
+            conn = self._connection()
+            invoice_rows = conn.execute(
+                "SELECT supplier_npwp, supplier_name, substr(invoice_date, 1, 7),"
+                " calculated_total, pdf_total, difference, is_valid"
+                f" FROM invoices{where}",
+                params
+            ).fetchall()
+            item_rows = conn.execute(
+                "SELECT items.item_code, items.nama_barang, items.quantity, items.total"
+                f" FROM items JOIN invoices ON invoices.id = items.invoice_id{where}",
+                params
+            ).fetchall()
+
+        invoice_names = ("supplier_npwp", "supplier_name", "month", "calculated_total", "pdf_total", "difference", "is_valid")
+        invoices = {name: [row[index] for row in invoice_rows] for index, name in enumerate(invoice_names)}
+        item_names = ("item_code", "nama_barang", "quantity", "total")
+        items = {name: [row[index] for row in item_rows] for index, name in enumerate(item_names)}
+        return invoices, items
+
+    def count(self) -> int:
+        """Jumlah faktur di store"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+
+
+# Instance global yang dipakai api.py & watcher.py (None jika store dinonaktifkan)
+invoice_store = InvoiceStore(INVOICE_STORE_PATH) if INVOICE_STORE_PATH else None
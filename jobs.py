@@ -0,0 +1,162 @@
+"""
+Job Queue Module
+Antrian job parsing asinkron untuk import besar (POST /jobs, GET /jobs/{id}).
+Job masuk ke antrian terbatas dan dikerjakan oleh sejumlah worker tetap;
+jika antrian penuh, JobQueueFull dilempar agar API bisa membalas 429.
+
+Konfigurasi via environment variable:
+- JOB_QUEUE_SIZE   : maksimal job yang menunggu di antrian (default: 100)
+- JOB_WORKERS      : jumlah worker yang mengerjakan job bersamaan (default: 2)
+- JOB_TTL          : lama (detik) hasil job disimpan setelah selesai (default: 3600)
+- JOB_MAX_FINISHED : maksimal job selesai yang hasilnya disimpan di memori; jika lebih,
+                     job yang paling lama selesai dibuang lebih dulu (default: 100)
+- JOB_RETRY_AFTER  : nilai header Retry-After (detik) saat antrian penuh (default: 30)
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import parser as pdf_parser
+from uploads import discard_uploads
+
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", "100"))
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "30"))
+
+# Fungsi parse batch: menerima list (filename, content), yield (index, hasil)
+ParseIterator = Callable[[List[tuple]], AsyncIterator[Tuple[int, Dict[str, Any]]]]
+
+
+class JobQueueFull(Exception):
+    """Antrian job penuh, client harus mencoba lagi nanti"""
+
+
+class Job:
+    """Satu job parsing berisi satu atau lebih file PDF"""
+
+    def __init__(self, files_data: List[tuple]):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.files_data: Optional[List[tuple]] = files_data
+        self.total_files = len(files_data)
+        self.processed_files = 0
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(files_data)
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representasi status job untuk response API"""
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": {
+                "processed_files": self.processed_files,
+                "total_files": self.total_files,
+                "percent": round(100.0 * self.processed_files / self.total_files, 1) if self.total_files else 100.0
+            },
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.status == "completed":
+            data["result"] = pdf_parser.summarize_results(self.results)
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Antrian job terbatas dengan jumlah worker tetap"""
+
+    def __init__(
+        self,
+        parse_iterator: ParseIterator,
+        queue_size: int = JOB_QUEUE_SIZE,
+        workers: int = JOB_WORKERS,
+        ttl: int = JOB_TTL,
+        max_finished: int = JOB_MAX_FINISHED
+    ):
+        self.parse_iterator = parse_iterator
+        self.queue_size = queue_size
+        self.workers = workers
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Jalankan worker (dipanggil saat startup aplikasi)"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+
+    async def stop(self) -> None:
+        """Hentikan semua worker (dipanggil saat shutdown aplikasi)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self.jobs.values():
+            discard_uploads(job.files_data)
+            job.files_data = None
+
+    def submit(self, files_data: List[tuple]) -> Job:
+        """Masukkan job baru ke antrian, lempar JobQueueFull jika antrian penuh"""
+        self._purge_expired()
+        job = Job(files_data)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull()
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Ambil job berdasarkan id"""
+        self._purge_expired()
+        return self.jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        """Jumlah job yang sedang menunggu di antrian"""
+        return self._queue.qsize() if self._queue else 0
+
+    def _purge_expired(self) -> None:
+        """Buang job yang sudah selesai lebih lama dari TTL, lalu job selesai tertua di atas max_finished"""
+        now = time.time()
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished_at is not None), key=lambda job: job.finished_at
+        )
+        excess = len(finished) - self.max_finished
+        for index, job in enumerate(finished):
+            if index < excess or now - job.finished_at > self.ttl:
+                del self.jobs[job.id]
+
+    async def _worker(self) -> None:
+        """Loop worker: ambil job dari antrian dan parse semua file-nya"""
+        while True:
+            job = await self._queue.get()
+            try:
+                job.status = "running"
+                job.started_at = time.time()
+                async for idx, result in self.parse_iterator(job.files_data):
+                    job.results[idx] = result
+                    job.processed_files += 1
+                job.status = "completed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                discard_uploads(job.files_data)  # Hapus file spool upload besar
+                job.files_data = None  # Lepas isi PDF dari memori
+                job.finished_at = time.time()
+                self._purge_expired()
+                self._queue.task_done()
@@ -0,0 +1,99 @@
+"""
+Layout Template Module
+Template geometri tabel item per supplier (NPWP). Faktur dari supplier yang sama memiliki
+tabel dengan garis kolom identik, sehingga setelah faktur pertama tervalidasi parser bisa
+memakai garis kolom eksplisit di region yang di-crop tanpa deteksi tabel penuh.
+
+Template berisi:
+- columns : posisi x garis kolom tabel item (kiri ke kanan)
+- bbox    : (x0, top, x1, bottom) grid item di halaman pertama (top = garis atas baris header kolom)
+- header  : isi baris header kolom, dipakai untuk memvalidasi crop di halaman pertama
+
+Template disimpan di SQLite (WAL) agar tetap ada setelah restart dan dipakai bersama oleh
+semua proses worker; setiap proses juga menyimpan salinan di memori.
+
+Template bersifat opt-in: tanpa PARSER_LAYOUT_TEMPLATES_PATH setiap faktur memakai deteksi
+tabel penuh, sehingga hasil & waktu parse tidak bergantung pada faktur yang diparse sebelumnya.
+Letakkan file-nya di direktori yang sama dengan INVOICE_INDEX_PATH / INVOICE_STORE_PATH.
+
+Konfigurasi via environment variable:
+- PARSER_LAYOUT_TEMPLATES_PATH : path file SQLite template (default: kosong = nonaktif)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+PARSER_LAYOUT_TEMPLATES_PATH = os.getenv("PARSER_LAYOUT_TEMPLATES_PATH", "")
+
+
+class LayoutTemplateStore:
+    """Store template layout tabel per NPWP supplier (SQLite + cache memori per proses)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._templates: Dict[str, Dict[str, Any]] = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Koneksi milik proses ini (koneksi SQLite tidak boleh dipakai lintas fork worker)"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS layout_templates ("
+                " supplier_npwp TEXT PRIMARY KEY,"
+                " template_json TEXT NOT NULL,"
+                " updated_at REAL NOT NULL"
+                ")"
+            )
+            self._conn.commit()
+            self._pid = os.getpid()
+            self._templates = {}
+        return self._conn
+
+    def get(self, supplier_npwp: str) -> Optional[Dict[str, Any]]:
+        """Template untuk NPWP supplier, None jika belum ada"""
+        with self._lock:
+            conn = self._connection()
+            template = self._templates.get(supplier_npwp)
+            if template is None:
+                row = conn.execute(
+                    "SELECT template_json FROM layout_templates WHERE supplier_npwp = ?", (supplier_npwp,)
+                ).fetchone()
+                if row is None:
+                    return None
+                template = self._templates[supplier_npwp] = json.loads(row[0])
+            return template
+
+    def put(self, supplier_npwp: str, template: Dict[str, Any]) -> None:
+        """Simpan (atau ganti) template supplier"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO layout_templates (supplier_npwp, template_json, updated_at) VALUES (?, ?, ?)",
+                    (supplier_npwp, json.dumps(template), time.time())
+                )
+            self._templates[supplier_npwp] = template
+
+    def close(self) -> None:
+        """Tutup koneksi proses ini (mis. sebelum fork); koneksi dibuka ulang saat dipakai lagi"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def count(self) -> int:
+        """Jumlah supplier yang memiliki template"""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM layout_templates").fetchone()[0]
+
+
+# Instance global yang dipakai parser.py (None jika template dinonaktifkan)
+layout_templates = LayoutTemplateStore(PARSER_LAYOUT_TEMPLATES_PATH) if PARSER_LAYOUT_TEMPLATES_PATH else None
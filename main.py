@@ -1,118 +1,444 @@
-import pdfplumber
-import re
+"""
+Coretax Batch CLI
+Parse banyak PDF Faktur Pajak Coretax dengan parser yang sama dengan API
+(parser.extract_invoice_data), paralel di beberapa proses, lalu tulis hasilnya
+ke JSONL (satu hasil per baris), CSV, atau format biner export.py (MessagePack,
+tabel Arrow IPC / Parquet; ditulis sekali setelah semua file selesai).
+
+- Argumen berupa file PDF atau direktori (dicari rekursif)
+- Hasil ditulis begitu tiap file selesai (urutan mengikuti selesainya parse)
+- --resume MANIFEST: file yang sudah tercatat di manifest (path, ukuran, mtime sama)
+  dilewati, sehingga menjalankan ulang atas arsip besar hanya memproses file baru.
+  Output dibuka dalam mode append.
+- Hanya hasil parser (success / error dari parser) yang dicatat di manifest. Jika proses worker
+  crash (BrokenProcessPool), executor dibuat ulang dan file yang sedang diproses dikirim ulang
+  satu per satu; file yang tetap membuat worker crash setelah MAX_WORKER_RETRIES ditulis
+  sebagai error tanpa dicatat di manifest, sehingga --resume berikutnya mencobanya lagi.
+
+Pemakaian:
+    python main.py sample_pdf/ -o hasil.jsonl
+    python main.py arsip/ -o hasil.csv --workers 4 --resume hasil.manifest
+    python main.py arsip/ -o items.csv --csv-table items
+    python main.py arsip/ -o hasil.msgpack
+    python main.py arsip/ --format parquet -o hasil/     # hasil/invoices.parquet, hasil/items.parquet
+    python main.py                       # mode interaktif (prompt path)
+"""
+
+import argparse
+import csv
+import json
 import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
 from tabulate import tabulate
 
-def clean_number(num_str):
-    if not num_str:
-        return 0.0
-    num_str = num_str.replace('.', '').replace(',', '.')
-    try:
-        return float(num_str)
-    except ValueError:
-        return 0.0
+import parser as pdf_parser
+from export import (
+    EXPORT_FORMATS, INVOICE_COLUMNS, ITEM_COLUMNS, ExportUnavailable, check_export_format, export_msgpack,
+    flatten_results, write_tables
+)
 
-def format_idr(number):
-    return f"{number:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
 
-def extract_invoice_with_validation(pdf_path):
-    items_list = []
-    pdf_summary_total = 0.0
+PARSE_FUNCTIONS = {
+    "all": pdf_parser.parse_pdf_file,
+    "metadata": pdf_parser.parse_pdf_metadata
+}
 
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            full_text = ""
-
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    full_text += text + "\n"
-
-                table = page.extract_table()
-                if not table:
-                    continue
-
-                for row in table:
-                    row_content = " ".join([str(c) for c in row[:-1] if c])
-                    total_col = row[-1].strip() if row[-1] else "0"
-
-                    pattern = r"(.*?)Rp\s+([\d\.,]+)\s+[x×]\s+([\d\.,]+)\s+(\w+)"
-                    matches = re.finditer(pattern, row_content, re.DOTALL)
-
-                    for match in matches:
-                        raw_name = match.group(1).strip()
-
-                        clean_name = re.sub(r'\d{6}', '', raw_name)
-                        clean_name = re.sub(
-                            r'Potongan Harga.*|PPnBM.*|^\d+\s+',
-                            '',
-                            clean_name,
-                            flags=re.DOTALL
-                        )
-                        clean_name = " ".join(clean_name.split()).strip()
-
-                        items_list.append([
-                            len(items_list) + 1,
-                            clean_name or "Detail Item",
-                            total_col
-                        ])
-
-            total_match = re.search(
-                r'Harga Jual / Penggantian / Uang Muka / Termin\s+([\d\.,]+)',
-                full_text
-            )
-            if total_match:
-                pdf_summary_total = clean_number(total_match.group(1))
-
-        calculated_sum = sum(clean_number(item[2]) for item in items_list)
-
-        print("\n" + tabulate(items_list,
-            headers=["NO", "NAMA BARANG", "TOTAL BARIS (Rp)"],
-            tablefmt="grid"
-        ))
-
-        summary_data = [
-            ["TOTAL KALKULASI", f"Rp {format_idr(calculated_sum)}"],
-            ["TOTAL PDF", f"Rp {format_idr(pdf_summary_total)}"]
-        ]
-
-        print("\n" + tabulate(summary_data, tablefmt="plain"))
-
-        if abs(calculated_sum - pdf_summary_total) < 1.0:
-            print("✅ STATUS: COCOK (VALID)")
+# Format teks ditulis per file begitu selesai; format export biner ditulis sekali di akhir
+OUTPUT_FORMATS = ("jsonl", "csv") + tuple(EXPORT_FORMATS)
+
+# Maksimal file yang sedang diproses per worker (membatasi future yang tertahan di memori)
+PENDING_PER_WORKER = 4
+
+# Berapa kali file dikirim ulang setelah proses worker crash sebelum ditulis sebagai error
+MAX_WORKER_RETRIES = 3
+
+
+def collect_pdf_paths(paths: List[str]) -> List[str]:
+    """
+    Kumpulkan file PDF dari argumen CLI (file atau direktori, rekursif), diurutkan agar
+    run reproducible. Path yang tidak ada dilewati.
+    """
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                pdf_paths.extend(
+                    os.path.join(root, name) for name in sorted(names)
+                    if name.lower().endswith(".pdf")
+                )
+        elif os.path.isfile(path):
+            pdf_paths.append(path)
+    return pdf_paths
+
+
+def manifest_key(path: str) -> Tuple[str, int, int]:
+    """Identitas file untuk manifest: path absolut, ukuran, dan mtime (ns)"""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def load_manifest(manifest_path: str) -> Set[Tuple[str, int, int]]:
+    """Baca manifest JSONL; baris terakhir yang terpotong (run terhenti) diabaikan"""
+    done: Set[Tuple[str, int, int]] = set()
+    if not os.path.exists(manifest_path):
+        return done
+
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                done.add((entry["path"], entry["size"], entry["mtime_ns"]))
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def detect_output_format(output: Optional[str], output_format: Optional[str]) -> str:
+    """Format output dari --format, atau dari ekstensi file output (default jsonl)"""
+    if output_format:
+        return output_format
+    if output and output.lower().endswith(".csv"):
+        return "csv"
+    if output and output.lower().endswith(".msgpack"):
+        return "msgpack"
+    return "jsonl"
+
+
+class ResultWriter:
+    """Tulis hasil parse ke JSONL atau CSV (tabel invoices atau items, kolom sama dengan export.py)"""
+
+    def __init__(self, stream: TextIO, output_format: str, csv_table: str = "invoices"):
+        self.stream = stream
+        self.output_format = output_format
+        self.csv_table = csv_table
+        self.csv_writer = None
+
+        if output_format == "csv":
+            columns = INVOICE_COLUMNS if csv_table == "invoices" else ITEM_COLUMNS
+            self.columns = ["path"] + [name for name, _ in columns]
+            self.csv_writer = csv.writer(stream)
+            # Mode append (--resume): header hanya ditulis sekali
+            if not stream.seekable() or stream.tell() == 0:
+                self.csv_writer.writerow(self.columns)
+
+    def write(self, path: str, result: Dict[str, Any]) -> None:
+        if self.csv_writer is None:
+            self.stream.write(json.dumps(dict(result, path=path), ensure_ascii=False) + "\n")
+        else:
+            invoices, items = flatten_results([result])
+            table = invoices if self.csv_table == "invoices" else items
+            rows = len(next(iter(table.values())))
+            for index in range(rows):
+                self.csv_writer.writerow([path] + [table[name][index] for name in self.columns[1:]])
+        self.stream.flush()
+
+
+class ExportWriter:
+    """Kumpulkan hasil lalu tulis sekali ke file .msgpack atau direktori tabel arrow/parquet (export.py)"""
+
+    def __init__(self, output: str, output_format: str):
+        self.output = output
+        self.output_format = output_format
+        self.results: List[Dict[str, Any]] = []
+
+    def write(self, path: str, result: Dict[str, Any]) -> None:
+        self.results.append(dict(result, path=path))
+
+    def close(self) -> List[str]:
+        """Tulis export, kembalikan path file yang dibuat"""
+        if self.output_format != "msgpack":
+            return write_tables(self.results, self.output_format, self.output)
+        with open(self.output, "wb") as f:
+            f.write(export_msgpack(pdf_parser.summarize_results(self.results)))
+        return [self.output]
+
+
+class ProgressBar:
+    """Progress bar di stderr (tqdm jika terinstall)"""
+
+    def __init__(self, total: int, enabled: bool = True):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self.enabled = enabled
+        self.bar = tqdm(total=total, unit="file", file=sys.stderr) if enabled and tqdm is not None else None
+
+    def update(self, status: str) -> None:
+        self.done += 1
+        if status not in ("success", "duplicate"):
+            self.failed += 1
+        if not self.enabled:
+            return
+        if self.bar is not None:
+            self.bar.set_postfix(gagal=self.failed, refresh=False)
+            self.bar.update(1)
+            return
+
+        width = 30
+        filled = int(width * self.done / self.total) if self.total else width
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        sys.stderr.write(
+            f"\r[{'#' * filled}{'.' * (width - filled)}] {self.done}/{self.total} "
+            f"({rate:.1f} file/s, gagal {self.failed})"
+        )
+        sys.stderr.flush()
+
+    def close(self) -> None:
+        if not self.enabled:
+            return
+        if self.bar is not None:
+            self.bar.close()
         else:
-            selisih = abs(calculated_sum - pdf_summary_total)
-            print(f"❌ STATUS: TIDAK COCOK (Selisih Rp {format_idr(selisih)})")
-
-    except Exception as e:
-        print(f"❌ Error di file {os.path.basename(pdf_path)}: {e}")
-
-def process_path(path):
-    if os.path.isfile(path) and path.lower().endswith(".pdf"):
-        print(f"\n📄 MEMPROSES FILE: {os.path.basename(path)}")
-        extract_invoice_with_validation(path)
-
-    elif os.path.isdir(path):
-        pdf_files = [
-            os.path.join(path, f)
-            for f in os.listdir(path)
-            if f.lower().endswith(".pdf")
-        ]
-
-        if not pdf_files:
-            print("⚠️ Tidak ada file PDF di folder.")
+            sys.stderr.write("\n")
+
+
+def parse_path(fields: str, path: str) -> Dict[str, Any]:
+    """Parse satu file di proses worker; parser membaca PDF langsung dari path"""
+    return PARSE_FUNCTIONS[fields](path, os.path.basename(path))
+
+
+def iter_parse_paths(pdf_paths: List[str], fields: str, workers: int) -> Iterator[Tuple[str, Dict[str, Any], bool]]:
+    """
+    Parse semua path dan yield (path, hasil, dari_parser) begitu masing-masing selesai.
+    dari_parser False berarti hasil error karena worker gagal/crash, bukan hasil parser
+    (tidak boleh dicatat di manifest --resume).
+    Jumlah file yang sedang diproses dibatasi agar arsip besar tidak membuat ribuan future sekaligus.
+    Jika hanya ada satu PDF yang panjang, range halamannya yang dibagi ke beberapa proses.
+    """
+    if len(pdf_paths) == 1 and fields == "all" and workers > 1:
+        # Satu PDF: halaman faktur panjang dibagi ke beberapa proses
+        path = pdf_paths[0]
+        ranges = pdf_parser.split_page_ranges(path, workers)
+        if ranges:
+            with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                result = pdf_parser.parse_pdf_file_split(path, os.path.basename(path), executor, ranges)
+            yield path, result, result.get("error_type") != BrokenProcessPool.__name__
+            return
+
+    workers = min(workers, len(pdf_paths))
+    if workers <= 1:
+        for path in pdf_paths:
+            try:
+                yield path, parse_path(fields, path), True
+            except Exception as e:
+                yield path, pdf_parser.error_result(os.path.basename(path), e), True
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    remaining = iter(pdf_paths)
+    pending: Dict[Future, str] = {}
+    # File yang ikut gagal saat pool rusak dan jumlah crash saat diproses sendirian
+    crashed: List[str] = []
+    retries: Dict[str, int] = {}
+
+    def fill() -> None:
+        if crashed:
+            # Pool rusak menggagalkan semua file yang sedang diproses: kirim ulang satu per satu
+            # agar hanya file penyebab crash yang dihitung terhadap MAX_WORKER_RETRIES
+            if not pending:
+                path = crashed.pop(0)
+                pending[executor.submit(parse_path, fields, path)] = path
             return
+        while len(pending) < workers * PENDING_PER_WORKER:
+            path = next(remaining, None)
+            if path is None:
+                return
+            pending[executor.submit(parse_path, fields, path)] = path
 
-        for pdf in pdf_files:
-            print(f"\n📄 MEMPROSES FILE: {os.path.basename(pdf)}")
-            extract_invoice_with_validation(pdf)
+    def complete(future: Future, alone: bool) -> Iterator[Tuple[str, Dict[str, Any], bool]]:
+        path = pending.pop(future)
+        try:
+            yield path, future.result(), True
+        except BrokenProcessPool as e:
+            if alone:
+                retries[path] = retries.get(path, 0) + 1
+            if retries.get(path, 0) > MAX_WORKER_RETRIES:
+                yield path, pdf_parser.error_result(os.path.basename(path), e), False
+            else:
+                crashed.append(path)
+        except Exception as e:
+            # Bukan hasil parser (parse_pdf_file sendiri mengembalikan hasil error)
+            yield path, pdf_parser.error_result(os.path.basename(path), e), False
+
+    try:
+        fill()
+        while pending:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            alone = len(pending) == 1
+            for future in completed:
+                yield from complete(future, alone)
 
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in completed):
+                # Kumpulkan semua file yang ikut gagal, lalu ganti executor yang rusak
+                for future in wait(pending)[0]:
+                    yield from complete(future, False)
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+            fill()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def print_summary(counts: Dict[str, int], skipped: int, elapsed: float) -> None:
+    rows = [[status.upper(), count] for status, count in sorted(counts.items())]
+    if skipped:
+        rows.append(["DILEWATI (RESUME)", skipped])
+    rows.append(["WAKTU", f"{elapsed:.1f}s"])
+    print("\n" + tabulate(rows, tablefmt="plain"), file=sys.stderr)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    output_format = detect_output_format(args.output, args.output_format)
+    export = output_format in EXPORT_FORMATS
+    if export:
+        if not args.output or args.resume:
+            print(f"⚠️ Format {output_format} membutuhkan --output dan tidak bisa dipakai dengan --resume.", file=sys.stderr)
+            return 1
+        try:
+            check_export_format(output_format)
+        except ExportUnavailable as e:
+            print(f"⚠️ {e}", file=sys.stderr)
+            return 1
+
+    for path in args.paths:
+        if not os.path.exists(path):
+            print(f"⚠️ Path tidak ditemukan: {path}", file=sys.stderr)
+    pdf_paths = collect_pdf_paths(args.paths)
+    if not pdf_paths:
+        print("⚠️ Tidak ada file PDF yang ditemukan.", file=sys.stderr)
+        return 1
+
+    done: Set[Tuple[str, int, int]] = set()
+    manifest = None
+    if args.resume:
+        done = load_manifest(args.resume)
+        manifest = open(args.resume, "a", encoding="utf-8")
+
+    keys = {path: manifest_key(path) for path in pdf_paths}
+    todo = [path for path in pdf_paths if keys[path] not in done]
+    skipped = len(pdf_paths) - len(todo)
+
+    stream = None
+    if export:
+        writer = ExportWriter(args.output, output_format)
     else:
-        print("❌ Path tidak valid atau bukan PDF/folder.")
+        if args.output:
+            stream = open(args.output, "a" if args.resume else "w", encoding="utf-8", newline="")
+        else:
+            stream = sys.stdout
+        writer = ResultWriter(stream, output_format, args.csv_table)
+
+    workers = args.workers if args.workers is not None else pdf_parser.BATCH_MAX_WORKERS
+    workers = max(1, workers)
+    # Progress bar hanya untuk terminal; ringkasan tetap dicetak (kecuali --quiet)
+    progress = ProgressBar(len(todo), enabled=not args.quiet and sys.stderr.isatty())
+    counts: Dict[str, int] = {}
+    start = time.perf_counter()
+
+    try:
+        for path, result, parsed in iter_parse_paths(todo, args.fields, workers):
+            writer.write(path, result)
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            progress.update(result["status"])
+
+            # Manifest dicatat setelah hasil tertulis: run yang terhenti paling buruk memproses ulang satu file.
+            # File yang gagal karena worker crash tidak dicatat agar dicoba lagi saat --resume
+            if manifest is not None and parsed:
+                file_path, size, mtime_ns = keys[path]
+                manifest.write(json.dumps({
+                    "path": file_path, "size": size, "mtime_ns": mtime_ns, "status": result["status"]
+                }) + "\n")
+                manifest.flush()
+    finally:
+        progress.close()
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+        if manifest is not None:
+            manifest.close()
+
+    if export:
+        outputs = writer.close()
+        if not args.quiet:
+            for path in outputs:
+                print(f"📦 {path}", file=sys.stderr)
+
+    if not args.quiet:
+        print_summary(counts, skipped, time.perf_counter() - start)
+    return 0 if counts.get("error", 0) == 0 else 2
+
+
+def print_invoice(result: Dict[str, Any]) -> None:
+    """Tampilkan satu hasil sebagai tabel (mode interaktif)"""
+    if result["status"] != "success":
+        print(f"❌ Error di file {result['filename']}: {result.get('error')}")
+        return
+
+    print("\n" + tabulate(
+        [[item["no"], item["nama_barang"], item["total_formatted"]] for item in result["items"]],
+        headers=["NO", "NAMA BARANG", "TOTAL BARIS (Rp)"],
+        tablefmt="grid"
+    ))
+
+    validation = result["validation"]
+    summary_data = [
+        ["TOTAL KALKULASI", validation["calculated_total_formatted"]],
+        ["TOTAL PDF", validation["pdf_total_formatted"]]
+    ]
+    print("\n" + tabulate(summary_data, tablefmt="plain"))
+
+    if validation["is_valid"]:
+        print("✅ STATUS: COCOK (VALID)")
+    else:
+        print(f"❌ STATUS: TIDAK COCOK (Selisih {validation['difference_formatted']})")
+
+
+def run_interactive() -> int:
+    """Mode lama: minta path lalu tampilkan tabel item per file"""
+    path = input("Masukkan path file PDF atau folder: ").strip()
+    pdf_paths = collect_pdf_paths([path])
+    if not pdf_paths:
+        print("❌ Path tidak valid atau tidak berisi PDF.")
+        return 1
+
+    for pdf_path in pdf_paths:
+        print(f"\n📄 MEMPROSES FILE: {os.path.basename(pdf_path)}")
+        print_invoice(pdf_parser.parse_pdf_file(pdf_path, os.path.basename(pdf_path)))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Batch parser PDF Faktur Pajak Coretax")
+    arg_parser.add_argument("paths", nargs="*", help="File PDF atau direktori (rekursif); kosong = mode interaktif")
+    arg_parser.add_argument("-o", "--output", help="File output (default: stdout)")
+    arg_parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS,
+                            help="Format output (default: dari ekstensi --output, atau jsonl); "
+                                 "msgpack/arrow/parquet butuh package msgpack/pyarrow, arrow/parquet: --output direktori")
+    arg_parser.add_argument("--csv-table", choices=["invoices", "items"], default="invoices",
+                            help="CSV: satu baris per faktur (invoices) atau per item (items)")
+    arg_parser.add_argument("--fields", choices=sorted(PARSE_FUNCTIONS), default="all",
+                            help="metadata = fast path tanpa tabel item")
+    arg_parser.add_argument("--workers", type=int, help="Jumlah proses paralel (default: PARSER_BATCH_MAX_WORKERS)")
+    arg_parser.add_argument("--resume", metavar="MANIFEST",
+                            help="Manifest JSONL; file yang sudah tercatat dilewati dan output di-append")
+    arg_parser.add_argument("-q", "--quiet", action="store_true", help="Tanpa progress bar dan ringkasan")
+    args = arg_parser.parse_args(argv)
+
+    if not args.paths:
+        return run_interactive()
+    return run_batch(args)
 
-# ===============================
-# MAIN
-# ===============================
-path = input("Masukkan path file PDF atau folder: ").strip()
-process_path(path)
 
+if __name__ == "__main__":
+    sys.exit(main())
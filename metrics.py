@@ -0,0 +1,163 @@
+"""
+Metrics Module
+Instrumentasi ringan untuk endpoint /metrics (format teks Prometheus), tanpa
+dependency tambahan. Metrik disimpan per proses uvicorn; waktu per tahap diukur
+di proses worker parser lalu dikirim balik bersama hasil parse.
+
+Metrik:
+- coretax_parse_stage_seconds{stage}   : histogram durasi per tahap (open, layout, text,
+                                         table, items, metadata) dan total parse ("total")
+- coretax_pdf_pages                    : histogram jumlah halaman per PDF
+- coretax_invoice_items                : histogram jumlah item per faktur
+- coretax_upload_bytes                 : histogram ukuran file yang di-upload
+- coretax_parse_results_total{status, error_type, source}
+                                       : counter hasil parse (source: parse/cache/index)
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+ITEM_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BYTE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000)
+
+
+def escape_label_value(value: str) -> str:
+    """Escape nilai label sesuai format teks Prometheus"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Susun label Prometheus: {name="value",...}"""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(str(value))}"' for name, value in pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Counter Prometheus dengan label"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogram Prometheus (bucket kumulatif + _sum + _count) dengan label"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # Per label: [jumlah observasi per bucket (non-kumulatif) + overflow, sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    labels = format_labels(self.labelnames, key, ("le", format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Kumpulan metrik parser yang di-render oleh endpoint /metrics"""
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "coretax_parse_stage_seconds", "Durasi parsing per tahap (detik)", LATENCY_BUCKETS, ("stage",)
+        )
+        self.pdf_pages = Histogram("coretax_pdf_pages", "Jumlah halaman per PDF yang diparse", PAGE_BUCKETS)
+        self.invoice_items = Histogram("coretax_invoice_items", "Jumlah item per faktur", ITEM_BUCKETS)
+        self.upload_bytes = Histogram("coretax_upload_bytes", "Ukuran file PDF yang di-upload (byte)", BYTE_BUCKETS)
+        self.parse_results = Counter(
+            "coretax_parse_results_total", "Jumlah hasil parse per status dan tipe error",
+            ("status", "error_type", "source")
+        )
+
+    def observe_upload(self, size: int) -> None:
+        self.upload_bytes.observe(size)
+
+    def observe_result(self, result: Dict[str, Any], source: str, profile: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Catat satu hasil parse. profile (dari parser.profile_parse) hanya ada untuk
+        file yang benar-benar diparse, bukan hasil dari cache/index.
+        """
+        self.parse_results.inc(status=result["status"], error_type=result.get("error_type", ""), source=source)
+
+        if profile is None:
+            return
+        self.stage_seconds.observe(profile["total"], stage="total")
+        for name, seconds in profile["stages"].items():
+            self.stage_seconds.observe(seconds, stage=name)
+        if profile["pages"]:
+            self.pdf_pages.observe(profile["pages"])
+        if result["status"] == "success" and "total_items" in result:
+            self.invoice_items.observe(result["total_items"])
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.stage_seconds, self.pdf_pages, self.invoice_items, self.upload_bytes, self.parse_results):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def timing_view(source: str, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Rincian waktu untuk response ?debug_timing=1 (milidetik)"""
+    if profile is None:
+        return {"source": source}
+    return {
+        "source": source,
+        "total_ms": round(profile["total"] * 1000, 3),
+        "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in profile["stages"].items()},
+        "pages": profile["pages"]
+    }
+
+
+# Instance global yang dipakai api.py
+metrics = MetricsRegistry()
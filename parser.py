@@ -9,9 +9,92 @@ Fitur Unggulan:
 """
 
 import pdfplumber
+import os
 import re
-from typing import Dict, List, Any
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Any, Optional, Tuple, Union
 from io import BytesIO
+from pdfplumber.table import Table, TableSettings
+from pdfplumber.utils import chars_to_textmap
+
+from layout_templates import layout_templates
+
+# Versi logika parser; naikkan setiap kali hasil ekstraksi berubah (dipakai sebagai stamp cache)
+PARSER_VERSION = "2.1.0"
+
+# Jumlah proses paralel default untuk batch CLI (main.py) dan watcher.py (1 = sekuensial)
+BATCH_MAX_WORKERS = int(os.getenv("PARSER_BATCH_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+# Pengaturan pdfplumber untuk mendeteksi tabel item
+TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 5, # Toleransi ditingkatkan untuk mengatasi space lebar/garis tebal
+}
+
+# Backend ekstraksi: "pdfplumber" (default) atau "pdfium" (teks via pypdfium2, tabel via pdfplumber)
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "pdfplumber")
+
+# Halaman yang teksnya tidak berisi pola item tidak perlu ekstraksi tabel (backend pdfium)
+ITEM_TEXT_PATTERN = re.compile(r"Rp\s+[\d\.,]+\s+[x×]\s+[\d\.,]+", re.IGNORECASE)
+
+# Mode crop: tabel & teks hanya diekstrak dari region header, tabel item, summary, dan footer
+CROP_REGIONS = os.getenv("PARSER_CROP_REGIONS", "0").lower() in ("1", "true", "yes")
+
+# Minimal halaman per range saat satu PDF panjang dibagi ke beberapa worker
+# (setiap range membuka ulang PDF, jadi range yang terlalu kecil tidak sebanding)
+PAGE_RANGE_MIN_PAGES = int(os.getenv("PARSER_PAGE_RANGE_MIN_PAGES", "4"))
+
+# Perkiraan batas bawah ukuran PDF Coretax per halaman: file di bawah 2 × PAGE_RANGE_MIN_PAGES × nilai
+# ini tidak dihitung halamannya (tidak mungkin dibagi; faktur 1-2 halaman di sample_pdf/ 110-150 KB)
+PAGE_RANGE_BYTES_PER_PAGE = 16 * 1024
+
+# Margin (pt) di sekitar grid item saat halaman di-crop memakai template layout supplier
+TEMPLATE_CROP_MARGIN = 1
+
+# Pengaturan teks untuk assign karakter ke cell (sama dengan yang dipakai page.extract_table)
+TABLE_TEXT_SETTINGS = TableSettings.resolve(TABLE_SETTINGS).text_settings
+
+# Pengumpul waktu per tahap parsing (aktif hanya di dalam collect_stage_timings)
+_stage_local = threading.local()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Catat durasi satu tahap parsing jika sedang dalam collect_stage_timings"""
+    timings = getattr(_stage_local, "timings", None)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[Dict[str, float]]:
+    """
+    Kumpulkan durasi (detik) tiap tahap parsing di thread ini:
+    open, layout, text, table, items (process_item_buffer), metadata (regex).
+    """
+    previous = getattr(_stage_local, "timings", None)
+    timings: Dict[str, float] = {}
+    _stage_local.timings = timings
+    _stage_local.pages = 0
+    try:
+        yield timings
+    finally:
+        _stage_local.timings = previous
+
+
+def record_pages(count: int) -> None:
+    """Catat jumlah halaman yang dibaca parse terakhir (dipakai profile_parse)"""
+    _stage_local.pages = count
 
 
 def clean_number(num_str: str) -> float:
@@ -31,9 +114,50 @@ def format_idr(number: float) -> str:
     return f"{number:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
 
 
-def extract_invoice_metadata(full_text: str) -> Dict[str, Any]:
-    """Ekstrak metadata invoice (Nomor, Tanggal, Supplier, Pembeli)"""
-    metadata = {
+# Pola metadata Coretax (dipakai scanner satu kali jalan & implementasi regex referensi)
+MONTH_NAMES = "Januari|Februari|Maret|April|Mei|Juni|Juli|Agustus|September|Oktober|November|Desember"
+INVOICE_NUMBER_PATTERN = re.compile(r'(?:Kode dan )?Nomor Seri Faktur Pajak:\s*(\d+)')
+INVOICE_DATE_PATTERN = re.compile(rf'(\d{{1,2}}\s+(?:{MONTH_NAMES})\s+\d{{4}})')
+SUPPLIER_SECTION_PATTERN = re.compile(r'Pengusaha Kena Pajak:.*?Nama\s*:\s*([^\n]+).*?NPWP\s*:\s*([\d\.-]+)', re.DOTALL)
+BUYER_SECTION_PATTERN = re.compile(r'Pembeli Barang Kena Pajak.*?Nama\s*:\s*([^\n]+).*?NPWP\s*:\s*([\d\.-]+)', re.DOTALL)
+
+# Label section Coretax yang dicari scanner metadata (regex, dua karakter pertama literal)
+METADATA_LABELS = {
+    "invoice": r"Nomor Seri Faktur Pajak:",
+    "name": r"Nama\s*:",
+    "npwp": r"NPWP\s*:",
+    "supplier": r"Pengusaha Kena Pajak:",
+    "buyer": r"Pembeli Barang Kena Pajak",
+}
+
+
+def build_metadata_token_pattern() -> "re.Pattern":
+    """
+    Satu regex untuk semua label + "<bulan> <tahun>" (tanggal). Setiap token diawali dua
+    karakter dari set tetap sehingga regex engine langsung melewati posisi lain; lookbehind
+    memastikan sisa token cocok dengan dua karakter pertamanya. Token tidak saling overlap
+    (label tanpa digit, tanggal tanpa label), sehingga scan satu kali menemukan posisi yang
+    sama dengan re.search per pola.
+    """
+    months = MONTH_NAMES.split("|")
+    prefixes = [label[:2] for label in METADATA_LABELS.values()] + [month[:2] for month in months]
+    first_chars = "".join(sorted({prefix[0] for prefix in prefixes}))
+    second_chars = "".join(sorted({prefix[1] for prefix in prefixes}))
+
+    branches = [f"(?<={label[:2]})(?P<{kind}>{label[2:]})" for kind, label in METADATA_LABELS.items()]
+    month_branch = "|".join(f"(?<={month[:2]}){month[2:]}" for month in months)
+    branches.append(rf"(?P<month>(?:{month_branch})\s+\d{{4}})")
+    return re.compile(f"[{first_chars}][{second_chars}](?:{'|'.join(branches)})")
+
+
+METADATA_TOKEN_PATTERN = build_metadata_token_pattern()
+INVOICE_VALUE_PATTERN = re.compile(r'\s*(\d+)')
+NAME_VALUE_PATTERN = re.compile(r'\s*([^\n]+)')
+NPWP_VALUE_PATTERN = re.compile(r'\s*([\d\.-]+)')
+
+
+def empty_invoice_metadata() -> Dict[str, Any]:
+    return {
         "invoice_number": None,
         "invoice_date": None,
         "supplier_name": None,
@@ -41,28 +165,114 @@ def extract_invoice_metadata(full_text: str) -> Dict[str, Any]:
         "buyer_name": None,
         "buyer_npwp": None
     }
+
+
+def clean_npwp(npwp: str) -> str:
+    return npwp.replace('.', '').replace('-', '').strip()
+
+
+def extract_invoice_metadata_regex(full_text: str) -> Dict[str, Any]:
+    """
+    Implementasi referensi: satu re.search per field (section supplier/pembeli memakai
+    .*? DOTALL). Dipakai sebagai fallback scanner dan pembanding di benchmark.
+    """
+    metadata = empty_invoice_metadata()
     
     # 1. Kode dan Nomor Seri Faktur Pajak
-    invoice_match = re.search(r'(?:Kode dan )?Nomor Seri Faktur Pajak:\s*(\d+)', full_text)
+    invoice_match = INVOICE_NUMBER_PATTERN.search(full_text)
     if invoice_match:
         metadata["invoice_number"] = invoice_match.group(1)
     
     # 2. Tanggal Faktur (Contoh: 17 Januari 2025)
-    date_match = re.search(r'(\d{1,2}\s+(?:Januari|Februari|Maret|April|Mei|Juni|Juli|Agustus|September|Oktober|November|Desember)\s+\d{4})', full_text)
+    date_match = INVOICE_DATE_PATTERN.search(full_text)
     if date_match:
         metadata["invoice_date"] = date_match.group(1)
     
     # 3. Informasi Supplier (Pengusaha Kena Pajak)
-    supplier_section = re.search(r'Pengusaha Kena Pajak:.*?Nama\s*:\s*([^\n]+).*?NPWP\s*:\s*([\d\.-]+)', full_text, re.DOTALL)
+    supplier_section = SUPPLIER_SECTION_PATTERN.search(full_text)
     if supplier_section:
         metadata["supplier_name"] = supplier_section.group(1).strip()
-        metadata["supplier_npwp"] = supplier_section.group(2).replace('.', '').replace('-', '').strip()
+        metadata["supplier_npwp"] = clean_npwp(supplier_section.group(2))
     
     # 4. Informasi Pembeli (Buyer)
-    buyer_section = re.search(r'Pembeli Barang Kena Pajak.*?Nama\s*:\s*([^\n]+).*?NPWP\s*:\s*([\d\.-]+)', full_text, re.DOTALL)
+    buyer_section = BUYER_SECTION_PATTERN.search(full_text)
     if buyer_section:
         metadata["buyer_name"] = buyer_section.group(1).strip()
-        metadata["buyer_npwp"] = buyer_section.group(2).replace('.', '').replace('-', '').strip()
+        metadata["buyer_npwp"] = clean_npwp(buyer_section.group(2))
+    
+    return metadata
+
+
+def extract_invoice_metadata(full_text: str) -> Dict[str, Any]:
+    """
+    Ekstrak metadata invoice (Nomor, Tanggal, Supplier, Pembeli) dengan satu kali scan
+    token label Coretax; berhenti begitu semua field ditemukan.
+    Hasil sama dengan extract_invoice_metadata_regex. Section supplier/pembeli berjalan
+    sebagai state machine: label -> Nama pertama -> NPWP pertama setelah baris Nama.
+    """
+    metadata = empty_invoice_metadata()
+    
+    # Per section: [state, akhir baris Nama, nama]; state: label -> name -> npwp -> done
+    sections = {"supplier": ["label", 0, None], "buyer": ["label", 0, None]}
+    pending = 4
+    
+    for token in METADATA_TOKEN_PATTERN.finditer(full_text):
+        kind = token.lastgroup
+        
+        if kind == "invoice":
+            if metadata["invoice_number"] is None:
+                value = INVOICE_VALUE_PATTERN.match(full_text, token.end())
+                if value:
+                    metadata["invoice_number"] = value.group(1)
+                    pending -= 1
+        
+        elif kind == "month":
+            if metadata["invoice_date"] is None:
+                # Tanggal = 1-2 digit + whitespace tepat sebelum nama bulan
+                start = token.start()
+                while start > 0 and full_text[start - 1].isspace():
+                    start -= 1
+                digits = start
+                while digits > 0 and start - digits < 2 and full_text[digits - 1].isdecimal():
+                    digits -= 1
+                if start < token.start() and digits < start:
+                    metadata["invoice_date"] = full_text[digits:token.end()]
+                    pending -= 1
+        
+        elif kind in sections:
+            if sections[kind][0] == "label":
+                sections[kind][0] = "name"
+        
+        elif kind == "name":
+            value = None
+            for section in sections.values():
+                if section[0] == "name":
+                    value = value or NAME_VALUE_PATTERN.match(full_text, token.end())
+                    if value:
+                        section[0], section[1], section[2] = "npwp", value.end(), value.group(1)
+        
+        elif kind == "npwp":
+            value = None
+            for name, section in sections.items():
+                if section[0] == "npwp" and token.start() >= section[1]:
+                    value = value or NPWP_VALUE_PATTERN.match(full_text, token.end())
+                    if value:
+                        section[0] = "done"
+                        metadata[f"{name}_name"] = section[2].strip()
+                        metadata[f"{name}_npwp"] = clean_npwp(value.group(1))
+                        pending -= 1
+        
+        if pending == 0:
+            break
+    
+    # Baris Nama tanpa NPWP sesudahnya: regex asli bisa backtrack (NPWP di baris yang sama
+    # atau Nama berikutnya); kasus langka ini diserahkan ke pola regex referensi
+    for name, pattern in (("supplier", SUPPLIER_SECTION_PATTERN), ("buyer", BUYER_SECTION_PATTERN)):
+        if sections[name][0] == "npwp":
+            section = pattern.search(full_text)
+            if section:
+                metadata[f"{name}_name"] = section.group(1).strip()
+                metadata[f"{name}_npwp"] = clean_npwp(section.group(2))
     
     return metadata
 
@@ -122,128 +332,713 @@ def process_item_buffer(buffer: dict) -> List[dict]:
     return extracted
 
 
-def extract_invoice_data(pdf_file: BytesIO, filename: str = "invoice.pdf") -> Dict[str, Any]:
-    """Fungsi utama untuk mengekstrak data dari PDF ke Dictionary"""
+# Satu baris tabel item: (no, kode, detail, total) yang sudah di-strip
+ItemRow = Tuple[str, str, str, str]
+
+
+def table_item_rows(table: List[List[Any]]) -> List[ItemRow]:
+    """Ambil 4 kolom pertama setiap baris tabel item (baris dengan kurang dari 4 kolom dilewati)"""
+    rows = []
+    for row in table:
+        if not row or len(row) < 4: continue
+        rows.append((
+            str(row[0] or "").strip(),
+            str(row[1] or "").strip(),
+            str(row[2] or "").strip(),
+            str(row[3] or "").strip()
+        ))
+    return rows
+
+
+def extract_items_from_rows(rows: List[ItemRow]) -> List[dict]:
+    """
+    Ubah baris tabel item (urut dari halaman pertama) menjadi list item.
+    Baris lanjutan (multiline/space) digabung ke buffer item aktif sebelum diproses;
+    buffer tetap aktif melewati batas halaman sehingga item yang terpotong di akhir
+    halaman digabung dengan lanjutannya di halaman berikutnya.
+    """
     items_list = []
+    current_buffer = None
+
+    for no_val, code_val, detail_val, total_val in rows:
+        # Cek apakah ini awal item baru (kolom No berisi angka)
+        is_start = any(c.isdigit() for c in no_val) and len(no_val) < 10
+
+        if is_start:
+            # Jika ada item sebelumnya yang menggantung, proses dulu
+            if current_buffer:
+                with stage("items"):
+                    items_list.extend(process_item_buffer(current_buffer))
+            
+            current_buffer = {
+                "no": no_val,
+                "code": code_val,
+                "detail": detail_val,
+                "total_col": total_val
+            }
+        elif current_buffer:
+            # Baris lanjutan (multiline/space), gabungkan ke buffer yang aktif
+            if no_val: current_buffer["no"] += "\n" + no_val
+            if code_val: current_buffer["code"] += "\n" + code_val
+            if detail_val: current_buffer["detail"] += "\n" + detail_val
+            if total_val: current_buffer["total_col"] += "\n" + total_val
+
+    # Simpan buffer terakhir
+    if current_buffer:
+        with stage("items"):
+            items_list.extend(process_item_buffer(current_buffer))
+
+    return items_list
+
+
+def extract_items_from_table(table: List[List[Any]]) -> List[dict]:
+    """Ubah tabel item satu halaman (hasil extract_table) menjadi list item"""
+    return extract_items_from_rows(table_item_rows(table))
+
+
+def find_page_regions(page) -> Optional[Dict[str, Any]]:
+    """
+    Cari region penting di satu halaman dari geometri garis tabel (tanpa assign karakter):
+    - table       : objek Table yang sama dengan yang dipilih page.extract_table
+    - grid_top    : batas atas tabel item (baris header kolom "No." / baris item pertama)
+    - summary_top : batas atas blok "Harga Jual / Penggantian / Uang Muka / Termin" dst.
+    - bottom      : batas bawah tabel; di atas grid_top = header, di bawah bottom = footer
+    None jika halaman tidak memiliki tabel.
+    """
+    tables = page.find_tables(TABLE_SETTINGS)
+    if not tables:
+        return None
+
+    # Pilih tabel yang sama dengan page.extract_table (jumlah cell terbanyak)
+    table = sorted(tables, key=lambda t: (-len(t.cells), t.bbox[1], t.bbox[0]))[0]
+
+    # Baris header kolom item = baris pertama yang memiliki 4 cell terpisah
+    grid_top = None
+    summary_top = None
+    for row in table.rows:
+        if grid_top is None and len(row.cells) >= 4 and all(row.cells):
+            grid_top = row.bbox[1]
+        elif grid_top is not None and len(row.cells) >= 4 and row.cells[1] is None:
+            # Baris pertama setelah item yang kolom kode/nama-nya digabung = blok summary
+            summary_top = row.bbox[1]
+            break
+
+    return {
+        "table": table,
+        "grid_top": table.bbox[1] if grid_top is None else grid_top,
+        "summary_top": summary_top,
+        "bottom": table.bbox[3]
+    }
+
+
+def extract_page_content(
+    page,
+    crop_regions: bool = False,
+    include_text: bool = True,
+    layout: Optional["TableLayout"] = None
+) -> Tuple[str, Optional[List[List[Any]]]]:
+    """
+    Ekstrak teks dan tabel item dari satu halaman.
+    Mode crop: karakter halaman dibagi per region dalam satu kali iterasi; assign
+    karakter ke cell tabel hanya memakai karakter region tabel item, dan layout teks
+    hanya untuk region header/summary/footer (teks baris item tidak dibutuhkan).
+    include_text=False melewati layout teks (teks sudah didapat dari backend lain).
+    layout: template layout supplier untuk dokumen ini (tidak dipakai di mode crop).
+    """
+    with stage("layout"):
+        page.chars  # Parsing karakter pdfminer (dipakai bersama oleh teks & tabel)
+
+    with stage("table"):
+        regions = find_page_regions(page) if crop_regions else None
+    if not regions:
+        with stage("text"):
+            text = (page.extract_text() or "") if include_text else ""
+        with stage("table"):
+            if layout is not None:
+                layout.observe_text(text)
+                return text, layout.extract_table(page)
+            return text, page.extract_table(TABLE_SETTINGS)
+
+    grid_top = regions["grid_top"]
+    summary_top = regions["summary_top"]
+    bottom = regions["bottom"]
+
+    def region_of(char: dict) -> str:
+        # Posisi karakter ditentukan dari titik tengah vertikal (sama seperti Table.extract)
+        v_mid = (char["top"] + char["bottom"]) / 2
+        if v_mid < grid_top:
+            return "header"
+        if v_mid >= bottom:
+            return "footer"
+        if summary_top is not None and v_mid >= summary_top:
+            return "summary"
+        return "items"
+
+    region_chars: Dict[str, List[dict]] = {"header": [], "items": [], "summary": [], "footer": []}
+    for char in page.chars:
+        region_chars[region_of(char)].append(char)
+
+    # Tabel: cell di atas grid_top (metadata dalam kotak tabel) dibuang, karakter dibatasi region tabel
+    with stage("table"):
+        table_page = page.filter(lambda obj: obj.get("object_type") == "char" and region_of(obj) in ("items", "summary"))
+        table = Table(table_page, [cell for cell in regions["table"].cells if cell[1] >= grid_top])
+        table_rows = table.extract(**(TABLE_TEXT_SETTINGS or {}))
+
+    texts = []
+    with stage("text"):
+        for name in ("header", "summary", "footer"):
+            if include_text and region_chars[name]:
+                texts.append(chars_to_textmap(
+                    region_chars[name],
+                    x_shift=page.bbox[0],
+                    y_shift=page.bbox[1],
+                    layout_width=page.width,
+                    layout_height=page.height
+                ).as_string)
+
+    return "\n".join(texts), table_rows
+
+
+def table_template(regions: Dict[str, Any], table_rows: List[List[Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Template layout dari tabel hasil deteksi penuh di halaman pertama: garis kolom dan bbox
+    grid item, plus isi baris header kolom. None jika halaman tidak memiliki grid item.
+    """
+    table = regions["table"]
+    for index, row in enumerate(table.rows):
+        if len(row.cells) >= 4 and all(row.cells):
+            return {
+                "columns": [cell[0] for cell in row.cells] + [row.cells[-1][2]],
+                "bbox": [table.bbox[0], row.bbox[1], table.bbox[2], table.bbox[3]],
+                "header": table_rows[index]
+            }
+    return None
+
+
+def extract_template_table(page, template: Dict[str, Any], first_page: bool) -> Optional[List[List[Any]]]:
+    """
+    Ekstrak tabel item dengan garis kolom eksplisit dari template, hanya di region grid:
+    atas = garis vertikal kolom kedua (hanya ada di grid item), bawah = garis vertikal
+    kolom terakhir (termasuk blok summary). Cell yang di halaman aslinya digabung (baris
+    summary) digabung lagi berdasarkan garis vertikal halaman, sehingga isi tabel sama
+    dengan deteksi penuh. None jika halaman tidak cocok dengan template.
+    """
+    columns = template["columns"]
+    tolerance = TABLE_SETTINGS["snap_tolerance"]
+
+    def edges_at(x: float) -> List[dict]:
+        return [edge for edge in page.vertical_edges if abs(edge["x0"] - x) <= tolerance]
+
+    def has_line(edges: List[dict], top: float, bottom: float) -> bool:
+        return any(edge["top"] <= top + tolerance and edge["bottom"] >= bottom - tolerance for edge in edges)
+
+    column_edges = [edges_at(x) for x in columns[1:-1]]
+    if not column_edges[0] or not column_edges[-1]:
+        return None
+
+    x0, top, x1, bottom = page.bbox
+    region = page.crop((
+        max(x0, columns[0] - TEMPLATE_CROP_MARGIN),
+        max(top, min(edge["top"] for edge in column_edges[0]) - TEMPLATE_CROP_MARGIN),
+        min(x1, columns[-1] + TEMPLATE_CROP_MARGIN),
+        min(bottom, max(edge["bottom"] for edge in column_edges[-1]) + TEMPLATE_CROP_MARGIN)
+    ))
+    tables = region.find_tables({
+        "vertical_strategy": "explicit",
+        "explicit_vertical_lines": columns,
+        "horizontal_strategy": "lines",
+        "snap_tolerance": tolerance
+    })
+    if not tables:
+        return None
+    grid = sorted(tables, key=lambda t: (-len(t.cells), t.bbox[1], t.bbox[0]))[0]
+
+    cells = []
+    for row in grid.rows:
+        if len(row.cells) != len(columns) - 1 or not all(row.cells):
+            return None
+        row_top, row_bottom = row.bbox[1], row.bbox[3]
+        merged = list(row.cells[0])
+        for cell, edges in zip(row.cells[1:], column_edges):
+            if has_line(edges, row_top, row_bottom):
+                cells.append(tuple(merged))
+                merged = list(cell)
+            else:
+                merged[2] = cell[2]
+        cells.append(tuple(merged))
+
+    table_rows = Table(region, cells).extract(**(TABLE_TEXT_SETTINGS or {}))
+    # Halaman pertama: crop harus dimulai tepat di baris header kolom
+    if not table_rows or (first_page and table_rows[0] != template["header"]):
+        return None
+    return table_rows
+
+
+class TableLayout:
+    """
+    Template layout tabel item untuk satu dokumen (lihat layout_templates.py).
+    NPWP supplier dibaca dari teks halaman pertama. Jika supplier sudah punya template,
+    tabel diekstrak dengan extract_template_table (deteksi penuh jika halaman tidak cocok);
+    jika belum, geometri halaman pertama dicatat sebagai kandidat template.
+    """
+
+    def __init__(self, store, use_template: bool = True):
+        self.store = store
+        self.use_template = use_template
+        self.supplier_npwp: Optional[str] = None
+        self.template: Optional[Dict[str, Any]] = None
+        self.candidate: Optional[Dict[str, Any]] = None
+        self.used = False
+
+    def observe_text(self, text: str) -> None:
+        """Cari NPWP supplier di teks halaman (sekali per dokumen) lalu ambil template-nya"""
+        if self.supplier_npwp is not None:
+            return
+        section = SUPPLIER_SECTION_PATTERN.search(text)
+        if section:
+            self.supplier_npwp = clean_npwp(section.group(2))
+            if self.use_template:
+                self.template = self.store.get(self.supplier_npwp)
+
+    def extract_table(self, page) -> Optional[List[List[Any]]]:
+        """Tabel item halaman: via template jika cocok, selain itu deteksi penuh (sama dengan page.extract_table)"""
+        first_page = page.page_number == 1
+        if self.template is not None:
+            table_rows = extract_template_table(page, self.template, first_page)
+            if table_rows is not None:
+                self.used = True
+                return table_rows
+
+        regions = find_page_regions(page)
+        if not regions:
+            return None
+        table_rows = regions["table"].extract(**(TABLE_TEXT_SETTINGS or {}))
+        if first_page and self.supplier_npwp and self.template is None:
+            self.candidate = table_template(regions, table_rows)
+        return table_rows
+
+    def save(self, result: Dict[str, Any]) -> None:
+        """Simpan kandidat template hanya dari faktur yang lolos validasi total"""
+        if self.candidate is not None and result["validation"]["is_valid"]:
+            self.store.put(self.supplier_npwp, self.candidate)
+
+
+def page_numbers(pages: Optional[range]) -> Optional[List[int]]:
+    """Range index halaman (mulai 0) -> nomor halaman untuk pdfplumber.open (mulai 1)"""
+    return None if pages is None else [index + 1 for index in pages]
+
+
+class PdfplumberBackend:
+    """Backend default: teks dan tabel dari pdfplumber/pdfminer"""
+
+    name = "pdfplumber"
+
+    def iter_page_texts(self, pdf_file: BinaryIO) -> Iterator[str]:
+        """Yield teks setiap halaman secara berurutan"""
+        with stage("open"):
+            pdf = pdfplumber.open(pdf_file)
+        with pdf:
+            for page in pdf.pages:
+                with stage("layout"):
+                    page.chars
+                with stage("text"):
+                    text = page.extract_text() or ""
+                page.flush_cache()
+                yield text
+
+    def iter_pages(
+        self,
+        pdf_file: BinaryIO,
+        crop_regions: bool = False,
+        pages: Optional[range] = None,
+        layout: Optional[TableLayout] = None
+    ) -> Iterator[Tuple[str, Optional[List[List[Any]]]]]:
+        """
+        Yield (teks, tabel) setiap halaman (atau hanya halaman di range pages, index 0).
+        Single pass: setiap halaman di-layout sekali, dipakai untuk teks dan tabel,
+        lalu cache objek halaman langsung dibuang.
+        """
+        with stage("open"):
+            pdf = pdfplumber.open(pdf_file, pages=page_numbers(pages))
+        with pdf:
+            for page in pdf.pages:
+                text, table = extract_page_content(page, crop_regions, layout=layout)
+                page.flush_cache()
+                yield text, table
+
+
+class PdfiumBackend:
+    """
+    Backend cepat: teks (metadata & total summary) dari pypdfium2 (engine native).
+    pdfplumber hanya dibuka untuk geometri tabel, dan hanya pada halaman yang
+    teksnya berisi pola item ("Rp <harga> x <qty>").
+    """
+
+    name = "pdfium"
+
+    # pdfium tidak thread-safe; kunci dipakai jika parser berjalan di thread pool
+    _lock = threading.Lock()
+
+    def iter_page_texts(self, pdf_file: BinaryIO, pages: Optional[range] = None) -> Iterator[str]:
+        """Yield teks setiap halaman (atau hanya halaman di range pages) secara berurutan"""
+        import pypdfium2 as pdfium
+
+        with self._lock:
+            with stage("open"):
+                pdf = pdfium.PdfDocument(pdf_file)
+            try:
+                texts = []
+                with stage("text"):
+                    for index in (range(len(pdf)) if pages is None else pages):
+                        page = pdf[index]
+                        textpage = page.get_textpage()
+                        texts.append(textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n"))
+                        textpage.close()
+                        page.close()
+            finally:
+                pdf.close()
+
+        yield from texts
+
+    def iter_pages(
+        self,
+        pdf_file: BinaryIO,
+        crop_regions: bool = False,
+        pages: Optional[range] = None,
+        layout: Optional[TableLayout] = None
+    ) -> Iterator[Tuple[str, Optional[List[List[Any]]]]]:
+        """Yield (teks, tabel) setiap halaman (atau halaman di range pages); tabel None untuk halaman tanpa item"""
+        texts = list(self.iter_page_texts(pdf_file, pages))
+        pdf_file.seek(0)
+
+        with stage("open"):
+            pdf = pdfplumber.open(pdf_file, pages=page_numbers(pages))
+        with pdf:
+            for page, text in zip(pdf.pages, texts):
+                table = None
+                if layout is not None:
+                    layout.observe_text(text)
+                if ITEM_TEXT_PATTERN.search(text):
+                    _, table = extract_page_content(page, crop_regions, include_text=False, layout=layout)
+                    page.flush_cache()
+                yield text, table
+
+
+BACKENDS = {
+    PdfplumberBackend.name: PdfplumberBackend(),
+    PdfiumBackend.name: PdfiumBackend()
+}
+
+
+def get_backend(name: Optional[str] = None):
+    """Ambil backend ekstraksi berdasarkan nama (default: PARSER_BACKEND)"""
+    name = name or PARSER_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: '{name}'. Pilihan: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def error_result(filename: str, error: Exception) -> Dict[str, Any]:
+    """Hasil parse gagal (bentuk sama dengan hasil sukses, tanpa data)"""
+    return {
+        "status": "error",
+        "filename": filename,
+        "error": str(error),
+        "error_type": type(error).__name__,
+        "metadata": {},
+        "items": [],
+        "total_items": 0,
+        "validation": None
+    }
+
+
+def build_invoice_result(filename: str, page_texts: List[str], item_rows: List[ItemRow]) -> Dict[str, Any]:
+    """Susun hasil parse dari teks semua halaman dan baris tabel item (urut halaman)"""
+    items_list = extract_items_from_rows(item_rows)
     pdf_summary_total = 0.0
+
+    record_pages(len(page_texts))
+    full_text = "".join(text + "\n" for text in page_texts)
+    
+    with stage("metadata"):
+        # Ekstrak Metadata
+        metadata = extract_invoice_metadata(full_text)
+        
+        # Ekstrak Total DPP dari teks summary (bawah tabel)
+        total_match = re.search(r'Harga Jual / Penggantian / Uang Muka / Termin\s+([\d\.,]+)', full_text)
+    if total_match:
+        pdf_summary_total = clean_number(total_match.group(1))
+
+    # Kalkulasi Total dari semua item yang ditemukan
+    calculated_sum = sum(item['total'] for item in items_list)
+    is_valid = abs(calculated_sum - pdf_summary_total) < 2.0
+    
+    return {
+        "status": "success",
+        "filename": filename,
+        "metadata": metadata,
+        "items": items_list,
+        "total_items": len(items_list),
+        "validation": {
+            "calculated_total": calculated_sum,
+            "calculated_total_formatted": f"Rp {format_idr(calculated_sum)}",
+            "pdf_total": pdf_summary_total,
+            "pdf_total_formatted": f"Rp {format_idr(pdf_summary_total)}",
+            "is_valid": is_valid,
+            "difference": abs(calculated_sum - pdf_summary_total),
+            "difference_formatted": f"Rp {format_idr(abs(calculated_sum - pdf_summary_total))}"
+        }
+    }
+
+
+def extract_page_rows(
+    pdf_file: BinaryIO,
+    crop_regions: Optional[bool] = None,
+    backend: Optional[str] = None,
+    pages: Optional[range] = None,
+    layout: Optional[TableLayout] = None
+) -> Tuple[List[str], List[ItemRow]]:
+    """
+    Ekstrak teks dan baris tabel item dari semua halaman (atau halaman di range pages).
+    Kembalikan (teks per halaman, baris item berurutan); buffer item belum diproses
+    agar hasil beberapa range halaman bisa digabung dulu sebelum extract_items_from_rows.
+    """
+    crop_regions = CROP_REGIONS if crop_regions is None else crop_regions
+    page_texts = []
+    item_rows = []
+    for text, table in get_backend(backend).iter_pages(pdf_file, crop_regions, pages, layout):
+        page_texts.append(text)
+        if table:
+            item_rows.extend(table_item_rows(table))
+    return page_texts, item_rows
+
+
+def extract_invoice_data(
+    pdf_file: BinaryIO,
+    filename: str = "invoice.pdf",
+    crop_regions: Optional[bool] = None,
+    backend: Optional[str] = None,
+    use_templates: bool = True
+) -> Dict[str, Any]:
+    """
+    Fungsi utama untuk mengekstrak data dari PDF ke Dictionary.
+    crop_regions=True mengaktifkan mode crop (default: PARSER_CROP_REGIONS).
+    backend memilih engine ekstraksi (default: PARSER_BACKEND).
+    Di luar mode crop, tabel diekstrak dengan template layout supplier jika tersedia
+    (layout_templates.py, use_templates=False untuk selalu deteksi penuh); faktur yang
+    tidak lolos validasi total dengan template diparse ulang dengan deteksi tabel penuh.
+    """
+    crop_regions = CROP_REGIONS if crop_regions is None else crop_regions
+    templates = layout_templates if use_templates and not crop_regions else None
+    try:
+        layout = TableLayout(templates) if templates is not None else None
+        page_texts, item_rows = extract_page_rows(pdf_file, crop_regions, backend, layout=layout)
+        result = build_invoice_result(filename, page_texts, item_rows)
+
+        if layout is not None and layout.used and not result["validation"]["is_valid"]:
+            # Template tidak cocok dengan faktur ini: ulangi dengan deteksi penuh (template diperbarui jika valid)
+            pdf_file.seek(0)
+            layout = TableLayout(templates, use_template=False)
+            page_texts, item_rows = extract_page_rows(pdf_file, crop_regions, backend, layout=layout)
+            result = build_invoice_result(filename, page_texts, item_rows)
+        if layout is not None:
+            layout.save(result)
+        return result
+    except Exception as e:
+        return error_result(filename, e)
+
+
+def extract_metadata_only(
+    pdf_file: BinaryIO,
+    filename: str = "invoice.pdf",
+    backend: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Fast path: hanya ekstrak metadata (tanpa tabel & item).
+    Halaman dibaca berurutan dan berhenti begitu semua field metadata ditemukan,
+    sehingga hasilnya sama dengan metadata dari extract_invoice_data.
+    """
     metadata = {}
+    pages_scanned = 0
     
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            full_text = ""
-            for page in pdf.pages:
-                full_text += (page.extract_text() or "") + "\n"
+        full_text = ""
+        page_texts = get_backend(backend).iter_page_texts(pdf_file)
+        for text in page_texts:
+            full_text += text + "\n"
+            pages_scanned += 1
             
-            # Ekstrak Metadata
+            with stage("metadata"):
+                metadata = extract_invoice_metadata(full_text)
+            if all(value is not None for value in metadata.values()):
+                break
+        page_texts.close()
+        record_pages(pages_scanned)
+        
+        if not metadata:
             metadata = extract_invoice_metadata(full_text)
-            
-            # Pengolahan Tabel per Halaman
-            for page in pdf.pages:
-                table = page.extract_table({
-                    "vertical_strategy": "lines",
-                    "horizontal_strategy": "lines",
-                    "snap_tolerance": 5, # Toleransi ditingkatkan untuk mengatasi space lebar/garis tebal
-                })
-                
-                if not table: continue
-
-                current_buffer = None
-
-                for row in table:
-                    if not row or len(row) < 4: continue
-                    
-                    # Ambil data mentah per kolom
-                    no_val = str(row[0] or "").strip()
-                    code_val = str(row[1] or "").strip()
-                    detail_val = str(row[2] or "").strip()
-                    total_val = str(row[3] or "").strip()
-
-                    # Cek apakah ini awal item baru (kolom No berisi angka)
-                    is_start = any(c.isdigit() for c in no_val) and len(no_val) < 10
-
-                    if is_start:
-                        # Jika ada item sebelumnya yang menggantung, proses dulu
-                        if current_buffer:
-                            items_list.extend(process_item_buffer(current_buffer))
-                        
-                        current_buffer = {
-                            "no": no_val,
-                            "code": code_val,
-                            "detail": detail_val,
-                            "total_col": total_val
-                        }
-                    elif current_buffer:
-                        # Baris lanjutan (multiline/space), gabungkan ke buffer yang aktif
-                        if no_val: current_buffer["no"] += "\n" + no_val
-                        if code_val: current_buffer["code"] += "\n" + code_val
-                        if detail_val: current_buffer["detail"] += "\n" + detail_val
-                        if total_val: current_buffer["total_col"] += "\n" + total_val
-
-                # Simpan buffer terakhir di setiap halaman
-                if current_buffer:
-                    items_list.extend(process_item_buffer(current_buffer))
-            
-            # Ekstrak Total DPP dari teks summary (bawah tabel)
-            total_match = re.search(r'Harga Jual / Penggantian / Uang Muka / Termin\s+([\d\.,]+)', full_text)
-            if total_match:
-                pdf_summary_total = clean_number(total_match.group(1))
-
-        # Kalkulasi Total dari semua item yang ditemukan
-        calculated_sum = sum(item['total'] for item in items_list)
-        is_valid = abs(calculated_sum - pdf_summary_total) < 2.0
         
         return {
             "status": "success",
             "filename": filename,
             "metadata": metadata,
-            "items": items_list,
-            "total_items": len(items_list),
-            "validation": {
-                "calculated_total": calculated_sum,
-                "calculated_total_formatted": f"Rp {format_idr(calculated_sum)}",
-                "pdf_total": pdf_summary_total,
-                "pdf_total_formatted": f"Rp {format_idr(pdf_summary_total)}",
-                "is_valid": is_valid,
-                "difference": abs(calculated_sum - pdf_summary_total),
-                "difference_formatted": f"Rp {format_idr(abs(calculated_sum - pdf_summary_total))}"
-            }
+            "pages_scanned": pages_scanned
         }
         
     except Exception as e:
-        return {
-            "status": "error",
-            "filename": filename,
-            "error": str(e),
-            "metadata": {},
-            "items": [],
-            "total_items": 0,
-            "validation": None
-        }
+        return dict(error_result(filename, e), pages_scanned=pages_scanned)
+
 
+@contextmanager
+def open_pdf_source(file_content: Union[bytes, str]) -> Iterator[BinaryIO]:
+    """
+    Buka isi PDF sebagai file object: bytes dibungkus BytesIO (tanpa salinan),
+    str dianggap path file (upload besar yang di-spool ke disk) dan dibaca langsung dari disk.
+    """
+    if isinstance(file_content, str):
+        with open(file_content, "rb") as f:
+            yield f
+    else:
+        yield BytesIO(file_content)
 
-def parse_pdf_file(file_content: bytes, filename: str) -> Dict[str, Any]:
-    """Wrapper untuk memproses satu file PDF dari bytes"""
-    return extract_invoice_data(BytesIO(file_content), filename)
 
+def parse_pdf_file(file_content: Union[bytes, str], filename: str, use_templates: bool = True) -> Dict[str, Any]:
+    """Wrapper untuk memproses satu file PDF dari bytes atau path file"""
+    with open_pdf_source(file_content) as pdf_file:
+        return extract_invoice_data(pdf_file, filename, use_templates=use_templates)
+
+
+def parse_pdf_metadata(file_content: Union[bytes, str], filename: str) -> Dict[str, Any]:
+    """Wrapper fast path metadata-only untuk satu file PDF dari bytes atau path file"""
+    with open_pdf_source(file_content) as pdf_file:
+        return extract_metadata_only(pdf_file, filename)
+
+
+def count_pages(file_content: Union[bytes, str]) -> int:
+    """Jumlah halaman PDF (via pypdfium2, tanpa layout halaman)"""
+    import pypdfium2 as pdfium
+
+    with open_pdf_source(file_content) as pdf_file, PdfiumBackend._lock:
+        pdf = pdfium.PdfDocument(pdf_file)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def plan_page_ranges(page_count: int, workers: int) -> List[range]:
+    """
+    Bagi halaman menjadi range berurutan untuk maksimal `workers` proses, masing-masing
+    minimal PAGE_RANGE_MIN_PAGES halaman. List kosong jika dokumen tidak perlu dibagi.
+    """
+    parts = min(workers, page_count // max(1, PAGE_RANGE_MIN_PAGES))
+    if parts < 2:
+        return []
+
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for index in range(parts):
+        stop = start + size + (1 if index < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def split_page_ranges(file_content: Union[bytes, str], workers: int) -> List[range]:
+    """
+    Range halaman untuk parse paralel satu PDF. File yang terlalu kecil untuk mencapai
+    2 × PAGE_RANGE_MIN_PAGES halaman tidak dibuka sama sekali; PDF rusak tidak dibagi
+    (error dilaporkan parse biasa).
+    """
+    import pypdfium2 as pdfium
+
+    size = os.path.getsize(file_content) if isinstance(file_content, str) else len(file_content)
+    if workers < 2 or size < 2 * PAGE_RANGE_MIN_PAGES * PAGE_RANGE_BYTES_PER_PAGE:
+        return []
+    try:
+        return plan_page_ranges(count_pages(file_content), workers)
+    except pdfium.PdfiumError:
+        return []
+
+
+def extract_page_range(
+    file_content: Union[bytes, str],
+    pages: range
+) -> Tuple[List[str], List[ItemRow], Dict[str, float]]:
+    """
+    Ekstrak satu range halaman (dijalankan di proses worker).
+    Kembalikan (teks per halaman, baris tabel item, waktu per tahap) untuk merge_page_ranges.
+    """
+    with collect_stage_timings() as timings:
+        with open_pdf_source(file_content) as pdf_file:
+            page_texts, item_rows = extract_page_rows(pdf_file, pages=pages)
+    return page_texts, item_rows, timings
+
+
+def merge_page_ranges(
+    filename: str,
+    parts: List[Tuple[List[str], List[ItemRow], Dict[str, float]]]
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Gabungkan hasil extract_page_range (urut halaman) menjadi satu hasil parse.
+    Baris item digabung sebelum buffer diproses, sehingga item yang terpotong di batas
+    range tetap utuh. Kembalikan (hasil, waktu per tahap dijumlah dari semua worker).
+    """
+    with collect_stage_timings() as timings:
+        try:
+            result = build_invoice_result(
+                filename,
+                [text for page_texts, _, _ in parts for text in page_texts],
+                [row for _, item_rows, _ in parts for row in item_rows]
+            )
+        except Exception as e:
+            result = error_result(filename, e)
+
+    for _, _, part_timings in parts:
+        for name, seconds in part_timings.items():
+            timings[name] = timings.get(name, 0.0) + seconds
+    return result, timings
+
+
+def parse_pdf_file_split(
+    file_content: Union[bytes, str],
+    filename: str,
+    executor: Executor,
+    ranges: List[range]
+) -> Dict[str, Any]:
+    """Parse satu PDF dengan setiap range halaman (dari split_page_ranges) dikerjakan paralel di executor"""
+    try:
+        parts = list(executor.map(extract_page_range, [file_content] * len(ranges), ranges))
+    except Exception as e:
+        return error_result(filename, e)
+    return merge_page_ranges(filename, parts)[0]
+
+
+def profile_parse(parse_func, file_content: bytes, filename: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Jalankan fungsi parse (parse_pdf_file / parse_pdf_metadata) sambil mengukur waktu
+    total, waktu per tahap, dan jumlah halaman. Mengembalikan (hasil, profile).
+    """
+    with collect_stage_timings() as timings:
+        start = time.perf_counter()
+        result = parse_func(file_content, filename)
+        total = time.perf_counter() - start
+        pages = _stage_local.pages
+
+    return result, {"total": total, "stages": timings, "pages": pages}
+
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Susun ringkasan batch (total sukses/gagal/duplikat) dari list hasil parsing"""
+    total_success = sum(1 for result in results if result["status"] == "success")
+    total_duplicate = sum(1 for result in results if result["status"] == "duplicate")
 
-def parse_multiple_pdfs(files: List[tuple]) -> Dict[str, Any]:
-    """Wrapper untuk memproses banyak file sekaligus"""
-    results = []
-    total_success = 0
-    total_failed = 0
-    
-    for filename, file_content in files:
-        result = parse_pdf_file(file_content, filename)
-        results.append(result)
-        if result["status"] == "success":
-            total_success += 1
-        else:
-            total_failed += 1
-    
     return {
         "status": "completed",
-        "total_files": len(files),
+        "total_files": len(results),
         "total_success": total_success,
-        "total_failed": total_failed,
+        "total_failed": len(results) - total_success - total_duplicate,
+        "total_duplicate": total_duplicate,
         "results": results
-    }
\ No newline at end of file
+    }
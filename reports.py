@@ -0,0 +1,236 @@
+"""
+Aggregate Report Module
+Agregasi hasil parse batch di sisi server (menggantikan loop PHP atas ribuan items):
+- total per supplier (NPWP), per item_code, dan per bulan faktur
+- rollup validasi: jumlah calculated_total, pdf_total, validation.difference, faktur valid/tidak valid
+
+Data dimuat sebagai kolom (dari list hasil parse lewat export.flatten_results, atau langsung dari
+invoice store) lalu di-group dengan NumPy (np.unique + np.bincount). NumPy opsional: tanpa NumPy
+dipakai fallback Python murni dengan hasil yang sama.
+
+Pemakaian CLI:
+    python reports.py hasil.jsonl                 # output main.py (JSONL) atau JSON /parse-multiple
+    python reports.py --store --date-from 2025-11-01 --date-to 2025-11-30
+    python reports.py hasil.jsonl --json
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tabulate import tabulate
+
+from export import flatten_results
+from invoice_store import iso_date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Kolom dict-of-lists yang dipakai aggregate_columns
+Columns = Dict[str, List[Any]]
+
+
+def group_sums(keys: Sequence[Any], values: Dict[str, Sequence[Any]]) -> Tuple[List[Any], List[int], Dict[str, List[float]]]:
+    """
+    Group-by keys: kembalikan (key unik terurut, jumlah baris per key, jumlah tiap kolom nilai per key).
+    Key None dikelompokkan sebagai "" dan nilai None dihitung 0.
+    """
+    if np is not None:
+        key_array = np.array(["" if key is None else str(key) for key in keys], dtype=str)
+        unique, inverse = np.unique(key_array, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(unique))
+        sums = {
+            name: np.bincount(
+                inverse,
+                weights=np.fromiter((value or 0.0 for value in column), dtype=np.float64, count=len(column)),
+                minlength=len(unique)
+            ).tolist()
+            for name, column in values.items()
+        }
+        return unique.tolist(), counts.tolist(), sums
+
+    groups: Dict[str, List[float]] = {}
+    names = list(values)
+    for index, key in enumerate(keys):
+        key = "" if key is None else str(key)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0] + [0.0] * len(names)
+        group[0] += 1
+        for position, name in enumerate(names, start=1):
+            group[position] += values[name][index] or 0.0
+
+    unique = sorted(groups)
+    counts = [groups[key][0] for key in unique]
+    sums = {name: [groups[key][position] for key in unique] for position, name in enumerate(names, start=1)}
+    return unique, counts, sums
+
+
+def column_sum(column: Sequence[Any]) -> float:
+    if np is not None:
+        return float(np.fromiter((value or 0.0 for value in column), dtype=np.float64, count=len(column)).sum())
+    return float(sum(value or 0.0 for value in column))
+
+
+def first_values(keys: Sequence[Any], labels: Sequence[Any]) -> Dict[str, Any]:
+    """Label pertama untuk setiap key (mis. nama supplier per NPWP)"""
+    first: Dict[str, Any] = {}
+    for key, label in zip(keys, labels):
+        first.setdefault("" if key is None else str(key), label)
+    return first
+
+
+def rows_by_total(
+    key_name: str,
+    keys: List[str],
+    count_name: str,
+    counts: List[int],
+    sums: Dict[str, List[float]],
+    labels: Optional[Tuple[str, Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Susun baris group-by, diurutkan dari total terbesar"""
+    rows = []
+    for index, key in enumerate(keys):
+        row: Dict[str, Any] = {key_name: key or None}
+        if labels:
+            row[labels[0]] = labels[1].get(key)
+        row[count_name] = counts[index]
+        for name, column in sums.items():
+            row[name] = round(column[index], 2)
+        rows.append(row)
+    rows.sort(key=lambda row: row["total"], reverse=True)
+    return rows
+
+
+def aggregate_columns(invoices: Columns, items: Columns, failed: int = 0) -> Dict[str, Any]:
+    """
+    Hitung laporan dari kolom invoices (supplier_npwp, supplier_name, month, calculated_total,
+    pdf_total, difference, is_valid) dan items (item_code, nama_barang, quantity, total).
+    failed = jumlah file yang gagal diparse (tidak ikut diagregasi).
+    """
+    totals = {"total": invoices["calculated_total"]}
+
+    suppliers, supplier_counts, supplier_sums = group_sums(invoices["supplier_npwp"], totals)
+    months, month_counts, month_sums = group_sums(invoices["month"], totals)
+    codes, code_counts, code_sums = group_sums(
+        items["item_code"], {"quantity": items["quantity"], "total": items["total"]}
+    )
+
+    is_valid = invoices["is_valid"]
+    valid = sum(1 for value in is_valid if value)
+    return {
+        "total_invoices": len(is_valid),
+        "total_failed": failed,
+        "total_items": len(items["item_code"]),
+        "by_supplier": rows_by_total(
+            "supplier_npwp", suppliers, "invoices", supplier_counts, supplier_sums,
+            ("supplier_name", first_values(invoices["supplier_npwp"], invoices["supplier_name"]))
+        ),
+        "by_item_code": rows_by_total(
+            "item_code", codes, "items", code_counts, code_sums,
+            ("nama_barang", first_values(items["item_code"], items["nama_barang"]))
+        ),
+        "by_month": sorted(
+            rows_by_total("month", months, "invoices", month_counts, month_sums),
+            key=lambda row: row["month"] or ""
+        ),
+        "validation": {
+            "calculated_total": round(column_sum(invoices["calculated_total"]), 2),
+            "pdf_total": round(column_sum(invoices["pdf_total"]), 2),
+            "difference_total": round(column_sum(invoices["difference"]), 2),
+            "valid": valid,
+            "invalid": len(is_valid) - valid
+        }
+    }
+
+
+def columns_from_results(results: List[Dict[str, Any]]) -> Tuple[Columns, Columns]:
+    """Kolom invoices & items dari list hasil parse (bentuk sama dengan tabel export.py) + kolom month"""
+    invoices, items = flatten_results(results)
+    invoices["month"] = [(iso_date(value) or "")[:7] or None for value in invoices["invoice_date"]]
+    return invoices, items
+
+
+def aggregate_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Laporan agregat dari list hasil parse (mis. field results dari /parse-multiple).
+    Hanya hasil sukses yang dihitung; error dan duplicate (sudah pernah diimport) tidak.
+    """
+    parsed = [result for result in results if result.get("status") == "success" and result.get("validation")]
+    duplicates = sum(1 for result in results if result.get("status") == "duplicate")
+    return aggregate_columns(*columns_from_results(parsed), failed=len(results) - duplicates - len(parsed))
+
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    """Baca hasil parse dari JSONL (output main.py) atau JSON (response /parse-multiple atau list)"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        content = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(content, dict):
+        return content.get("results", [content])
+    return content
+
+
+def print_report(report: Dict[str, Any], limit: int) -> None:
+    print(f"Faktur: {report['total_invoices']} (gagal {report['total_failed']}), item: {report['total_items']}")
+    for title, key in (("PER SUPPLIER", "by_supplier"), ("PER ITEM CODE", "by_item_code"), ("PER BULAN", "by_month")):
+        rows = report[key][:limit]
+        print(f"\n{title}")
+        print(tabulate(rows, headers="keys", tablefmt="simple", floatfmt=",.2f"))
+    print("\nVALIDASI")
+    print(tabulate(
+        [[name, f"{value:,.2f}" if isinstance(value, float) else value] for name, value in report["validation"].items()],
+        tablefmt="plain"
+    ))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Laporan agregat hasil parse Faktur Pajak Coretax")
+    arg_parser.add_argument("paths", nargs="*", help="File JSONL/JSON hasil parse")
+    arg_parser.add_argument("--store", action="store_true", help="Agregasi dari invoice store (INVOICE_STORE_PATH)")
+    arg_parser.add_argument("--supplier-npwp")
+    arg_parser.add_argument("--buyer-npwp")
+    arg_parser.add_argument("--date-from", help="YYYY-MM-DD (hanya --store)")
+    arg_parser.add_argument("--date-to", help="YYYY-MM-DD (hanya --store)")
+    arg_parser.add_argument("--limit", type=int, default=20, help="Maksimal baris per tabel (default: 20)")
+    arg_parser.add_argument("--json", action="store_true", help="Output JSON lengkap")
+    args = arg_parser.parse_args(argv)
+
+    if args.store:
+        from invoice_store import invoice_store
+        if invoice_store is None:
+            print("Invoice store nonaktif (INVOICE_STORE_PATH kosong)", file=sys.stderr)
+            return 1
+        report = aggregate_columns(*invoice_store.report_columns({
+            "supplier_npwp": args.supplier_npwp,
+            "buyer_npwp": args.buyer_npwp,
+            "date_from": args.date_from,
+            "date_to": args.date_to
+        }))
+    elif args.paths:
+        results = [result for path in args.paths for result in load_results(path)]
+        if args.supplier_npwp or args.buyer_npwp:
+            results = [
+                result for result in results
+                if (not args.supplier_npwp or (result.get("metadata") or {}).get("supplier_npwp") == args.supplier_npwp)
+                and (not args.buyer_npwp or (result.get("metadata") or {}).get("buyer_npwp") == args.buyer_npwp)
+            ]
+        report = aggregate_results(results)
+    else:
+        arg_parser.error("isi path file hasil parse atau gunakan --store")
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Response Serialization Module
+- Format response: "full" (default, termasuk field *_formatted), "compact" (hanya angka),
+  "columnar" (compact + items dalam bentuk kolom)
+- Encoder JSON cepat (orjson jika terinstall, fallback ke json stdlib)
+- Kompresi gzip/brotli dinegosiasikan dari header Accept-Encoding untuk body di atas
+  RESPONSE_COMPRESS_MIN_BYTES (brotli hanya jika package brotli terinstall); body besar
+  dikompres di thread pool agar event loop tidak tertahan
+
+Konfigurasi via environment variable:
+- RESPONSE_COMPRESS_MIN_BYTES : ukuran minimal body (byte) yang dikompres (default: 1024, 0 = nonaktif)
+"""
+
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# Level kompresi: seimbang antara CPU parser dan bandwidth ke ASIK
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Body di atas ukuran ini dikompres di thread pool (di bawahnya lebih murah langsung di event loop)
+COMPRESS_THREADPOOL_MIN_BYTES = 64 * 1024
+
+RESPONSE_FORMATS = ("full", "compact", "columnar")
+
+# Suffix field string tampilan dari format_idr (items & validation)
+FORMATTED_SUFFIX = "_formatted"
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ke JSON UTF-8 (non-ASCII tidak di-escape)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(body: bytes) -> Any:
+    """Decode body JSON (orjson jika terinstall)"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def resolve_response_format(response_format: Optional[str]) -> str:
+    """Validasi query ?format=; None berarti format lengkap ("full")"""
+    response_format = response_format or "full"
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nilai format tidak valid: '{response_format}'. Pilihan: {', '.join(RESPONSE_FORMATS)}"
+        )
+    return response_format
+
+
+def strip_formatted(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Buang field *_formatted (string tampilan) dari satu dict"""
+    return {key: value for key, value in data.items() if not key.endswith(FORMATTED_SUFFIX)}
+
+
+def items_to_columns(items: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Ubah list item menjadi dict kolom: {"no": [...], "total": [...], ...}"""
+    columns: Dict[str, List[Any]] = {}
+    for item in items:
+        for key in item:
+            columns.setdefault(key, [])
+    for key, values in columns.items():
+        values.extend(item.get(key) for item in items)
+    return columns
+
+
+def format_result(result: Dict[str, Any], response_format: str = "full") -> Dict[str, Any]:
+    """Terapkan format response ke satu hasil parse (hasil asli tidak diubah)"""
+    if response_format == "full":
+        return result
+
+    formatted = dict(result)
+    if "items" in result:
+        items = [strip_formatted(item) for item in result["items"]]
+        formatted["items"] = items_to_columns(items) if response_format == "columnar" else items
+    if result.get("validation"):
+        formatted["validation"] = strip_formatted(result["validation"])
+    return formatted
+
+
+def format_batch(summary: Dict[str, Any], response_format: str = "full") -> Dict[str, Any]:
+    """Terapkan format response ke ringkasan batch (field results)"""
+    if response_format == "full" or "results" not in summary:
+        return summary
+    return dict(summary, results=[format_result(result, response_format) for result in summary["results"]])
+
+
+def parse_accept_encoding(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse header Accept-Encoding menjadi {encoding: q}"""
+    encodings: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pilih encoding kompresi terbaik yang didukung client: br (jika tersedia), lalu gzip"""
+    encodings = parse_accept_encoding(accept_encoding)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = None
+    for name in candidates:
+        q = encodings.get(name, encodings.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (name, q)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+async def json_response(
+    content: Any,
+    accept_encoding: Optional[str] = None,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Response JSON dengan encoder cepat; body di atas RESPONSE_COMPRESS_MIN_BYTES dikompres
+    sesuai Accept-Encoding client.
+    """
+    body = dumps(content)
+    headers = dict(headers or {})
+
+    if RESPONSE_COMPRESS_MIN_BYTES > 0:
+        headers["Vary"] = "Accept-Encoding"
+        if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+            encoding = choose_encoding(accept_encoding)
+            if encoding:
+                if len(body) >= COMPRESS_THREADPOOL_MIN_BYTES:
+                    body = await run_in_threadpool(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
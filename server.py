@@ -0,0 +1,215 @@
+"""
+Production Launcher (pre-fork)
+Menjalankan api:app dengan beberapa worker uvicorn yang di-fork dari satu proses master:
+
+- Master meng-import modul berat (FastAPI, pdfplumber/pdfminer, pypdfium2, parser) dan
+  menjalankan satu warm-up parse sebelum fork, sehingga worker berbagi memori modul &
+  cache pdfminer secara copy-on-write dan tidak membayar waktu import sendiri
+- Socket listen dibuat master dan diwarisi semua worker (kernel membagi koneksi)
+- Store SQLite (invoice_index, invoice_store, layout_templates) membuka koneksinya saat
+  pertama dipakai, per proses, karena koneksi SQLite tidak boleh dibawa melewati fork;
+  koneksi store template layout yang dibuka warm-up ditutup lagi, dan setiap fork dibatalkan
+  jika master masih memegang koneksi SQLite terbuka
+- Setiap worker tetap menjalankan warm-up parse sendiri (worker_pool); /health menjawab
+  503 "starting" sampai warm-up selesai
+- Worker yang mati di-fork ulang dari master yang sudah hangat; SIGTERM/SIGINT ke master
+  diteruskan sebagai SIGTERM ke semua worker (graceful shutdown)
+
+Sizing: setiap worker uvicorn memiliki process pool parser sendiri (worker_pool), jadi
+PARSER_WORKERS di sini adalah total proses parser untuk seluruh server. Master membaginya
+rata ke worker uvicorn (minimal 1 per worker) dan mengekspor hasilnya sebagai PARSER_WORKERS
+sebelum preload, sehingga --workers 4 di mesin 8 CPU menjalankan 4 x 2 proses parser,
+bukan 4 x 8. Total proses = workers x max(1, PARSER_WORKERS // workers); dengan
+PARSER_WORKERS lebih kecil dari --workers tiap worker tetap mendapat 1 proses.
+
+Konfigurasi via environment variable:
+- SERVER_HOST    : alamat bind (default: 0.0.0.0)
+- SERVER_PORT    : port (default: 8000)
+- SERVER_WORKERS : jumlah worker uvicorn (default: 2)
+- PARSER_WORKERS : total proses parser untuk semua worker uvicorn (default: jumlah CPU,
+                   0 = thread pool bawaan di setiap worker)
+
+Pemakaian:
+    python server.py
+    python server.py --workers 4 --port 8000
+    python server.py --workers 4 --parser-workers 8
+"""
+
+import argparse
+import importlib
+import gc
+import os
+import signal
+import sqlite3
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional
+
+import uvicorn
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "2"))
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", str(os.cpu_count() or 1)))
+
+# Modul yang di-import master sebelum fork (tanpa efek samping seperti koneksi database)
+PRELOAD_MODULES = (
+    "fastapi",
+    "fastapi.middleware.cors",
+    "fastapi.responses",
+    "starlette.concurrency",
+    "multipart",
+    "pdfplumber",
+    "pypdfium2",
+    "tabulate",
+    "parser",
+    "serialization",
+    "uploads",
+    "archive",
+    "cache",
+    "export",
+    "metrics",
+    "worker_pool",
+)
+
+# Jeda sebelum worker yang mati di-fork ulang (mencegah crash loop memenuhi CPU)
+RESPAWN_DELAY = 1.0
+
+
+def log(message: str) -> None:
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} [master {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def split_parser_workers(total: int, workers: int) -> int:
+    """Jumlah proses parser per worker uvicorn dari total untuk seluruh server (0 = thread pool)"""
+    if total <= 0:
+        return 0
+    return max(1, total // max(1, workers))
+
+
+def preload() -> Dict[str, float]:
+    """Import PRELOAD_MODULES lalu warm-up parse di master; kembalikan durasi (detik) per langkah"""
+    start = time.perf_counter()
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    imported = time.perf_counter()
+
+    import worker_pool
+    from layout_templates import layout_templates
+    worker_pool.warm_up()
+    if layout_templates is not None:
+        # Warm-up bisa membuka koneksi store template; worker membuka koneksinya sendiri
+        layout_templates.close()
+    return {"import": imported - start, "warmup": time.perf_counter() - imported}
+
+
+def open_sqlite_connections() -> int:
+    """Jumlah koneksi sqlite3 yang masih terbuka di proses ini"""
+    count = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, sqlite3.Connection):
+            try:
+                obj.total_changes
+            except sqlite3.ProgrammingError:
+                continue
+            count += 1
+    return count
+
+
+class PreforkServer:
+    """Master: fork worker uvicorn atas socket bersama dan jaga jumlahnya tetap"""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = max(1, workers)
+        self.socket = config.bind_socket()
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        connections = open_sqlite_connections()
+        if connections:
+            raise RuntimeError(f"master memegang {connections} koneksi SQLite terbuka; koneksi tidak boleh dibawa melewati fork")
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Proses worker: lepas dari sinyal terminal (master yang meneruskan) dan handler milik master
+        os.setpgrp()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        os._exit(code)
+
+    def stop(self, signum: int, _frame: Optional[object] = None) -> None:
+        if not self.stopping:
+            log(f"menerima sinyal {signal.Signals(signum).name}, menghentikan {len(self.children)} worker")
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        log(f"{self.workers} worker melayani http://{self.config.host}:{self.config.port}")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            if self.stopping:
+                continue
+
+            log(f"worker {pid} berhenti (status {os.waitstatus_to_exitcode(status)}), fork ulang")
+            if time.monotonic() - started < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY)
+            self.spawn()
+
+        self.socket.close()
+        log("berhenti")
+        return 0
+
+
+def build_config(host: str, port: int) -> uvicorn.Config:
+    return uvicorn.Config("api:app", host=host, port=port, lifespan="on")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Launcher pre-fork untuk Coretax Data Parser API")
+    arg_parser.add_argument("--host", default=SERVER_HOST)
+    arg_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    arg_parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Jumlah worker uvicorn")
+    arg_parser.add_argument(
+        "--parser-workers", type=int, default=PARSER_WORKERS,
+        help="Total proses parser untuk semua worker uvicorn (dibagi rata per worker)"
+    )
+    args = arg_parser.parse_args(argv)
+
+    # Harus di-set sebelum preload meng-import worker_pool (dibaca saat import dan diwarisi worker)
+    parser_workers = split_parser_workers(args.parser_workers, args.workers)
+    os.environ["PARSER_WORKERS"] = str(parser_workers)
+    log(f"{parser_workers} proses parser per worker uvicorn (total {args.parser_workers})")
+
+    timings = preload()
+    log(f"preload selesai: import {timings['import']:.2f}s, warm-up parse {timings['warmup']:.2f}s")
+    return PreforkServer(build_config(args.host, args.port), args.workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
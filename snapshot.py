@@ -0,0 +1,242 @@
+"""
+Golden Snapshot Harness
+Parse semua PDF di sample_pdf/ secara paralel dan bandingkan hasilnya dengan file
+golden JSON di golden/ (items, total, validation.is_valid, metadata). Dipakai untuk
+memastikan optimasi, fast path, dan backend alternatif tidak mengubah hasil parsing.
+
+golden/PARSER_VERSION mencatat parser.PARSER_VERSION saat golden terakhir ditulis.
+--update menolak menulis golden yang berubah jika PARSER_VERSION belum dinaikkan, sehingga
+perubahan hasil ekstraksi selalu disertai versi baru (cache hasil parse & invoice index
+memakai versi ini untuk membuang hasil lama).
+
+Contoh:
+    python snapshot.py                        # cek backend default
+    python snapshot.py --backend pdfium --crop
+    python snapshot.py --fields metadata      # cek fast path metadata-only
+    python snapshot.py --update               # tulis ulang golden (setelah perubahan yang disengaja)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import parser as pdf_parser
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BASE_DIR, "sample_pdf")
+DEFAULT_GOLDEN_DIR = os.path.join(BASE_DIR, "golden")
+
+# File di direktori golden yang mencatat PARSER_VERSION golden
+VERSION_FILENAME = "PARSER_VERSION"
+
+# Field validation yang disimpan di golden (field *_formatted diturunkan dari angka ini)
+VALIDATION_FIELDS = ("calculated_total", "pdf_total", "difference", "is_valid")
+
+
+def snapshot_view(result: Dict[str, Any], fields: str = "all") -> Dict[str, Any]:
+    """Bagian hasil parse yang dibandingkan dengan golden"""
+    if fields == "metadata":
+        return {"status": result["status"], "metadata": result.get("metadata", {})}
+
+    validation = result.get("validation") or {}
+    return {
+        "status": result["status"],
+        "metadata": result.get("metadata", {}),
+        "items": result.get("items", []),
+        "total_items": result.get("total_items", 0),
+        "validation": {field: validation.get(field) for field in VALIDATION_FIELDS}
+    }
+
+
+def parse_for_snapshot(path: str, backend: Optional[str], crop_regions: bool, fields: str) -> Dict[str, Any]:
+    """Parse satu file dengan backend/mode yang diminta (dijalankan di proses worker)"""
+    with open(path, "rb") as f:
+        pdf_file = BytesIO(f.read())
+
+    filename = os.path.basename(path)
+    if fields == "metadata":
+        result = pdf_parser.extract_metadata_only(pdf_file, filename, backend=backend)
+    else:
+        # Tanpa template layout supplier: golden dibandingkan dengan deteksi tabel penuh
+        result = pdf_parser.extract_invoice_data(
+            pdf_file, filename, crop_regions=crop_regions, backend=backend, use_templates=False
+        )
+    return snapshot_view(result, fields)
+
+
+def diff_values(expected: Any, actual: Any, path: str = "") -> List[str]:
+    """Daftar perbedaan antara golden dan hasil sekarang (path JSON + nilai)"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in sorted(set(expected) | set(actual)):
+            child = f"{path}.{key}" if path else key
+            if key not in actual:
+                diffs.append(f"{child}: hilang (golden: {expected[key]!r})")
+            elif key not in expected:
+                diffs.append(f"{child}: baru ({actual[key]!r})")
+            else:
+                diffs.extend(diff_values(expected[key], actual[key], child))
+        return diffs
+
+    if isinstance(expected, list) and isinstance(actual, list):
+        diffs = []
+        if len(expected) != len(actual):
+            diffs.append(f"{path}: jumlah {len(expected)} -> {len(actual)}")
+        for index, (old, new) in enumerate(zip(expected, actual)):
+            diffs.extend(diff_values(old, new, f"{path}[{index}]"))
+        return diffs
+
+    if expected != actual:
+        return [f"{path}: {expected!r} -> {actual!r}"]
+    return []
+
+
+def golden_path(golden_dir: str, filename: str) -> str:
+    return os.path.join(golden_dir, f"{filename}.json")
+
+
+def load_golden(golden_dir: str, filename: str, fields: str) -> Optional[Dict[str, Any]]:
+    """Baca golden satu file; untuk fields=metadata hanya bagian metadata yang dibandingkan"""
+    try:
+        with open(golden_path(golden_dir, filename), "r", encoding="utf-8") as f:
+            golden = json.load(f)
+    except OSError:
+        return None
+    return snapshot_view(golden, fields)
+
+
+def write_golden(golden_dir: str, filename: str, snapshot: Dict[str, Any]) -> None:
+    os.makedirs(golden_dir, exist_ok=True)
+    with open(golden_path(golden_dir, filename), "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+
+
+def read_golden_version(golden_dir: str) -> Optional[str]:
+    """PARSER_VERSION yang tercatat di golden (None jika belum pernah dicatat)"""
+    try:
+        with open(os.path.join(golden_dir, VERSION_FILENAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def write_golden_version(golden_dir: str, version: str) -> None:
+    os.makedirs(golden_dir, exist_ok=True)
+    with open(os.path.join(golden_dir, VERSION_FILENAME), "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+
+
+def update_golden(golden_dir: str, snapshots: List[Tuple[str, Dict[str, Any]]]) -> int:
+    """
+    Tulis ulang golden. Golden yang sudah ada dan berubah hanya ditulis jika PARSER_VERSION
+    berbeda dari versi yang tercatat (file golden baru selalu boleh ditambahkan).
+    """
+    recorded = read_golden_version(golden_dir)
+    changed = [
+        filename for filename, snapshot in snapshots
+        if load_golden(golden_dir, filename, "all") not in (None, snapshot)
+    ]
+    if changed and recorded == pdf_parser.PARSER_VERSION:
+        print(
+            f"{len(changed)} golden berubah tetapi PARSER_VERSION masih {recorded}; "
+            "naikkan PARSER_VERSION di parser.py lalu jalankan --update lagi",
+            file=sys.stderr
+        )
+        for filename in changed[:20]:
+            print(f"    {filename}", file=sys.stderr)
+        return 2
+
+    for filename, snapshot in snapshots:
+        write_golden(golden_dir, filename, snapshot)
+    write_golden_version(golden_dir, pdf_parser.PARSER_VERSION)
+    return 0
+
+
+def run_snapshots(
+    pdf_paths: List[str],
+    backend: Optional[str] = None,
+    crop_regions: bool = False,
+    fields: str = "all",
+    workers: Optional[int] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Parse semua file secara paralel, hasil dalam urutan input"""
+    workers = workers or os.cpu_count() or 1
+    args = [(path, backend, crop_regions, fields) for path in pdf_paths]
+
+    if workers <= 1:
+        snapshots = [parse_for_snapshot(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            snapshots = list(executor.map(parse_for_snapshot, *zip(*args), chunksize=4))
+
+    return [(os.path.basename(path), snapshot) for path, snapshot in zip(pdf_paths, snapshots)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Bandingkan hasil parser dengan golden snapshot")
+    arg_parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Direktori PDF (default: sample_pdf/)")
+    arg_parser.add_argument("--golden-dir", default=DEFAULT_GOLDEN_DIR, help="Direktori golden JSON (default: golden/)")
+    arg_parser.add_argument("--backend", choices=sorted(pdf_parser.BACKENDS), help="Backend ekstraksi (default: PARSER_BACKEND)")
+    arg_parser.add_argument("--crop", action="store_true", help="Aktifkan mode crop region")
+    arg_parser.add_argument("--fields", choices=["all", "metadata"], default="all", help="metadata = cek fast path metadata-only")
+    arg_parser.add_argument("--workers", type=int, help="Jumlah proses paralel (default: jumlah CPU)")
+    arg_parser.add_argument("--update", action="store_true", help="Tulis ulang golden dari hasil sekarang")
+    args = arg_parser.parse_args(argv)
+
+    if args.update and args.fields != "all":
+        print("--update hanya bisa dengan --fields all", file=sys.stderr)
+        return 2
+
+    pdf_paths = [
+        os.path.join(args.corpus, name) for name in sorted(os.listdir(args.corpus))
+        if name.lower().endswith(".pdf")
+    ]
+
+    start = time.perf_counter()
+    snapshots = run_snapshots(pdf_paths, args.backend, args.crop, args.fields, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.update:
+        code = update_golden(args.golden_dir, snapshots)
+        if code == 0:
+            print(
+                f"{len(snapshots)} golden file ditulis ke {args.golden_dir} "
+                f"(PARSER_VERSION {pdf_parser.PARSER_VERSION}, {elapsed:.1f}s)"
+            )
+        return code
+
+    recorded = read_golden_version(args.golden_dir)
+    version_mismatch = recorded != pdf_parser.PARSER_VERSION
+    if version_mismatch:
+        print(f"VERSION  golden dibuat dengan PARSER_VERSION {recorded}, parser {pdf_parser.PARSER_VERSION} "
+              "(jalankan --update)")
+
+    failed = 0
+    for filename, snapshot in snapshots:
+        golden = load_golden(args.golden_dir, filename, args.fields)
+        if golden is None:
+            failed += 1
+            print(f"MISSING  {filename} (jalankan --update)")
+            continue
+
+        diffs = diff_values(golden, snapshot)
+        if diffs:
+            failed += 1
+            print(f"DIFF     {filename}")
+            for line in diffs[:20]:
+                print(f"    {line}")
+            if len(diffs) > 20:
+                print(f"    ... {len(diffs) - 20} perbedaan lain")
+
+    print(f"\n{len(snapshots) - failed}/{len(snapshots)} file cocok dengan golden ({elapsed:.1f}s)")
+    return 1 if failed or version_mismatch else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,139 +1,123 @@
 """
-Test script untuk Coretax Data Parser API
+Test endpoint dasar Coretax Data Parser API (FastAPI TestClient, tanpa server terpisah)
+
+Jalankan: python -m pytest -q
 """
-import requests
+
+import asyncio
+import json
 import os
 
-# Base URL API
-BASE_URL = "http://localhost:8000"
-
-def test_root():
-    """Test root endpoint"""
-    print("🧪 Testing Root Endpoint...")
-    response = requests.get(f"{BASE_URL}/")
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}\n")
-
-def test_health():
-    """Test health check endpoint"""
-    print("🧪 Testing Health Check...")
-    response = requests.get(f"{BASE_URL}/health")
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}\n")
-
-def test_single_file(pdf_path):
-    """Test parsing single PDF file"""
-    print(f"🧪 Testing Single File Parse: {pdf_path}")
-    
-    if not os.path.exists(pdf_path):
-        print(f"❌ File not found: {pdf_path}\n")
-        return
-    
-    with open(pdf_path, 'rb') as f:
-        files = {'file': f}
-        response = requests.post(f"{BASE_URL}/parse", files=files)
-    
-    print(f"Status: {response.status_code}")
-    result = response.json()
-    print(f"Filename: {result.get('filename')}")
-    print(f"Status: {result.get('status')}")
-    print(f"Total Items: {result.get('total_items')}")
-    
-    if result.get('validation'):
-        validation = result['validation']
-        print(f"Valid: {validation.get('is_valid')}")
-        print(f"Calculated: {validation.get('calculated_total_formatted')}")
-        print(f"PDF Total: {validation.get('pdf_total_formatted')}")
-    print()
-
-def test_multiple_files(pdf_paths):
-    """Test parsing multiple PDF files"""
-    print(f"🧪 Testing Multiple Files Parse: {len(pdf_paths)} files")
-    
-    files = []
-    for path in pdf_paths:
-        if os.path.exists(path):
-            files.append(('files', open(path, 'rb')))
-        else:
-            print(f"⚠️ Skipping {path} - file not found")
-    
-    if not files:
-        print("❌ No valid files to process\n")
-        return
-    
-    response = requests.post(f"{BASE_URL}/parse-multiple", files=files)
-    
-    # Close all file handles
-    for _, f in files:
-        f.close()
-    
-    print(f"Status: {response.status_code}")
-    result = response.json()
-    print(f"Total Files: {result.get('total_files')}")
-    print(f"Success: {result.get('total_success')}")
-    print(f"Failed: {result.get('total_failed')}")
-    
-    if result.get('results'):
-        print("\nResults:")
-        for idx, res in enumerate(result['results'], 1):
-            print(f"  {idx}. {res.get('filename')} - {res.get('status')}")
-    print()
-
-def test_api_info():
-    """Test API info endpoint"""
-    print("🧪 Testing API Info...")
-    response = requests.get(f"{BASE_URL}/api-info")
-    print(f"Status: {response.status_code}")
+import httpx
+
+import api
+import snapshot
+from conftest import TEST_DATA_DIR, TEST_SPOOL_THRESHOLD
+
+
+def upload(path, field="file"):
+    with open(path, "rb") as f:
+        return (field, (os.path.basename(path), f.read(), "application/pdf"))
+
+
+def spooled_part(filename="besar.pdf"):
+    """Upload di atas batas spool (disimpan ke file sementara); isinya bukan PDF valid"""
+    return ("files", (filename, b"%PDF-" + b"0" * TEST_SPOOL_THRESHOLD, "application/pdf"))
+
+
+def spool_files():
+    return [name for name in os.listdir(TEST_DATA_DIR) if name.startswith("coretax-upload-")]
+
+
+def test_root(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json()["message"] == "Coretax Data Parser API"
+
+
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_api_info(client):
+    response = client.get("/api-info")
+    assert response.status_code == 200
+    assert response.json()["endpoints"]
+
+
+def test_parse_single_matches_golden(client, sample_pdfs):
+    path = sample_pdfs[0]
+    response = client.post("/parse", files=[upload(path)])
+
+    assert response.status_code == 200
     result = response.json()
-    print(f"API Name: {result.get('api_name')}")
-    print(f"Version: {result.get('version')}")
-    print(f"Endpoints: {len(result.get('endpoints', []))}")
-    print()
-
-if __name__ == "__main__":
-    print("=" * 60)
-    print("Coretax Data Parser API - Test Script")
-    print("=" * 60)
-    print()
-    
-    # Pastikan API server sudah berjalan
-    try:
-        requests.get(f"{BASE_URL}/health", timeout=2)
-    except requests.exceptions.ConnectionError:
-        print("❌ API server tidak berjalan!")
-        print("Jalankan server dengan: python api.py")
-        print("Atau: uvicorn api:app --reload")
-        exit(1)
-    
-    # Test all endpoints
-    test_root()
-    test_health()
-    test_api_info()
-    
-    # Test file parsing
-    # Ganti dengan path file PDF Anda
-    sample_pdf = "sample_pdf/invoice.pdf"
-    
-    # Cari file PDF di folder sample_pdf
-    if os.path.exists("sample_pdf"):
-        pdf_files = [
-            os.path.join("sample_pdf", f) 
-            for f in os.listdir("sample_pdf") 
-            if f.lower().endswith('.pdf')
-        ]
-        
-        if pdf_files:
-            # Test single file
-            test_single_file(pdf_files[0])
-            
-            # Test multiple files (max 3 untuk demo)
-            if len(pdf_files) > 1:
-                test_multiple_files(pdf_files[:3])
-        else:
-            print("⚠️ Tidak ada file PDF di folder sample_pdf/")
-    else:
-        print("⚠️ Folder sample_pdf/ tidak ditemukan")
-    
-    print("=" * 60)
-    print("✅ Testing completed!")
-    print("=" * 60)
+    assert result["filename"] == os.path.basename(path)
+    assert snapshot.snapshot_view(result) == snapshot.load_golden(
+        snapshot.DEFAULT_GOLDEN_DIR, os.path.basename(path), "all"
+    )
+
+
+def test_parse_rejects_non_pdf(client):
+    response = client.post("/parse", files=[("file", ("faktur.txt", b"bukan pdf", "text/plain"))])
+    assert response.status_code == 400
+
+
+def test_parse_multiple_keeps_upload_order(client, sample_pdfs):
+    paths = sample_pdfs[:3]
+    response = client.post("/parse-multiple", files=[upload(path, "files") for path in paths])
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["total_files"] == len(paths)
+    assert summary["total_success"] == len(paths)
+    assert [result["filename"] for result in summary["results"]] == [os.path.basename(path) for path in paths]
+
+
+def test_parse_multiple_streams_ndjson(client, sample_pdfs):
+    paths = sample_pdfs[:3]
+    response = client.post(
+        "/parse-multiple",
+        files=[upload(path, "files") for path in paths] + [spooled_part()],
+        headers={"Accept": api.NDJSON_MEDIA_TYPE}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(api.NDJSON_MEDIA_TYPE)
+    *lines, summary = [json.loads(line) for line in response.text.splitlines()]
+    filenames = [os.path.basename(path) for path in paths] + ["besar.pdf"]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert all(line["filename"] == filenames[line["index"]] for line in lines)
+    assert summary == {
+        "status": "completed", "total_files": 4, "total_success": 3, "total_failed": 1, "total_duplicate": 0
+    }
+    assert spool_files() == []
+
+
+def test_stream_removes_spool_when_client_disconnects_early(client):
+    request = httpx.Request(
+        "POST", "http://testserver/parse-multiple", files=[spooled_part()], headers={"Accept": api.NDJSON_MEDIA_TYPE}
+    )
+    messages = [{"type": "http.request", "body": request.read(), "more_body": False}]
+    sent = []
+
+    async def receive():
+        # Setelah body terkirim client langsung putus, sebelum stream sempat dimulai
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        # Seperti server sungguhan, send bisa menunggu (titik pembatalan sebelum stream dimulai)
+        await asyncio.sleep(0)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/parse-multiple", "raw_path": b"/parse-multiple", "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in request.headers.items()],
+        "client": ("testclient", 50000), "server": ("testserver", 80)
+    }
+    client.portal.call(api.app, scope, receive, send)
+
+    assert sent[0]["status"] == 200
+    assert spool_files() == []
@@ -0,0 +1,181 @@
+"""
+Test ekstraksi ZIP (archive.py) dan endpoint POST /parse-archive, termasuk proteksi zip bomb
+"""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+import archive
+from archive import InvalidArchive, discard_members, extract_pdf_members, spool_member
+from conftest import TEST_DATA_DIR, TEST_MAX_FILE_BYTES
+from uploads import UploadTooLarge
+
+
+def build_zip(members, compression=zipfile.ZIP_STORED):
+    """Bytes ZIP dari list (nama member, isi)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as zf:
+        for name, content in members:
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def corrupt_member(data, marker):
+    """Ubah isi member tersimpan (ZIP_STORED) tanpa memperbarui CRC di header"""
+    assert data.count(marker) == 1
+    return data.replace(marker, marker[::-1])
+
+
+def spool_files():
+    return [name for name in os.listdir(TEST_DATA_DIR) if name.startswith("coretax-archive-")]
+
+
+def read_samples(paths):
+    members = []
+    for path in paths:
+        with open(path, "rb") as f:
+            members.append((os.path.basename(path), f.read()))
+    return members
+
+
+def post_archive(client, data, filename="faktur.zip", **params):
+    return client.post("/parse-archive", params=params, files=[("file", (filename, data, "application/zip"))])
+
+
+def test_extract_skips_non_pdf_members():
+    data = build_zip([
+        ("a/faktur-1.pdf", b"%PDF-1"),
+        ("catatan.txt", b"bukan pdf"),
+        ("__MACOSX/a/._faktur-1.pdf", b"metadata"),
+        ("faktur-2.PDF", b"%PDF-2"),
+    ])
+
+    members, skipped = extract_pdf_members(data)
+    try:
+        assert [member.filename for member in members] == ["faktur-1.pdf", "faktur-2.PDF"]
+        contents = []
+        for member in members:
+            with open(member.source, "rb") as f:
+                contents.append(f.read())
+        assert contents == [b"%PDF-1", b"%PDF-2"]
+        assert skipped == ["catatan.txt", "__MACOSX/a/._faktur-1.pdf"]
+    finally:
+        discard_members(members)
+    assert spool_files() == []
+
+
+def test_invalid_zip_raises():
+    with pytest.raises(InvalidArchive):
+        extract_pdf_members(b"bukan zip")
+
+
+def test_compression_ratio_guard():
+    data = build_zip([("bomb.pdf", b"\0" * 200_000)], compression=zipfile.ZIP_DEFLATED)
+
+    with pytest.raises(UploadTooLarge, match="Rasio kompresi"):
+        extract_pdf_members(data)
+    assert spool_files() == []
+
+
+def test_member_count_guard(monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_MEMBERS", 2)
+    data = build_zip([(f"faktur-{index}.pdf", b"%PDF-") for index in range(3)])
+
+    with pytest.raises(UploadTooLarge, match="melebihi batas 2"):
+        extract_pdf_members(data)
+
+
+def test_member_size_guard():
+    data = build_zip([("besar.pdf", os.urandom(TEST_MAX_FILE_BYTES + 1))])
+
+    with pytest.raises(UploadTooLarge, match="besar.pdf"):
+        extract_pdf_members(data)
+
+
+def test_declared_total_guard(monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_TOTAL_BYTES", 1500)
+    data = build_zip([(f"faktur-{index}.pdf", os.urandom(1000)) for index in range(2)])
+
+    with pytest.raises(UploadTooLarge, match="Total ukuran"):
+        extract_pdf_members(data)
+
+
+def test_decompressed_bytes_are_counted_against_budget():
+    data = build_zip([("faktur.pdf", os.urandom(1000))])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        info = zf.infolist()[0]
+        with pytest.raises(UploadTooLarge):
+            spool_member(zf, info, budget=999)
+        path, size = spool_member(zf, info, budget=1000)
+    os.unlink(path)
+    assert size == 1000
+    assert spool_files() == []
+
+
+def test_corrupted_member_becomes_error():
+    data = corrupt_member(build_zip([("rusak.pdf", b"%PDF-RUSAK"), ("baik.pdf", b"%PDF-BAIK")]), b"RUSAK")
+
+    members, _ = extract_pdf_members(data)
+    try:
+        assert members[0].source is None
+        assert isinstance(members[0].error, zipfile.BadZipFile)
+        assert members[1].source is not None
+    finally:
+        discard_members(members)
+
+
+def test_parse_archive(client, sample_pdfs):
+    samples = read_samples(sample_pdfs[:2])
+    data = build_zip(samples + [("readme.txt", b"catatan")], compression=zipfile.ZIP_DEFLATED)
+
+    response = post_archive(client, data)
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert [result["filename"] for result in summary["results"]] == [name for name, _ in samples]
+    assert summary["total_success"] == 2
+    assert summary["skipped_members"] == ["readme.txt"]
+    assert spool_files() == []
+
+
+def test_parse_archive_reports_corrupted_member(client, sample_pdfs):
+    samples = read_samples(sample_pdfs[:1])
+    data = corrupt_member(build_zip(samples + [("rusak.pdf", b"%PDF-RUSAK")]), b"RUSAK")
+
+    response = post_archive(client, data)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status"] == "success"
+    assert results[1]["filename"] == "rusak.pdf"
+    assert results[1]["status"] == "error"
+
+
+def test_parse_archive_rejects_zip_bomb(client):
+    data = build_zip([("bomb.pdf", b"\0" * 200_000)], compression=zipfile.ZIP_DEFLATED)
+
+    response = post_archive(client, data)
+
+    assert response.status_code == 413
+    assert "Rasio kompresi" in response.json()["detail"]
+    assert spool_files() == []
+
+
+def test_parse_archive_rejects_too_many_members(client, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_MEMBERS", 2)
+    data = build_zip([(f"faktur-{index}.pdf", b"%PDF-") for index in range(3)])
+
+    assert post_archive(client, data).status_code == 413
+
+
+@pytest.mark.parametrize("filename, data", [
+    ("faktur.pdf", b"%PDF-"),
+    ("faktur.zip", b"bukan zip"),
+    ("kosong.zip", build_zip([("catatan.txt", b"tanpa pdf")])),
+])
+def test_parse_archive_rejects_invalid_upload(client, filename, data):
+    assert post_archive(client, data, filename=filename).status_code == 400
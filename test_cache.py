@@ -0,0 +1,134 @@
+"""
+Test cache hasil parse (cache.py) dan endpoint admin /admin/cache
+"""
+
+import os
+
+import pytest
+
+import api
+import cache
+from cache import ParseResultCache, content_digest, make_cache_key
+
+ADMIN_TOKEN = "rahasia"
+
+
+def success(name):
+    return {"filename": name, "status": "success", "items": []}
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    """Cache baru yang dipakai api.py selama satu test"""
+    parse_cache = ParseResultCache(max_entries=16)
+    monkeypatch.setattr(api, "result_cache", parse_cache)
+    return parse_cache
+
+
+def post_pdf(client, path):
+    with open(path, "rb") as f:
+        return client.post("/parse", files=[("file", (os.path.basename(path), f.read(), "application/pdf"))])
+
+
+def test_content_digest_of_bytes_and_spool_file(tmp_path):
+    path = tmp_path / "faktur.pdf"
+    path.write_bytes(b"%PDF-1.7 isi")
+
+    assert content_digest(str(path)) == content_digest(b"%PDF-1.7 isi")
+    assert content_digest(b"%PDF-1.7 isi") != content_digest(b"%PDF-1.7 lain")
+
+
+def test_cache_key_includes_parser_version_and_variant(monkeypatch):
+    digest = content_digest(b"%PDF-")
+    key = make_cache_key(digest)
+
+    assert make_cache_key(digest) == key
+    assert make_cache_key(digest, "metadata") != key
+    monkeypatch.setattr(cache, "PARSER_VERSION", "0.0.0-test")
+    assert make_cache_key(digest) != key
+
+
+def test_memory_lru_evicts_oldest():
+    parse_cache = ParseResultCache(max_entries=2)
+    parse_cache.put("a", success("a"))
+    parse_cache.put("b", success("b"))
+    assert parse_cache.get("a") is not None
+    parse_cache.put("c", success("c"))
+
+    # "b" paling lama tidak dipakai
+    assert parse_cache.get("b") is None
+    assert parse_cache.get("a")["filename"] == "a"
+    assert parse_cache.get("c")["filename"] == "c"
+    stats = parse_cache.stats()
+    assert (stats["entries"], stats["memory_hits"], stats["misses"]) == (2, 3, 1)
+
+
+def test_only_success_results_are_cached():
+    parse_cache = ParseResultCache(max_entries=2)
+    parse_cache.put("a", {"filename": "a", "status": "error", "error": "rusak"})
+
+    assert parse_cache.get("a") is None
+
+
+def test_disk_tier_is_shared_and_purged(tmp_path):
+    writer = ParseResultCache(max_entries=2, cache_dir=str(tmp_path))
+    writer.put("ab12", success("a"))
+
+    reader = ParseResultCache(max_entries=2, cache_dir=str(tmp_path))
+    assert reader.get("ab12")["filename"] == "a"
+    assert reader.get("ab12") is not None
+    assert (reader.stats()["disk_hits"], reader.stats()["memory_hits"]) == (1, 1)
+
+    assert writer.purge() == 1
+    assert os.listdir(tmp_path) == []
+    assert ParseResultCache(max_entries=2, cache_dir=str(tmp_path)).get("ab12") is None
+
+
+def test_parse_uses_cache(client, sample_pdfs, result_cache):
+    first = post_pdf(client, sample_pdfs[0]).json()
+    second = post_pdf(client, sample_pdfs[0]).json()
+
+    assert second["items"] == first["items"]
+    stats = result_cache.stats()
+    assert (stats["misses"], stats["memory_hits"], stats["entries"]) == (1, 1, 1)
+
+
+def test_parser_version_bump_misses_cache(client, sample_pdfs, result_cache, monkeypatch):
+    post_pdf(client, sample_pdfs[0])
+    monkeypatch.setattr(cache, "PARSER_VERSION", "0.0.0-test")
+    post_pdf(client, sample_pdfs[0])
+
+    stats = result_cache.stats()
+    assert (stats["misses"], stats["memory_hits"], stats["entries"]) == (2, 0, 2)
+
+
+def test_admin_endpoints_disabled_without_token(client, result_cache, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "")
+    result_cache.put("a", success("a"))
+
+    assert client.get("/admin/cache").status_code == 503
+    assert client.delete("/admin/cache", headers={"X-Admin-Token": ""}).status_code == 503
+    assert result_cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "salah"}])
+def test_admin_endpoints_reject_invalid_token(client, result_cache, monkeypatch, headers):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", ADMIN_TOKEN)
+    result_cache.put("a", success("a"))
+
+    assert client.get("/admin/cache", headers=headers).status_code == 403
+    assert client.delete("/admin/cache", headers=headers).status_code == 403
+    assert result_cache.stats()["entries"] == 1
+
+
+def test_admin_stats_and_purge(client, result_cache, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", ADMIN_TOKEN)
+    headers = {"X-Admin-Token": ADMIN_TOKEN}
+    result_cache.put("a", success("a"))
+
+    stats = client.get("/admin/cache", headers=headers).json()
+    assert (stats["entries"], stats["parser_version"]) == (1, cache.PARSER_VERSION)
+
+    response = client.delete("/admin/cache", headers=headers)
+    assert response.json() == {"status": "purged", "purged_entries": 1}
+    assert result_cache.stats()["entries"] == 0
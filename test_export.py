@@ -0,0 +1,162 @@
+"""
+Test export biner (export.py): MessagePack, tabel Arrow IPC / Parquet, lewat API dan CLI batch
+"""
+
+import io
+import os
+import shutil
+import zipfile
+
+import pytest
+
+import export
+import main
+from serialization import format_batch
+
+msgpack = pytest.importorskip("msgpack")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+RESULTS = [
+    {
+        "filename": "001.pdf",
+        "status": "success",
+        "metadata": {"invoice_number": "001", "invoice_date": "3 November 2025", "supplier_npwp": "S1"},
+        "items": [
+            {"no": "1", "item_code": "K1", "nama_barang": "LENCANA MERAH", "quantity": 2.0, "unit": "PCS",
+             "unit_price": 500.0, "discount": 0.0, "total": 1000.0, "total_formatted": "Rp 1.000,00"},
+            {"no": "2", "item_code": "K2", "nama_barang": "CAKRA KEMBAR", "quantity": 1.0, "unit": "PCS",
+             "unit_price": 250.5, "discount": 0.0, "total": 250.5, "total_formatted": "Rp 250,50"},
+        ],
+        "total_items": 2,
+        "validation": {"calculated_total": 1250.5, "pdf_total": 1250.5, "difference": 0.0, "is_valid": True},
+    },
+    {
+        "filename": "rusak.pdf", "status": "error", "error": "rusak", "error_type": "PDFSyntaxError",
+        "metadata": {}, "items": [], "total_items": 0, "validation": None,
+    },
+]
+SUMMARY = {"total_files": 2, "successful": 1, "failed": 1, "results": RESULTS}
+
+
+def read_tables(content, export_format):
+    """Baca ZIP export tabel menjadi {nama: pyarrow.Table}"""
+    tables = {}
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        for name in archive.namelist():
+            data = archive.read(name)
+            if export_format == "parquet":
+                tables[name] = pq.read_table(io.BytesIO(data))
+            else:
+                tables[name] = pa.ipc.open_file(data).read_all()
+    return tables
+
+
+def test_flatten_results_relates_items_to_invoice():
+    invoices, items = export.flatten_results(RESULTS)
+
+    assert invoices["invoice_number"] == ["001", None]
+    assert invoices["calculated_total"] == [1250.5, None]
+    assert invoices["error"] == [None, "rusak"]
+    assert items["invoice_number"] == ["001", "001"]
+    assert items["filename"] == ["001.pdf", "001.pdf"]
+    assert items["total"] == [1000.0, 250.5]
+    assert set(items) == {name for name, _ in export.ITEM_COLUMNS}
+
+
+@pytest.mark.parametrize("response_format", ["full", "compact", "columnar"])
+def test_msgpack_round_trip(response_format):
+    content = export.export_batch(SUMMARY, "msgpack", response_format)
+
+    assert msgpack.unpackb(content, raw=False) == format_batch(SUMMARY, response_format)
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+def test_table_export_schema_and_rows(export_format):
+    extension = export.TABLE_EXTENSIONS[export_format]
+
+    tables = read_tables(export.export_batch(SUMMARY, export_format), export_format)
+
+    assert sorted(tables) == [f"invoices.{extension}", f"items.{extension}"]
+    invoices, items = tables[f"invoices.{extension}"], tables[f"items.{extension}"]
+    assert invoices.schema.names == [name for name, _ in export.INVOICE_COLUMNS]
+    assert items.schema.names == [name for name, _ in export.ITEM_COLUMNS]
+    assert str(invoices.schema.field("is_valid").type) == "bool"
+    assert str(items.schema.field("quantity").type) == "double"
+    assert invoices.column("status").to_pylist() == ["success", "error"]
+    assert items.column("invoice_number").to_pylist() == ["001", "001"]
+    assert items.column("total").to_pylist() == [1000.0, 250.5]
+
+
+def test_empty_batch_has_empty_tables():
+    tables = read_tables(export.export_batch(dict(SUMMARY, results=[]), "arrow"), "arrow")
+
+    assert [table.num_rows for table in tables.values()] == [0, 0]
+
+
+@pytest.mark.parametrize("export_format, module", [("msgpack", "msgpack"), ("arrow", "pa"), ("parquet", "pa")])
+def test_missing_package_raises_export_unavailable(monkeypatch, export_format, module):
+    monkeypatch.setattr(export, module, None)
+
+    with pytest.raises(export.ExportUnavailable, match="pip install"):
+        export.export_batch(SUMMARY, export_format)
+
+
+def post_samples(client, sample_pdfs, **params):
+    files = []
+    for path in sample_pdfs[:2]:
+        with open(path, "rb") as f:
+            files.append(("files", (os.path.basename(path), f.read(), "application/pdf")))
+    return client.post("/parse-multiple", files=files, params=params)
+
+
+def test_parse_multiple_msgpack_matches_json(client, sample_pdfs):
+    response = post_samples(client, sample_pdfs, export="msgpack", format="compact")
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert 'filename="coretax-export.msgpack"' in response.headers["content-disposition"]
+    exported = msgpack.unpackb(response.content, raw=False)
+    expected = post_samples(client, sample_pdfs, format="compact").json()
+    assert exported["results"] == expected["results"]
+
+
+def test_parse_multiple_arrow_export(client, sample_pdfs):
+    response = post_samples(client, sample_pdfs, export="arrow")
+
+    assert response.headers["content-type"] == "application/zip"
+    tables = read_tables(response.content, "arrow")
+    invoices, items = tables["invoices.arrow"], tables["items.arrow"]
+    assert invoices.column("status").to_pylist() == ["success", "success"]
+    # Setiap item berelasi ke salah satu invoice
+    assert set(items.column("invoice_number").to_pylist()) == set(invoices.column("invoice_number").to_pylist())
+    assert items.num_rows == sum(invoices.column("total_items").to_pylist())
+
+
+def test_parse_multiple_export_unavailable(client, sample_pdfs, monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+
+    response = post_samples(client, sample_pdfs, export="parquet")
+
+    assert response.status_code == 501
+    assert "pyarrow" in response.json()["detail"]
+
+
+def test_cli_msgpack_and_parquet_output(tmp_path, sample_pdfs):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for path in sample_pdfs[:2]:
+        shutil.copy(path, inbox)
+
+    output = tmp_path / "hasil.msgpack"
+    assert main.main([str(inbox), "-o", str(output), "--workers", "1", "-q"]) == 0
+    exported = msgpack.unpackb(output.read_bytes(), raw=False)
+    assert [result["status"] for result in exported["results"]] == ["success", "success"]
+
+    output_dir = tmp_path / "tabel"
+    assert main.main([str(inbox), "--format", "parquet", "-o", str(output_dir), "--workers", "1", "-q"]) == 0
+    invoices = pq.read_table(output_dir / "invoices.parquet")
+    items = pq.read_table(output_dir / "items.parquet")
+    assert sorted(invoices.column("invoice_number").to_pylist()) == sorted(
+        result["metadata"]["invoice_number"] for result in exported["results"]
+    )
+    assert items.num_rows == sum(result["total_items"] for result in exported["results"])
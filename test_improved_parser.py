@@ -1,41 +1,157 @@
 #!/usr/bin/env python3
 """
-Test script untuk parser yang sudah diperbaiki
+Test parser terhadap golden snapshot: setiap PDF di sample_pdf/ harus menghasilkan
+items, total, validasi, dan metadata yang sama dengan file golden-nya di golden/
+
+Jalankan: python -m pytest -q test_improved_parser.py
+(perbarui golden lewat: python snapshot.py --update)
 """
-import parser as pdf_parser
+
 import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import parser as pdf_parser
+import snapshot
+
+SAMPLE_NAMES = sorted(name for name in os.listdir(snapshot.DEFAULT_CORPUS) if name.lower().endswith(".pdf"))
+
+# Sample lebih dari satu halaman (termasuk PDF rusak yang halamannya tetap bisa dihitung)
+MULTI_PAGE_NAMES = [
+    name for name in SAMPLE_NAMES if pdf_parser.count_pages(os.path.join(snapshot.DEFAULT_CORPUS, name)) > 1
+]
+
+# Sample 3 halaman: tabel item berlanjut dari halaman 1 ke halaman 2
+MULTI_PAGE_SAMPLE = (
+    "InputTaxInvoice-c4584356-8d38-4e4c-998b-13f5e249e7c7-0926938929422000-04002500405834346-0855794491114000.pdf"
+)
+
+
+def read_sample(filename):
+    with open(os.path.join(snapshot.DEFAULT_CORPUS, filename), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("filename", SAMPLE_NAMES)
+def test_parse_matches_golden(filename):
+    result = pdf_parser.parse_pdf_file(read_sample(filename), filename)
+
+    assert result["filename"] == filename
+    assert snapshot.snapshot_view(result) == snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, filename, "all")
+
+
+@pytest.mark.parametrize("filename", SAMPLE_NAMES)
+def test_metadata_fast_path_matches_golden(filename):
+    result = pdf_parser.parse_pdf_metadata(read_sample(filename), filename)
+
+    assert "items" not in result
+    assert snapshot.snapshot_view(result, "metadata") == snapshot.load_golden(
+        snapshot.DEFAULT_GOLDEN_DIR, filename, "metadata"
+    )
+
+
+@pytest.mark.parametrize("filename", SAMPLE_NAMES)
+def test_crop_regions_match_golden(filename):
+    snapshot_result = snapshot.parse_for_snapshot(
+        os.path.join(snapshot.DEFAULT_CORPUS, filename), backend=None, crop_regions=True, fields="all"
+    )
+
+    assert snapshot_result == snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, filename, "all")
+
+
+@pytest.mark.parametrize("fields", ["all", "metadata"])
+@pytest.mark.parametrize("filename", SAMPLE_NAMES)
+def test_pdfium_backend_matches_golden(filename, fields):
+    snapshot_result = snapshot.parse_for_snapshot(
+        os.path.join(snapshot.DEFAULT_CORPUS, filename), backend="pdfium", crop_regions=False, fields=fields
+    )
+
+    assert snapshot_result == snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, filename, fields)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Backend tidak dikenal"):
+        pdf_parser.get_backend("poppler")
+
+
+def test_invalid_pdf_returns_error_result():
+    result = pdf_parser.parse_pdf_file(b"bukan pdf", "rusak.pdf")
+
+    assert result["status"] == "error"
+    assert result["filename"] == "rusak.pdf"
+    assert result["error_type"] == "PDFSyntaxError"
+    assert (result["items"], result["total_items"], result["validation"]) == ([], 0, None)
+
+
+if __name__ == "__main__":
+    # Kompatibel dengan cara lama menjalankan script ini: python3 test_improved_parser.py
+    raise SystemExit(pytest.main([__file__, "-q"]))
+
+
+def test_golden_version_matches_parser():
+    # Golden yang berubah harus ditulis bersama kenaikan PARSER_VERSION (snapshot.py --update)
+    assert snapshot.read_golden_version(snapshot.DEFAULT_GOLDEN_DIR) == pdf_parser.PARSER_VERSION
+
+
+def test_update_requires_parser_version_bump(tmp_path, monkeypatch):
+    corpus, golden_dir = tmp_path / "corpus", tmp_path / "golden"
+    corpus.mkdir()
+    shutil.copy(os.path.join(snapshot.DEFAULT_CORPUS, SAMPLE_NAMES[0]), corpus)
+    args = ["--corpus", str(corpus), "--golden-dir", str(golden_dir), "--workers", "1"]
+    assert snapshot.main(args + ["--update"]) == 0
+    assert snapshot.read_golden_version(str(golden_dir)) == pdf_parser.PARSER_VERSION
+
+    # Golden lama berbeda dari hasil sekarang = perubahan hasil ekstraksi
+    path = snapshot.golden_path(str(golden_dir), SAMPLE_NAMES[0])
+    with open(path, encoding="utf-8") as f:
+        golden = json.load(f)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(golden, total_items=golden["total_items"] + 1), f)
+
+    assert snapshot.main(args + ["--update"]) == 2
+    assert snapshot.load_golden(str(golden_dir), SAMPLE_NAMES[0], "all")["total_items"] == golden["total_items"] + 1
+
+    monkeypatch.setattr(pdf_parser, "PARSER_VERSION", "99.0.0")
+    assert snapshot.main(args) == 1
+    assert snapshot.main(args + ["--update"]) == 0
+    assert snapshot.read_golden_version(str(golden_dir)) == "99.0.0"
+    assert snapshot.main(args) == 0
+
+
+@pytest.mark.parametrize("filename", MULTI_PAGE_NAMES)
+def test_page_range_split_matches_golden(filename):
+    content = read_sample(filename)
+    page_count = pdf_parser.count_pages(content)
+
+    # Satu range per halaman: setiap batas halaman menjadi batas antar worker
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = pdf_parser.parse_pdf_file_split(
+            content, filename, executor, [range(page, page + 1) for page in range(page_count)]
+        )
+
+    assert snapshot.snapshot_view(result) == snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, filename, "all")
+
+
+def test_item_cut_at_page_break_matches_golden():
+    content = read_sample(MULTI_PAGE_SAMPLE)
+    parts = [pdf_parser.extract_page_range(content, range(page, page + 1)) for page in range(3)]
+
+    # Potong item terakhir halaman 1: nama barang tetap di halaman 1, sisa detail dan total
+    # pindah ke baris lanjutan (kolom No kosong) di awal tabel halaman 2
+    first_texts, first_rows, first_timings = parts[0]
+    no, code, detail, total = first_rows[-1]
+    name, rest = detail.split("\n", 1)
+    second_texts, second_rows, second_timings = parts[1]
+    parts[0] = (first_texts, first_rows[:-1] + [(no, code, name, "")], first_timings)
+    parts[1] = (second_texts, [("", "", rest, total)] + second_rows, second_timings)
+
+    result, _ = pdf_parser.merge_page_ranges(MULTI_PAGE_SAMPLE, parts)
+    golden = snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, MULTI_PAGE_SAMPLE, "all")
 
-# Test dengan sample PDF
-pdf_file = 'sample_pdf/InputTaxInvoice-007704dc-6653-4c9e-b1d9-603814e7cac5-0021057187122000-04002500373856589-0637531807118000.pdf'
-
-print("=" * 80)
-print(f"Testing parser with: {pdf_file}")
-print("=" * 80)
-
-with open(pdf_file, 'rb') as f:
-    content = f.read()
-    result = pdf_parser.parse_pdf_file(content, 'test.pdf')
-
-print("\n📋 METADATA:")
-print(json.dumps(result.get('metadata', {}), indent=2, ensure_ascii=False))
-
-print("\n📦 ITEMS:")
-for item in result.get('items', []):
-    print(f"\n  Item #{item['no']}: {item['nama_barang']}")
-    print(f"    - Item Code: {item.get('item_code', 'N/A')}")
-    print(f"    - Quantity: {item.get('quantity', 'N/A')} {item.get('unit', '')}")
-    print(f"    - Unit Price: Rp {item.get('unit_price', 0):,.2f}")
-    print(f"    - Discount: Rp {item.get('discount', 0):,.2f}")
-    print(f"    - Total: Rp {item.get('total', 0):,.2f}")
-
-print("\n✅ VALIDATION:")
-validation = result.get('validation', {})
-print(f"  Calculated Total: {validation.get('calculated_total_formatted', 'N/A')}")
-print(f"  PDF Total: {validation.get('pdf_total_formatted', 'N/A')}")
-print(f"  Is Valid: {validation.get('is_valid', False)}")
-print(f"  Difference: {validation.get('difference_formatted', 'N/A')}")
-
-print("\n" + "=" * 80)
-print("FULL JSON OUTPUT:")
-print("=" * 80)
-print(json.dumps(result, indent=2, ensure_ascii=False))
+    assert snapshot.snapshot_view(result) == golden
+    # Tanpa baris lanjutan dari halaman 2, item yang terpotong hilang dari hasil halaman 1
+    assert no in [item["no"] for item in golden["items"]]
+    assert no not in [item["no"] for item in pdf_parser.extract_items_from_rows(parts[0][1])]
@@ -0,0 +1,121 @@
+"""
+Test deteksi duplikat dari nama file Coretax (invoice_index.py) lewat POST /parse dan /parse-multiple
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+import api
+from invoice_index import InvoiceIndex, check_identity, decode_filename_identity
+
+CORETAX_FILENAME = (
+    "InputTaxInvoice-007704dc-6653-4c9e-b1d9-603814e7cac5-0021057187122000-04002500373856589-0637531807118000.pdf"
+)
+IDENTITY = {"supplier_npwp": "0021057187122000", "invoice_number": "04002500373856589", "buyer_npwp": "0637531807118000"}
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """Invoice index baru yang dipakai api.py selama satu test"""
+    invoice_index = InvoiceIndex(str(tmp_path / "invoice_index.db"))
+    monkeypatch.setattr(api, "invoice_index", invoice_index)
+    return invoice_index
+
+
+def pdf_part(path, filename=None, field="file"):
+    with open(path, "rb") as f:
+        return (field, (filename or os.path.basename(path), f.read(), "application/pdf"))
+
+
+def test_decode_filename_identity():
+    assert decode_filename_identity(f"/inbox/{CORETAX_FILENAME}") == dict(IDENTITY, uuid="007704dc-6653-4c9e-b1d9-603814e7cac5")
+    assert decode_filename_identity("faktur.pdf") is None
+    assert decode_filename_identity(None) is None
+
+
+def test_check_identity_reports_mismatched_fields():
+    metadata = dict(IDENTITY, invoice_number="04002500000000000")
+    check = check_identity(IDENTITY, metadata)
+    assert check["matches"] is False
+    assert check["mismatched_fields"] == ["invoice_number"]
+    assert check_identity(IDENTITY, IDENTITY)["matches"] is True
+
+
+def test_index_matches_identity_and_content(tmp_path):
+    path = tmp_path / "invoice_index.db"
+    invoice_index = InvoiceIndex(str(path))
+    assert not path.exists()
+
+    invoice_index.put(IDENTITY, CORETAX_FILENAME, {"invoice_number": IDENTITY["invoice_number"]}, "hash-a")
+    assert path.exists()
+    indexed = invoice_index.get(IDENTITY, "hash-a")
+    assert indexed["filename"] == CORETAX_FILENAME
+    assert indexed["metadata"] == {"invoice_number": IDENTITY["invoice_number"]}
+    assert invoice_index.get(IDENTITY, "hash-b") is None
+
+    # PDF koreksi dengan identitas yang sama menggantikan baris lama
+    invoice_index.put(IDENTITY, CORETAX_FILENAME, {}, "hash-b")
+    assert invoice_index.get(IDENTITY, "hash-a") is None
+    assert invoice_index.get(IDENTITY, "hash-b") is not None
+    assert invoice_index.count() == 1
+
+
+def test_index_migrates_result_rows(tmp_path):
+    path = str(tmp_path / "invoice_index.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE invoice_index (identity_key TEXT PRIMARY KEY, supplier_npwp TEXT NOT NULL,"
+        " invoice_number TEXT NOT NULL, buyer_npwp TEXT NOT NULL, filename TEXT, result_json TEXT NOT NULL,"
+        " indexed_at REAL NOT NULL, content_sha256 TEXT, parser_version TEXT)"
+    )
+    result = {"status": "success", "metadata": {"invoice_number": IDENTITY["invoice_number"]}, "items": []}
+    conn.execute(
+        "INSERT INTO invoice_index VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ("-".join(IDENTITY.values()), *IDENTITY.values(), CORETAX_FILENAME, json.dumps(result), 1.0, "hash-a", "2.0.0")
+    )
+    conn.commit()
+    conn.close()
+
+    indexed = InvoiceIndex(path).get(IDENTITY, "hash-a")
+
+    assert indexed == {"filename": CORETAX_FILENAME, "metadata": result["metadata"], "indexed_at": 1.0}
+
+
+def test_reupload_is_reported_as_duplicate(client, sample_pdfs, index):
+    path = sample_pdfs[0]
+    first = client.post("/parse", files=[pdf_part(path)]).json()
+    assert first["status"] == "success"
+    assert first["identity_check"]["matches"] is True
+    assert index.count() == 1
+
+    second = client.post("/parse", files=[pdf_part(path)]).json()
+
+    assert second["status"] == "duplicate"
+    assert second["metadata"] == first["metadata"]
+    assert second["first_imported"]["filename"] == os.path.basename(path)
+    assert "items" not in second
+
+
+def test_renamed_pdf_is_not_a_duplicate(client, sample_pdfs, index):
+    client.post("/parse", files=[pdf_part(sample_pdfs[0])])
+
+    # Isi PDF lain dengan nama file faktur yang sudah diimport: diparse, identitas tidak cocok
+    result = client.post("/parse", files=[pdf_part(sample_pdfs[1], os.path.basename(sample_pdfs[0]))]).json()
+
+    assert result["status"] == "success"
+    assert result["identity_check"]["matches"] is False
+    assert index.count() == 1
+
+
+def test_batch_counts_duplicates(client, sample_pdfs, index):
+    client.post("/parse", files=[pdf_part(sample_pdfs[0])])
+
+    summary = client.post("/parse-multiple", files=[
+        pdf_part(sample_pdfs[0], field="files"), pdf_part(sample_pdfs[1], field="files")
+    ]).json()
+
+    assert [result["status"] for result in summary["results"]] == ["duplicate", "success"]
+    assert (summary["total_success"], summary["total_duplicate"], summary["total_failed"]) == (1, 1, 0)
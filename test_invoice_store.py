@@ -0,0 +1,177 @@
+"""
+Test invoice store (invoice_store.py) dan endpoint GET /invoices, GET /invoices/{invoice_number}
+"""
+
+import os
+
+import pytest
+
+import api
+from invoice_store import MAX_PAGE_SIZE, InvoiceStore, iso_date
+
+
+def invoice_result(invoice_number, supplier_npwp, buyer_npwp, invoice_date, item_codes, is_valid=True):
+    """Hasil parse sukses sintetis dengan satu item per item_code"""
+    items = [
+        {
+            "no": str(index), "item_code": code, "nama_barang": f"BARANG {code}", "quantity": 1.0,
+            "unit": "PCS", "unit_price": 1000.0, "discount": 0.0, "total": 1000.0
+        }
+        for index, code in enumerate(item_codes, start=1)
+    ]
+    total = 1000.0 * len(items)
+    return {
+        "filename": f"{invoice_number}.pdf",
+        "status": "success",
+        "metadata": {
+            "invoice_number": invoice_number,
+            "invoice_date": invoice_date,
+            "supplier_name": f"SUPPLIER {supplier_npwp}",
+            "supplier_npwp": supplier_npwp,
+            "buyer_name": f"PEMBELI {buyer_npwp}",
+            "buyer_npwp": buyer_npwp
+        },
+        "items": items,
+        "total_items": len(items),
+        "validation": {
+            "calculated_total": total,
+            "pdf_total": total if is_valid else total + 1,
+            "difference": 0.0 if is_valid else 1.0,
+            "is_valid": is_valid
+        }
+    }
+
+
+INVOICES = (
+    invoice_result("001", "S1", "B1", "03 November 2025", ["K1", "K2"]),
+    invoice_result("002", "S1", "B2", "15 November 2025", ["K2"], is_valid=False),
+    invoice_result("003", "S2", "B1", "01 Desember 2025", ["K3"]),
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Invoice store baru berisi INVOICES, dipakai api.py selama satu test"""
+    invoice_store = InvoiceStore(str(tmp_path / "invoice_store.db"))
+    for result in INVOICES:
+        assert invoice_store.put(result)
+    monkeypatch.setattr(api, "invoice_store", invoice_store)
+    return invoice_store
+
+
+def invoice_numbers(response):
+    assert response.status_code == 200
+    return [invoice["invoice_number"] for invoice in response.json()["invoices"]]
+
+
+def test_iso_date():
+    assert iso_date("06 November 2025") == "2025-11-06"
+    assert iso_date("1 Desember 2025") == "2025-12-01"
+    assert iso_date("06 Nov 2025") is None
+    assert iso_date(None) is None
+
+
+def test_store_opens_database_on_first_use(tmp_path):
+    path = tmp_path / "invoice_store.db"
+    invoice_store = InvoiceStore(str(path))
+    assert not path.exists()
+
+    assert invoice_store.count() == 0
+    assert path.exists()
+    invoice_store.close()
+    assert invoice_store.count() == 0
+
+
+def test_put_replaces_same_invoice_and_skips_incomplete_results(store):
+    replacement = invoice_result("001", "S1", "B1", "03 November 2025", ["K9"])
+    assert store.put(replacement)
+    assert store.count() == 3
+    assert store.get("001")["items"][0]["item_code"] == "K9"
+
+    metadata_only = {key: value for key, value in invoice_result("004", "S1", "B1", "", []).items() if key != "items"}
+    assert not store.put(metadata_only)
+    assert not store.put(dict(invoice_result("005", "S1", "B1", "", []), status="error"))
+    assert store.count() == 3
+
+
+def test_list_invoices_newest_first(client, store):
+    response = client.get("/invoices")
+
+    assert invoice_numbers(response) == ["003", "002", "001"]
+    data = response.json()
+    assert (data["total"], data["total_pages"]) == (3, 1)
+    invoice = data["invoices"][1]
+    assert "items" not in invoice
+    assert invoice["invoice_date"] == "2025-11-15"
+    assert invoice["is_valid"] is False
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"supplier_npwp": "S1"}, ["002", "001"]),
+    ({"buyer_npwp": "B1"}, ["003", "001"]),
+    ({"invoice_number": "003"}, ["003"]),
+    ({"item_code": "K2"}, ["002", "001"]),
+    ({"date_from": "2025-11-10"}, ["003", "002"]),
+    ({"date_to": "2025-11-30"}, ["002", "001"]),
+    ({"date_from": "2025-11-03", "date_to": "2025-11-03"}, ["001"]),
+    ({"supplier_npwp": "S1", "item_code": "K1"}, ["001"]),
+    ({"supplier_npwp": "S2", "item_code": "K1"}, []),
+])
+def test_list_invoices_filters(client, store, params, expected):
+    response = client.get("/invoices", params=params)
+
+    assert invoice_numbers(response) == expected
+    assert response.json()["total"] == len(expected)
+
+
+def test_list_invoices_pagination(client, store):
+    response = client.get("/invoices", params={"page": 2, "page_size": 2})
+
+    assert invoice_numbers(response) == ["001"]
+    data = response.json()
+    assert (data["page"], data["page_size"], data["total"], data["total_pages"]) == (2, 2, 3, 2)
+
+
+@pytest.mark.parametrize("params, status_code", [
+    ({"date_from": "03-11-2025"}, 400),
+    ({"date_to": "2025-11"}, 400),
+    ({"page": 0}, 422),
+    ({"page_size": MAX_PAGE_SIZE + 1}, 422),
+])
+def test_list_invoices_rejects_invalid_query(client, store, params, status_code):
+    assert client.get("/invoices", params=params).status_code == status_code
+
+
+def test_get_invoice(client, store):
+    response = client.get("/invoices/001")
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["metadata"]["supplier_npwp"] == "S1"
+    assert [item["item_code"] for item in result["items"]] == ["K1", "K2"]
+
+    assert client.get("/invoices/001", params={"supplier_npwp": "S2"}).status_code == 404
+    assert client.get("/invoices/999").status_code == 404
+
+
+def test_store_disabled_returns_503(client, monkeypatch):
+    monkeypatch.setattr(api, "invoice_store", None)
+
+    assert client.get("/invoices").status_code == 503
+    assert client.get("/invoices/001").status_code == 503
+
+
+def test_parsed_invoice_is_stored(client, sample_pdfs):
+    with open(sample_pdfs[0], "rb") as f:
+        files = [("file", (os.path.basename(sample_pdfs[0]), f.read(), "application/pdf"))]
+    parsed = client.post("/parse", files=files).json()
+    metadata = parsed["metadata"]
+
+    response = client.get("/invoices", params={
+        "invoice_number": metadata["invoice_number"], "supplier_npwp": metadata["supplier_npwp"]
+    })
+
+    assert invoice_numbers(response) == [metadata["invoice_number"]]
+    assert response.json()["invoices"][0]["total_items"] == parsed["total_items"]
+    stored = client.get(f"/invoices/{metadata['invoice_number']}").json()
+    assert stored["items"] == parsed["items"]
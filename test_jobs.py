@@ -0,0 +1,178 @@
+"""
+Test antrian job asinkron (jobs.py) dan endpoint POST /jobs, GET /jobs/{job_id}
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+import api
+from jobs import JOB_RETRY_AFTER, JobManager, JobQueueFull
+
+
+def fake_files(count=1):
+    return [(f"faktur-{index}.pdf", b"%PDF-") for index in range(count)]
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "kondisi tidak tercapai sebelum timeout"
+        await asyncio.sleep(0.01)
+
+
+def test_submit_raises_when_queue_full():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocking_iterator(files_data):
+            await release.wait()
+            for idx, (filename, _) in enumerate(files_data):
+                yield idx, {"filename": filename, "status": "success"}
+
+        manager = JobManager(blocking_iterator, queue_size=1, workers=1)
+        manager.start()
+        try:
+            running = manager.submit(fake_files())
+            await wait_for(lambda: running.status == "running")
+            queued = manager.submit(fake_files())
+            assert manager.queue_depth() == 1
+
+            with pytest.raises(JobQueueFull):
+                manager.submit(fake_files())
+            assert set(manager.jobs) == {running.id, queued.id}
+
+            release.set()
+            await wait_for(lambda: queued.status == "completed")
+            assert running.status == "completed"
+            # Antrian kosong lagi: job baru diterima
+            manager.submit(fake_files())
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_finished_job_expires_after_ttl():
+    async def scenario():
+        async def iterator(files_data):
+            for idx, (filename, _) in enumerate(files_data):
+                yield idx, {"filename": filename, "status": "success"}
+
+        manager = JobManager(iterator, queue_size=10, workers=1, ttl=60)
+        manager.start()
+        try:
+            job = manager.submit(fake_files(2))
+            await wait_for(lambda: job.status == "completed")
+            assert manager.get(job.id) is job
+            assert job.files_data is None
+
+            job.finished_at -= 59
+            assert manager.get(job.id) is job
+            job.finished_at -= 2
+            assert manager.get(job.id) is None
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_are_capped():
+    async def scenario():
+        async def iterator(files_data):
+            for idx, (filename, _) in enumerate(files_data):
+                yield idx, {"filename": filename, "status": "success"}
+
+        manager = JobManager(iterator, queue_size=10, workers=1, max_finished=2)
+        manager.start()
+        try:
+            jobs = []
+            for _ in range(3):
+                jobs.append(manager.submit(fake_files()))
+                await wait_for(lambda: jobs[-1].finished_at is not None)
+            # Job yang paling lama selesai dibuang lebih dulu
+            assert [manager.get(job.id) for job in jobs] == [None, jobs[1], jobs[2]]
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unfinished_job_never_expires():
+    async def scenario():
+        manager = JobManager(None, queue_size=10, workers=1, ttl=0)
+        manager._queue = asyncio.Queue(maxsize=10)
+        job = manager.submit(fake_files())
+        job.created_at -= 3600
+        assert manager.get(job.id) is job
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_reports_error():
+    async def scenario():
+        async def failing_iterator(files_data):
+            raise RuntimeError("worker mati")
+            yield
+
+        manager = JobManager(failing_iterator, queue_size=10, workers=1)
+        manager.start()
+        try:
+            job = manager.submit(fake_files())
+            await wait_for(lambda: job.finished_at is not None)
+            data = job.to_dict()
+            assert data["status"] == "failed"
+            assert data["error"] == "worker mati"
+            assert "result" not in data
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_create_job_returns_429_with_retry_after(client, sample_pdfs, monkeypatch):
+    # Antrian berkapasitas 1 tanpa worker: job kedua langsung ditolak
+    manager = JobManager(api.iter_parse_contents, queue_size=1, workers=1)
+    manager._queue = asyncio.Queue(maxsize=1)
+    monkeypatch.setattr(api, "job_manager", manager)
+
+    with open(sample_pdfs[0], "rb") as f:
+        content = f.read()
+    files = [("files", (os.path.basename(sample_pdfs[0]), content, "application/pdf"))]
+
+    assert client.post("/jobs", files=files).status_code == 202
+    response = client.post("/jobs", files=files)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(JOB_RETRY_AFTER)
+    assert len(manager.jobs) == 1
+
+
+def test_job_roundtrip(client, sample_pdfs):
+    paths = sample_pdfs[:2]
+    files = []
+    for path in paths:
+        with open(path, "rb") as f:
+            files.append(("files", (os.path.basename(path), f.read(), "application/pdf")))
+
+    response = client.post("/jobs", files=files)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.monotonic() + 60
+    while True:
+        data = client.get(f"/jobs/{job_id}").json()
+        if data["status"] not in ("queued", "running"):
+            break
+        assert time.monotonic() < deadline, "job tidak selesai sebelum timeout"
+        time.sleep(0.05)
+
+    assert data["status"] == "completed"
+    assert data["progress"] == {"processed_files": 2, "total_files": 2, "percent": 100.0}
+    assert [result["filename"] for result in data["result"]["results"]] == [os.path.basename(path) for path in paths]
+
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/jobs/tidak-ada").status_code == 404
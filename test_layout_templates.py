@@ -0,0 +1,106 @@
+"""
+Test template layout tabel per supplier (layout_templates.py, parser.TableLayout)
+"""
+
+import importlib
+import json
+import os
+
+import pytest
+
+import parser as pdf_parser
+import snapshot
+from layout_templates import LayoutTemplateStore
+
+SUPPLIER_NPWP = "0626971758116000"
+
+
+def supplier_samples(supplier_npwp, count):
+    """Nama sample PDF dari satu supplier (dari golden)"""
+    names = []
+    for filename in sorted(os.listdir(snapshot.DEFAULT_GOLDEN_DIR)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(snapshot.DEFAULT_GOLDEN_DIR, filename), "r", encoding="utf-8") as f:
+            if json.load(f)["metadata"].get("supplier_npwp") == supplier_npwp:
+                names.append(filename[:-len(".json")])
+    return names[:count]
+
+
+def parse_sample(filename, **kwargs):
+    with open(os.path.join(snapshot.DEFAULT_CORPUS, filename), "rb") as f:
+        return pdf_parser.parse_pdf_file(f.read(), filename, **kwargs)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Store template baru yang dipakai parser selama satu test"""
+    template_store = LayoutTemplateStore(str(tmp_path / "layout_templates.db"))
+    monkeypatch.setattr(pdf_parser, "layout_templates", template_store)
+    yield template_store
+    template_store.close()
+
+
+@pytest.fixture
+def template_tables(monkeypatch):
+    """Hitung halaman yang diekstrak dengan template"""
+    calls = []
+    original = pdf_parser.extract_template_table
+
+    def counting(page, template, first_page):
+        table_rows = original(page, template, first_page)
+        calls.append(table_rows is not None)
+        return table_rows
+
+    monkeypatch.setattr(pdf_parser, "extract_template_table", counting)
+    return calls
+
+
+def test_template_reused_for_same_supplier(store, template_tables):
+    first, *others = supplier_samples(SUPPLIER_NPWP, 4)
+
+    result = parse_sample(first)
+    assert store.count() == 1
+    assert store.get(SUPPLIER_NPWP)["columns"]
+    assert template_tables == []
+    assert snapshot.snapshot_view(result) == snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, first, "all")
+
+    for filename in others:
+        result = parse_sample(filename)
+        assert snapshot.snapshot_view(result) == snapshot.load_golden(snapshot.DEFAULT_GOLDEN_DIR, filename, "all")
+    assert template_tables and all(template_tables)
+
+
+def test_use_templates_false_skips_store(store, template_tables):
+    for filename in supplier_samples(SUPPLIER_NPWP, 2):
+        parse_sample(filename, use_templates=False)
+
+    assert store.count() == 0
+    assert template_tables == []
+
+
+def test_crop_mode_skips_templates(store):
+    filename = supplier_samples(SUPPLIER_NPWP, 1)[0]
+    with open(os.path.join(snapshot.DEFAULT_CORPUS, filename), "rb") as f, pdf_parser.open_pdf_source(f.read()) as pdf_file:
+        pdf_parser.extract_invoice_data(pdf_file, filename, crop_regions=True)
+
+    assert store.count() == 0
+
+
+def test_store_persists_templates(tmp_path):
+    path = str(tmp_path / "layout_templates.db")
+    template = {"columns": [10.0, 20.0], "bbox": [0, 0, 100, 100], "header": [["No."]]}
+    LayoutTemplateStore(path).put(SUPPLIER_NPWP, template)
+
+    reopened = LayoutTemplateStore(path)
+    assert reopened.get(SUPPLIER_NPWP) == template
+    assert reopened.get("0000000000000000") is None
+
+
+def test_importing_cli_modules_keeps_templates(store):
+    import benchmark
+
+    # Import snapshot/benchmark (mis. oleh test lain) tidak boleh menonaktifkan template parser
+    importlib.reload(snapshot)
+    importlib.reload(benchmark)
+    assert pdf_parser.layout_templates is store
@@ -0,0 +1,106 @@
+"""
+Test CLI batch (main.py): pencarian PDF, --resume manifest dan penanganan worker crash
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import main
+
+CRASH_MARKER = "crash"
+
+
+def crash_on_marker(fields, path):
+    """parse_path yang mematikan proses worker untuk file bertanda CRASH_MARKER"""
+    if CRASH_MARKER in os.path.basename(path):
+        os._exit(1)
+    return main.PARSE_FUNCTIONS[fields](path, os.path.basename(path))
+
+
+@pytest.fixture
+def inbox(tmp_path, sample_pdfs):
+    """Direktori berisi salinan dua sample PDF"""
+    directory = tmp_path / "inbox"
+    directory.mkdir()
+    for index, path in enumerate(sample_pdfs[:2]):
+        shutil.copy(path, directory / f"faktur-{index}.pdf")
+    return directory
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def run_cli(inbox, tmp_path, *args):
+    output = str(tmp_path / "hasil.jsonl")
+    manifest = str(tmp_path / "hasil.manifest")
+    code = main.main([str(inbox), "-o", output, "--resume", manifest, "-q", *args])
+    return code, read_jsonl(output), read_jsonl(manifest)
+
+
+def test_collect_pdf_paths(tmp_path):
+    for name in ("b/2.PDF", "b/catatan.txt", "a/1.pdf", "a/c/3.pdf", "0.pdf"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"%PDF-")
+
+    paths = main.collect_pdf_paths([str(tmp_path / "b"), str(tmp_path / "a"), str(tmp_path / "hilang.pdf")])
+
+    # Urut per direktori argumen, rekursif; path yang tidak ada dilewati
+    assert [os.path.relpath(path, tmp_path) for path in paths] == ["b/2.PDF", "a/1.pdf", "a/c/3.pdf"]
+    # File diterima apa adanya tanpa cek ekstensi
+    assert main.collect_pdf_paths([str(tmp_path / "b" / "catatan.txt")]) == [str(tmp_path / "b" / "catatan.txt")]
+
+
+def test_resume_skips_recorded_files(inbox, tmp_path, sample_pdfs):
+    code, results, manifest = run_cli(inbox, tmp_path, "--workers", "1")
+    assert code == 0
+    assert [os.path.basename(result["path"]) for result in results] == ["faktur-0.pdf", "faktur-1.pdf"]
+    assert [entry["status"] for entry in manifest] == ["success", "success"]
+
+    shutil.copy(sample_pdfs[2], inbox / "faktur-2.pdf")
+    code, results, manifest = run_cli(inbox, tmp_path, "--workers", "1")
+
+    # Hanya file baru yang diparse dan di-append
+    assert code == 0
+    assert [os.path.basename(result["path"]) for result in results] == ["faktur-0.pdf", "faktur-1.pdf", "faktur-2.pdf"]
+    assert len(manifest) == 3
+
+
+def test_resume_reparses_modified_file(inbox, tmp_path):
+    run_cli(inbox, tmp_path, "--workers", "1")
+    os.utime(inbox / "faktur-0.pdf", ns=(0, 0))
+
+    _, results, manifest = run_cli(inbox, tmp_path, "--workers", "1")
+
+    assert [os.path.basename(result["path"]) for result in results[2:]] == ["faktur-0.pdf"]
+    assert len(manifest) == 3
+
+
+def test_worker_crash_is_not_recorded_in_manifest(inbox, tmp_path, sample_pdfs, monkeypatch):
+    monkeypatch.setattr(main, "parse_path", crash_on_marker)
+    monkeypatch.setattr(main, "MAX_WORKER_RETRIES", 1)
+    shutil.copy(sample_pdfs[2], inbox / f"faktur-{CRASH_MARKER}.pdf")
+
+    code, results, manifest = run_cli(inbox, tmp_path, "--workers", "2")
+
+    # File lain yang ikut gagal saat pool rusak dikirim ulang ke executor baru
+    assert code == 2
+    statuses = {os.path.basename(result["path"]): (result["status"], result.get("error_type")) for result in results}
+    assert statuses == {
+        "faktur-0.pdf": ("success", None),
+        "faktur-1.pdf": ("success", None),
+        f"faktur-{CRASH_MARKER}.pdf": ("error", "BrokenProcessPool"),
+    }
+    assert sorted(os.path.basename(entry["path"]) for entry in manifest) == ["faktur-0.pdf", "faktur-1.pdf"]
+
+    # --resume berikutnya mencoba lagi file yang crash
+    os.rename(inbox / f"faktur-{CRASH_MARKER}.pdf", inbox / "faktur-2.pdf")
+    code, results, manifest = run_cli(inbox, tmp_path, "--workers", "2")
+    assert code == 0
+    assert os.path.basename(results[-1]["path"]) == "faktur-2.pdf"
+    assert len(manifest) == 3
@@ -0,0 +1,117 @@
+"""
+Test metrik Prometheus (metrics.py) dan endpoint GET /metrics
+"""
+
+import os
+import re
+
+from metrics import Counter, Histogram, MetricsRegistry
+
+# Satu sample format teks Prometheus: nama{label="nilai",...} nilai
+SAMPLE_PATTERN = re.compile(
+    r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{(?P<labels>[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*")*)\})?'
+    r' (?P<value>[-+]?(?:\d+(?:\.\d*)?(?:e[-+]?\d+)?|Inf))$'
+)
+
+
+def parse_exposition(text):
+    """Parse teks /metrics: {nama metrik: tipe}, list (nama sample, labels, nilai); gagal jika format salah"""
+    assert text.endswith("\n")
+    types = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ")
+            assert metric_type in ("counter", "histogram")
+            types[name] = metric_type
+            continue
+        match = SAMPLE_PATTERN.match(line)
+        assert match, f"baris tidak valid: {line!r}"
+        name = match.group("name")
+        assert re.sub(r"_(bucket|sum|count)$", "", name) in types or name in types, f"TYPE tidak ada untuk {name}"
+        labels = dict(re.findall(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"', match.group("labels") or ""))
+        samples.append((name, labels, float(match.group("value"))))
+    return types, samples
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Durasi", (0.1, 1.0), ("stage",))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="total")
+
+    assert histogram.render() == [
+        "# HELP test_seconds Durasi",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="total",le="0.1"} 2',
+        'test_seconds_bucket{stage="total",le="1"} 3',
+        'test_seconds_bucket{stage="total",le="+Inf"} 4',
+        'test_seconds_sum{stage="total"} 3.65',
+        'test_seconds_count{stage="total"} 4',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_total", "Jumlah", ("error_type",))
+    counter.inc(error_type='Kutip "ganda"\\baris\nbaru')
+    counter.inc(2, error_type='Kutip "ganda"\\baris\nbaru')
+
+    assert counter.render()[2] == 'test_total{error_type="Kutip \\"ganda\\"\\\\baris\\nbaru"} 3'
+
+
+def test_registry_render_is_valid_exposition():
+    registry = MetricsRegistry()
+    profile = {"total": 0.2, "stages": {"open": 0.01, "table": 0.12}, "pages": 2}
+    registry.observe_upload(120_000)
+    registry.observe_result({"status": "success", "total_items": 7}, "parse", profile)
+    registry.observe_result({"status": "error", "error_type": "InvalidPDF"}, "parse")
+    registry.observe_result({"status": "success", "total_items": 7}, "cache")
+
+    types, samples = parse_exposition(registry.render())
+
+    assert types == {
+        "coretax_parse_stage_seconds": "histogram",
+        "coretax_pdf_pages": "histogram",
+        "coretax_invoice_items": "histogram",
+        "coretax_upload_bytes": "histogram",
+        "coretax_parse_results_total": "counter",
+    }
+    values = {(name, tuple(sorted(labels.items()))): value for name, labels, value in samples}
+    assert values[("coretax_parse_stage_seconds_count", (("stage", "table"),))] == 1
+    assert values[("coretax_pdf_pages_bucket", (("le", "2"),))] == 1
+    assert values[("coretax_invoice_items_count", ())] == 1
+    assert values[("coretax_parse_results_total", (("error_type", "InvalidPDF"), ("source", "parse"), ("status", "error")))] == 1
+    assert values[("coretax_parse_results_total", (("error_type", ""), ("source", "cache"), ("status", "success")))] == 1
+
+
+def test_metrics_endpoint(client, sample_pdfs):
+    with open(sample_pdfs[0], "rb") as f:
+        files = [("file", (os.path.basename(sample_pdfs[0]), f.read(), "application/pdf"))]
+    assert client.post("/parse", files=files).status_code == 200
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    types, samples = parse_exposition(response.text)
+    assert types["coretax_parse_results_total"] == "counter"
+
+    results = [(labels, value) for name, labels, value in samples if name == "coretax_parse_results_total"]
+    assert any(labels["status"] == "success" and value >= 1 for labels, value in results)
+
+    # Bucket histogram kumulatif dan bucket +Inf sama dengan _count
+    buckets = {}
+    counts = {}
+    for name, labels, value in samples:
+        series = (re.sub(r"_(bucket|count)$", "", name), labels.get("stage"))
+        if name.endswith("_bucket"):
+            buckets.setdefault(series, []).append((labels["le"], value))
+        elif name.endswith("_count"):
+            counts[series] = value
+    assert buckets
+    for series, series_buckets in buckets.items():
+        values = [value for _, value in series_buckets]
+        assert values == sorted(values)
+        assert series_buckets[-1] == ("+Inf", counts[series])
@@ -0,0 +1,301 @@
+"""
+Test unit parser.py: scanner metadata, pipeline halaman single pass, region crop, backend pdfium,
+dan penggabungan baris tabel item
+"""
+
+import io
+import os
+import random
+
+import pdfplumber
+import pytest
+
+import parser as pdf_parser
+import snapshot
+
+# Sample 3 halaman (tabel item berlanjut ke halaman berikutnya)
+MULTI_PAGE_SAMPLE = (
+    "InputTaxInvoice-c4584356-8d38-4e4c-998b-13f5e249e7c7-0926938929422000-04002500405834346-0855794491114000.pdf"
+)
+
+
+def read_sample(filename):
+    with open(os.path.join(snapshot.DEFAULT_CORPUS, filename), "rb") as f:
+        return f.read()
+
+
+# Potongan header Coretax (format teks pdfplumber/pdfium); "Nama:" di baris kedua bukan section
+HEADER_TEXT = """Faktur Pajak
+Nama: SAUDARA PRATAMA
+Kode dan Nomor Seri Faktur Pajak: 04002500373856589
+Pengusaha Kena Pajak:
+Nama : SAUDARA PRATAMA
+Alamat : JL BRIGJEND KATAMSO NO.95, KOTA MEDAN
+NPWP : 0021.0571.8712-2000
+Pembeli Barang Kena Pajak/Penerima Jasa Kena Pajak:
+Nama : ANUGERAH TEMAN SETIA
+Alamat : JALAN KEMUNING, KOTA PADANGSIDIMPUAN
+NPWP : 0637531807118000
+NIK : -
+1 000000
+LENCANA MERAH
+Rp 155.540,54 x 150,00 Lainnya
+KOTA MEDAN, 3 November 2025
+"""
+
+HEADER_METADATA = {
+    "invoice_number": "04002500373856589",
+    "invoice_date": "3 November 2025",
+    "supplier_name": "SAUDARA PRATAMA",
+    "supplier_npwp": "0021057187122000",
+    "buyer_name": "ANUGERAH TEMAN SETIA",
+    "buyer_npwp": "0637531807118000",
+}
+
+# Potongan teks untuk fuzzing scanner vs regex referensi
+METADATA_FRAGMENTS = [
+    "Kode dan Nomor Seri Faktur Pajak: 04002500373856589", "Nomor Seri Faktur Pajak:", "Pengusaha Kena Pajak:",
+    "Pembeli Barang Kena Pajak", "Nama : PT SATU", "Nama: DUA", "Nama :", "NPWP : 01.234.567-8", "NPWP:",
+    "NPWP : -", "17 Januari 2025", "123 Maret 2024", "Desember 2025", " 9\nMei 2024", "Rp 1.000,00 x 2,00",
+    "Naxa : BUKAN", "Pengusaha", "Nama", "NPWP", "\n", " ", "7",
+]
+
+
+def item_row(no, name, unit_price, quantity, total, code="000000", discount="0,00"):
+    """Baris tabel item Coretax: (no, kode, detail, total)"""
+    detail = f"{name}\nRp {unit_price} x {quantity} Lainnya\nPotongan Harga = Rp {discount}\nPPnBM (0,00%) = Rp 0,00"
+    return (no, code, detail, total)
+
+
+def test_table_item_rows_skips_short_rows():
+    table = [["Judul", None], [" 1 ", None, "NAMA", " 1.000,00 "], ["No.", "Kode", "Nama", "Harga", "extra"]]
+
+    assert pdf_parser.table_item_rows(table) == [("1", "", "NAMA", "1.000,00"), ("No.", "Kode", "Nama", "Harga")]
+
+
+def test_continuation_rows_join_active_item():
+    no, code, detail, total = item_row("1", "LENCANA MERAH", "1.000,00", "3,00", "2.500,00", discount="500,00")
+    first, rest = detail.split("\n", 1)
+    rows = [
+        ("No.", "Kode", "Nama Barang", "Harga Jual"),
+        (no, code, first, total),
+        ("", "", rest, ""),
+        item_row("2", "CAKRA KEMBAR", "200,00", "5,00", "1.000,00"),
+    ]
+
+    items = pdf_parser.extract_items_from_rows(rows)
+
+    assert [(item["no"], item["nama_barang"], item["quantity"], item["discount"], item["total"]) for item in items] == [
+        ("1", "LENCANA MERAH", 3.0, 500.0, 2500.0),
+        ("2", "CAKRA KEMBAR", 5.0, 0.0, 1000.0),
+    ]
+
+
+def test_stacked_items_in_one_cell_are_split():
+    _, _, detail_8, _ = item_row("8", "BARANG DELAPAN", "100,00", "2,00", "200,00")
+    _, _, detail_9, _ = item_row("9", "BARANG SEMBILAN", "50,00", "4,00", "200,00")
+
+    items = pdf_parser.process_item_buffer({
+        "no": "8\n9", "code": "000001\n000002", "detail": detail_8 + "\n" + detail_9, "total_col": "200,00\n200,00"
+    })
+
+    assert [(item["no"], item["item_code"], item["unit_price"], item["quantity"]) for item in items] == [
+        ("8", "000001", 100.0, 2.0),
+        ("9", "000002", 50.0, 4.0),
+    ]
+    assert items[0]["nama_barang"] == "BARANG DELAPAN"
+    assert items[1]["nama_barang"].endswith("BARANG SEMBILAN")
+
+
+def test_metadata_scanner_reads_header():
+    assert pdf_parser.extract_invoice_metadata(HEADER_TEXT) == HEADER_METADATA
+    assert pdf_parser.extract_invoice_metadata_regex(HEADER_TEXT) == HEADER_METADATA
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Tanpa label sama sekali
+    ("Faktur Pajak", {}),
+    # Nama/NPWP sebelum label section diabaikan
+    ("Nama : X\nNPWP : 1\nPengusaha Kena Pajak:\nNama : PT A\nNPWP : 02.000", {
+        "supplier_name": "PT A", "supplier_npwp": "02000"
+    }),
+    # NPWP di baris Nama bukan milik section; yang dipakai NPWP setelah baris Nama
+    ("Pembeli Barang Kena Pajak\nNama : PT B NPWP : 9\nNPWP : 0637", {
+        "buyer_name": "PT B NPWP : 9", "buyer_npwp": "0637"
+    }),
+    # Tanggal: maksimal 2 digit sebelum nama bulan, nama bulan tanpa tanggal dilewati
+    ("Desember 2025\n123 Januari 2025", {"invoice_date": "23 Januari 2025"}),
+    # Nomor seri pertama yang punya angka dipakai
+    ("Nomor Seri Faktur Pajak: -\nNomor Seri Faktur Pajak: 0400", {"invoice_number": "0400"}),
+])
+def test_metadata_scanner_cases(text, expected):
+    metadata = dict(pdf_parser.empty_invoice_metadata(), **expected)
+
+    assert pdf_parser.extract_invoice_metadata(text) == metadata
+    assert pdf_parser.extract_invoice_metadata_regex(text) == metadata
+
+
+def test_metadata_scanner_falls_back_when_name_has_no_npwp(monkeypatch):
+    # Baris Nama tanpa NPWP sesudahnya: regex referensi backtrack ke NPWP di baris Nama
+    text = "Pengusaha Kena Pajak:\nNama : PT C\nNPWP : 0101\nPembeli Barang Kena Pajak\nNama : PT D NPWP : 0202"
+    searched = []
+    original = pdf_parser.BUYER_SECTION_PATTERN
+
+    class RecordingPattern:
+        def search(self, full_text):
+            searched.append(full_text)
+            return original.search(full_text)
+
+    monkeypatch.setattr(pdf_parser, "BUYER_SECTION_PATTERN", RecordingPattern())
+    metadata = pdf_parser.extract_invoice_metadata(text)
+
+    assert len(searched) == 1
+    assert (metadata["supplier_npwp"], metadata["buyer_name"], metadata["buyer_npwp"]) == ("0101", "PT D", "0202")
+
+
+def test_metadata_scanner_stops_when_complete(monkeypatch):
+    tokens = []
+    original = pdf_parser.METADATA_TOKEN_PATTERN
+
+    class RecordingPattern:
+        def finditer(self, full_text):
+            for token in original.finditer(full_text):
+                tokens.append(token.lastgroup)
+                yield token
+
+    monkeypatch.setattr(pdf_parser, "METADATA_TOKEN_PATTERN", RecordingPattern())
+    metadata = pdf_parser.extract_invoice_metadata(HEADER_TEXT + "Nomor Seri Faktur Pajak: 999\n" * 100)
+
+    assert metadata == HEADER_METADATA
+    # Token terakhir yang dibaca adalah tanggal; sisa teks tidak di-scan
+    assert tokens[-1] == "month" and "invoice" not in tokens[tokens.index("month"):]
+
+
+def test_metadata_token_pattern_matches_each_label():
+    pattern = pdf_parser.build_metadata_token_pattern()
+    text = "Nomor Seri Faktur Pajak: Nama  : NPWP: Pengusaha Kena Pajak: Pembeli Barang Kena Pajak 17 Agustus 2025"
+
+    tokens = [(token.lastgroup, token.group()) for token in pattern.finditer(text)]
+
+    assert tokens == [
+        ("invoice", "Nomor Seri Faktur Pajak:"),
+        ("name", "Nama  :"),
+        ("npwp", "NPWP:"),
+        ("supplier", "Pengusaha Kena Pajak:"),
+        ("buyer", "Pembeli Barang Kena Pajak"),
+        ("month", "Agustus 2025"),
+    ]
+    # Dua karakter pertama saja tidak cukup: sisa label harus cocok
+    assert list(pattern.finditer("Naxa : NPxx : Pengusaha Pajak Agustusan 2025")) == []
+
+
+def test_metadata_scanner_matches_regex_on_fuzzed_text():
+    rng = random.Random(15)
+    for _ in range(2000):
+        text = "\n".join(rng.choice(METADATA_FRAGMENTS) for _ in range(rng.randint(1, 12)))
+        assert pdf_parser.extract_invoice_metadata(text) == pdf_parser.extract_invoice_metadata_regex(text), text
+
+
+def test_metadata_scanner_matches_regex_on_corpus(sample_pdfs):
+    for path in sample_pdfs[:5]:
+        with open(path, "rb") as f:
+            text = "\n".join(text for text, _ in pdf_parser.PdfiumBackend().iter_pages(f))
+        metadata = pdf_parser.extract_invoice_metadata(text)
+        assert metadata == pdf_parser.extract_invoice_metadata_regex(text)
+        assert None not in metadata.values()
+
+
+def test_metadata_only_error_has_result_shape():
+    result = pdf_parser.parse_pdf_metadata(b"bukan pdf", "rusak.pdf")
+
+    assert result == dict(
+        pdf_parser.error_result("rusak.pdf", Exception(result["error"])),
+        error_type=result["error_type"], pages_scanned=0
+    )
+    assert result["items"] == [] and result["validation"] is None
+
+
+def test_single_pass_matches_separate_text_and_table_extraction():
+    content = read_sample(MULTI_PAGE_SAMPLE)
+
+    pages = list(pdf_parser.PdfplumberBackend().iter_pages(io.BytesIO(content)))
+
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        expected = [(page.extract_text() or "", page.extract_table(pdf_parser.TABLE_SETTINGS)) for page in pdf.pages]
+    assert len(pages) == 3
+    assert pages == expected
+
+
+def test_iter_pages_releases_each_page(monkeypatch):
+    flushed = []
+    original = pdfplumber.page.Page.flush_cache
+
+    def counting(page, *args, **kwargs):
+        flushed.append(page.page_number)
+        return original(page, *args, **kwargs)
+
+    monkeypatch.setattr(pdfplumber.page.Page, "flush_cache", counting)
+    backend = pdf_parser.PdfplumberBackend()
+
+    pages = backend.iter_pages(io.BytesIO(read_sample(MULTI_PAGE_SAMPLE)))
+    for number, (text, _) in enumerate(pages, start=1):
+        # Cache objek halaman sudah dibuang begitu teks & tabelnya di-yield
+        assert text
+        assert flushed == list(range(1, number + 1))
+    assert flushed == [1, 2, 3]
+
+
+@pytest.mark.parametrize("crop_regions", [False, True])
+def test_stage_timings_cover_pipeline(crop_regions):
+    content = read_sample(MULTI_PAGE_SAMPLE)
+
+    with pdf_parser.collect_stage_timings() as timings, pdf_parser.open_pdf_source(content) as pdf_file:
+        result = pdf_parser.extract_invoice_data(pdf_file, MULTI_PAGE_SAMPLE, crop_regions=crop_regions, use_templates=False)
+
+    assert result["status"] == "success"
+    assert {"open", "layout", "text", "table", "metadata", "items"} <= set(timings)
+
+
+def test_page_regions_split_header_items_summary():
+    with pdfplumber.open(io.BytesIO(read_sample(MULTI_PAGE_SAMPLE))) as pdf:
+        first, summary_page = [pdf_parser.find_page_regions(page) for page in pdf.pages[:2]]
+
+    # Halaman pertama: kotak metadata di atas grid tabel item, tanpa blok summary
+    assert first["table"].bbox[1] < first["grid_top"] < first["bottom"]
+    assert first["summary_top"] is None
+    # Blok "Harga Jual / Penggantian / ..." ada di halaman kedua, di bawah item terakhir
+    assert summary_page["grid_top"] < summary_page["summary_top"] < summary_page["bottom"]
+
+
+def test_crop_mode_extracts_same_items_with_less_text():
+    with pdfplumber.open(io.BytesIO(read_sample(MULTI_PAGE_SAMPLE))) as pdf:
+        cropped = [pdf_parser.extract_page_content(page, crop_regions=True) for page in pdf.pages]
+        full = [pdf_parser.extract_page_content(page, crop_regions=False) for page in pdf.pages]
+
+    def items(pages):
+        rows = [row for _, table in pages if table for row in pdf_parser.table_item_rows(table)]
+        return pdf_parser.extract_items_from_rows(rows)
+
+    assert items(cropped) == items(full)
+    # Teks baris item tidak di-layout; metadata dan summary tetap ada
+    cropped_text = "\n".join(text for text, _ in cropped)
+    assert len(cropped_text) < len("\n".join(text for text, _ in full))
+    assert "Kode dan Nomor Seri Faktur Pajak: 04002500405834346" in cropped_text
+    assert "Harga Jual / Penggantian / Uang Muka / Termin 146.344.032,00" in cropped_text
+
+
+def test_pdfium_opens_pdfplumber_only_for_item_pages(monkeypatch):
+    opened = []
+    original = pdf_parser.extract_page_content
+
+    def counting(page, *args, **kwargs):
+        opened.append(page.page_number)
+        return original(page, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_parser, "extract_page_content", counting)
+    pages = list(pdf_parser.PdfiumBackend().iter_pages(io.BytesIO(read_sample(MULTI_PAGE_SAMPLE))))
+
+    # Halaman 3 hanya berisi footer tanda tangan: tanpa pola item, tabel tidak dicari
+    assert opened == [1, 2]
+    assert [table is not None for _, table in pages] == [True, True, False]
+    assert "Harga Jual / Penggantian / Uang Muka / Termin" in pages[1][0]
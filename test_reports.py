@@ -0,0 +1,128 @@
+"""
+Test laporan agregat (reports.py) dan endpoint /reports/aggregate, dengan dan tanpa NumPy
+"""
+
+import pytest
+
+import api
+import reports
+from invoice_store import InvoiceStore
+
+
+def item(code, quantity, total, nama_barang=None):
+    return {
+        "no": "1", "item_code": code, "nama_barang": nama_barang or f"BARANG {code}", "quantity": quantity,
+        "unit": "PCS", "unit_price": total / quantity if quantity else 0.0, "discount": 0.0, "total": total
+    }
+
+
+def invoice_result(invoice_number, supplier_npwp, invoice_date, items, pdf_total=None):
+    calculated = sum(entry["total"] for entry in items)
+    pdf_total = calculated if pdf_total is None else pdf_total
+    return {
+        "filename": f"{invoice_number}.pdf",
+        "status": "success",
+        "metadata": {
+            "invoice_number": invoice_number,
+            "invoice_date": invoice_date,
+            "supplier_name": f"SUPPLIER {supplier_npwp}",
+            "supplier_npwp": supplier_npwp,
+            "buyer_name": "PEMBELI",
+            "buyer_npwp": "B1"
+        },
+        "items": items,
+        "total_items": len(items),
+        "validation": {
+            "calculated_total": calculated,
+            "pdf_total": pdf_total,
+            "difference": round(pdf_total - calculated, 2),
+            "is_valid": pdf_total == calculated
+        }
+    }
+
+
+RESULTS = [
+    invoice_result("001", "S1", "03 November 2025", [item("K1", 2.0, 1000.0), item("K2", 1.0, 250.5)]),
+    invoice_result("002", "S1", "15 November 2025", [item("K1", 3.0, 1500.0)], pdf_total=1500.25),
+    invoice_result("003", "S2", "01 Desember 2025", [item("K3", 1.0, 99.99), item(None, 1.0, 10.0)]),
+    {"filename": "rusak.pdf", "status": "error", "error": "rusak", "metadata": {}, "items": [], "validation": None},
+    {"filename": "001.pdf", "status": "duplicate", "metadata": {"invoice_number": "001"}},
+]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Jalankan test dengan group-by NumPy dan fallback Python murni"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(reports, "np", None)
+    return request.param
+
+
+def test_report_sums(backend):
+    report = reports.aggregate_results(RESULTS)
+
+    assert (report["total_invoices"], report["total_failed"], report["total_items"]) == (3, 1, 5)
+    assert report["by_supplier"] == [
+        {"supplier_npwp": "S1", "supplier_name": "SUPPLIER S1", "invoices": 2, "total": 2750.5},
+        {"supplier_npwp": "S2", "supplier_name": "SUPPLIER S2", "invoices": 1, "total": 109.99},
+    ]
+    assert report["by_item_code"] == [
+        {"item_code": "K1", "nama_barang": "BARANG K1", "items": 2, "quantity": 5.0, "total": 2500.0},
+        {"item_code": "K2", "nama_barang": "BARANG K2", "items": 1, "quantity": 1.0, "total": 250.5},
+        {"item_code": "K3", "nama_barang": "BARANG K3", "items": 1, "quantity": 1.0, "total": 99.99},
+        {"item_code": None, "nama_barang": "BARANG None", "items": 1, "quantity": 1.0, "total": 10.0},
+    ]
+    assert report["by_month"] == [
+        {"month": "2025-11", "invoices": 2, "total": 2750.5},
+        {"month": "2025-12", "invoices": 1, "total": 109.99},
+    ]
+    assert report["validation"] == {
+        "calculated_total": 2860.49, "pdf_total": 2860.74, "difference_total": 0.25, "valid": 2, "invalid": 1
+    }
+
+
+def test_numpy_and_python_paths_match(monkeypatch):
+    pytest.importorskip("numpy")
+    keys = ["b", None, "a", "b", "a", "c"] * 50
+    values = {"total": [1.5, 2.0, None, 3.25, 4.0, 0.1] * 50, "quantity": [1.0, None, 2.0, 3.0, 4.0, 5.0] * 50}
+    with_numpy = reports.group_sums(keys, values), reports.column_sum(values["total"])
+
+    monkeypatch.setattr(reports, "np", None)
+    without_numpy = reports.group_sums(keys, values), reports.column_sum(values["total"])
+
+    (unique, counts, sums), total = with_numpy
+    assert (unique, counts) == (without_numpy[0][0], without_numpy[0][1])
+    for name in values:
+        assert sums[name] == pytest.approx(without_numpy[0][2][name])
+    assert total == pytest.approx(without_numpy[1])
+
+
+def test_empty_report(backend):
+    report = reports.aggregate_results([])
+
+    assert report["by_supplier"] == [] and report["by_item_code"] == [] and report["by_month"] == []
+    assert report["validation"]["calculated_total"] == 0.0
+
+
+def test_post_report_endpoint(client):
+    response = client.post("/reports/aggregate", json={"results": RESULTS})
+
+    assert response.status_code == 200
+    assert response.json() == reports.aggregate_results(RESULTS)
+    assert client.post("/reports/aggregate", content=b"bukan json").status_code == 400
+
+
+def test_stored_report_matches_posted_results(client, tmp_path, monkeypatch):
+    store = InvoiceStore(str(tmp_path / "invoice_store.db"))
+    for result in RESULTS[:3]:
+        store.put(result)
+    monkeypatch.setattr(api, "invoice_store", store)
+
+    report = client.get("/reports/aggregate").json()
+    expected = reports.aggregate_results(RESULTS[:3])
+
+    for name in ("total_invoices", "total_items", "by_supplier", "by_month", "validation"):
+        assert report[name] == expected[name]
+    assert client.get("/reports/aggregate", params={"supplier_npwp": "S2"}).json()["total_invoices"] == 1
@@ -0,0 +1,200 @@
+"""
+Test format response (serialization.py): compact/columnar, negosiasi gzip/brotli, dan encoder JSON
+"""
+
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+
+import serialization
+from serialization import choose_encoding, format_batch, format_result, json_response, parse_accept_encoding
+
+RESULT = {
+    "filename": "faktur.pdf",
+    "status": "success",
+    "items": [
+        {"no": "1", "nama_barang": "LENCANA MERAH", "total": 1000.0, "total_formatted": "Rp 1.000,00"},
+        {"no": "2", "nama_barang": "CAKRA KEMBAR", "total": 250.5, "total_formatted": "Rp 250,50", "unit": "PCS"},
+    ],
+    "validation": {"calculated_total": 1250.5, "calculated_total_formatted": "Rp 1.250,50", "is_valid": True},
+}
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    """Negosiasi seolah package brotli terinstall (hanya choose_encoding, tanpa kompresi)"""
+    monkeypatch.setattr(serialization, "brotli", object())
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_full_format_returns_result_unchanged():
+    assert format_result(RESULT) is RESULT
+
+
+def test_compact_format_strips_formatted_fields():
+    compact = format_result(RESULT, "compact")
+
+    assert compact["items"] == [
+        {"no": "1", "nama_barang": "LENCANA MERAH", "total": 1000.0},
+        {"no": "2", "nama_barang": "CAKRA KEMBAR", "total": 250.5, "unit": "PCS"},
+    ]
+    assert compact["validation"] == {"calculated_total": 1250.5, "is_valid": True}
+    # Hasil asli (mis. milik cache) tidak ikut berubah
+    assert "total_formatted" in RESULT["items"][0]
+
+
+def test_columnar_format_fills_missing_keys():
+    columnar = format_result(RESULT, "columnar")
+
+    assert columnar["items"] == {
+        "no": ["1", "2"],
+        "nama_barang": ["LENCANA MERAH", "CAKRA KEMBAR"],
+        "total": [1000.0, 250.5],
+        "unit": [None, "PCS"],
+    }
+    assert columnar["validation"] == format_result(RESULT, "compact")["validation"]
+
+
+def test_format_error_result_without_items():
+    error = {"filename": "rusak.pdf", "status": "error", "error": "rusak", "validation": None}
+
+    assert format_result(error, "columnar") == error
+    assert format_result(dict(error, items=[]), "columnar")["items"] == {}
+
+
+def test_format_batch_applies_to_each_result():
+    summary = {"total_files": 2, "results": [RESULT, RESULT]}
+
+    assert format_batch(summary) is summary
+    assert format_batch(summary, "compact")["results"] == [format_result(RESULT, "compact")] * 2
+    assert format_batch({"total_files": 0}, "compact") == {"total_files": 0}
+
+
+def test_invalid_response_format_is_rejected():
+    assert serialization.resolve_response_format(None) == "full"
+    with pytest.raises(serialization.HTTPException) as error:
+        serialization.resolve_response_format("xml")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, {}),
+    ("gzip, deflate, br", {"gzip": 1.0, "deflate": 1.0, "br": 1.0}),
+    ("GZIP;q=0.5, br;q=0", {"gzip": 0.5, "br": 0.0}),
+    ("gzip;q=abc, *;q=0.1", {"gzip": 0.0, "*": 0.1}),
+])
+def test_parse_accept_encoding(header, expected):
+    assert parse_accept_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("identity", None),
+    (None, None),
+])
+def test_choose_encoding_with_brotli(with_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "gzip"),
+    ("br", None),
+    ("*", "gzip"),
+])
+def test_choose_encoding_without_brotli(without_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_small_body_is_not_compressed(without_brotli):
+    response = run(json_response({"status": "ok"}, "gzip"))
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert json.loads(response.body) == {"status": "ok"}
+
+
+@pytest.mark.parametrize("size", [
+    serialization.RESPONSE_COMPRESS_MIN_BYTES, serialization.COMPRESS_THREADPOOL_MIN_BYTES
+])
+def test_large_body_is_gzipped(without_brotli, monkeypatch, size):
+    offloaded = []
+    original = serialization.run_in_threadpool
+
+    async def recording(func, *args):
+        offloaded.append(func)
+        return await original(func, *args)
+
+    monkeypatch.setattr(serialization, "run_in_threadpool", recording)
+    content = {"data": "x" * size}
+
+    response = run(json_response(content, "br;q=0.9, gzip"))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == content
+    # Hanya body besar yang dikompres di thread pool
+    assert offloaded == ([serialization.compress] if size >= serialization.COMPRESS_THREADPOOL_MIN_BYTES else [])
+
+
+def test_large_body_is_brotli_compressed():
+    brotli = pytest.importorskip("brotli")
+    content = {"data": "x" * serialization.RESPONSE_COMPRESS_MIN_BYTES}
+
+    response = run(json_response(content, "gzip, br"))
+
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(response.body)) == content
+
+
+def test_compression_disabled(monkeypatch):
+    monkeypatch.setattr(serialization, "RESPONSE_COMPRESS_MIN_BYTES", 0)
+
+    response = run(json_response({"data": "x" * 10000}, "gzip", status_code=201, headers={"X-Cache": "hit"}))
+
+    assert response.status_code == 201
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+    assert response.headers["x-cache"] == "hit"
+
+
+def test_stdlib_json_fallback_matches_orjson(monkeypatch):
+    content = format_result(RESULT, "columnar")
+    encoded = serialization.dumps(content)
+
+    monkeypatch.setattr(serialization, "orjson", None)
+
+    assert serialization.dumps(content) == encoded
+    assert serialization.loads(encoded) == content
+    # Non-ASCII tidak di-escape
+    assert serialization.dumps({"nama": "Café"}) == "{\"nama\":\"Café\"}".encode("utf-8")
+
+
+def test_parse_endpoint_format_and_gzip(client, sample_pdfs):
+    with open(sample_pdfs[0], "rb") as f:
+        files = [("file", (os.path.basename(sample_pdfs[0]), f.read(), "application/pdf"))]
+
+    full = client.post("/parse", files=files, headers={"Accept-Encoding": "gzip"})
+    columnar = client.post(
+        "/parse", files=files, params={"format": "columnar"}, headers={"Accept-Encoding": "identity"}
+    )
+
+    assert full.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in columnar.headers
+    assert len(columnar.content) < len(serialization.dumps(full.json()))
+    assert columnar.json()["items"] == serialization.items_to_columns(
+        [serialization.strip_formatted(item) for item in full.json()["items"]]
+    )
+    assert client.post("/parse", files=files, params={"format": "xml"}).status_code == 400
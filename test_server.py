@@ -0,0 +1,60 @@
+"""
+Test launcher pre-fork (server.py): pembagian proses parser dan preload di master
+"""
+
+import os
+
+import pytest
+
+import layout_templates
+import parser as pdf_parser
+import server
+from layout_templates import LayoutTemplateStore
+
+
+@pytest.mark.parametrize("total, workers, expected", [
+    (8, 4, 2),
+    (8, 3, 2),
+    (2, 4, 1),
+    (8, 1, 8),
+    (0, 4, 0),
+])
+def test_split_parser_workers(total, workers, expected):
+    assert server.split_parser_workers(total, workers) == expected
+
+
+def test_main_exports_parser_workers_per_worker(monkeypatch):
+    monkeypatch.setenv("PARSER_WORKERS", "0")
+    launched = []
+
+    class FakeServer:
+        def __init__(self, config, workers):
+            launched.append((os.environ["PARSER_WORKERS"], workers))
+
+        def run(self):
+            return 0
+
+    def fake_preload():
+        launched.append(os.environ["PARSER_WORKERS"])
+        return {"import": 0.0, "warmup": 0.0}
+
+    monkeypatch.setattr(server, "preload", fake_preload)
+    monkeypatch.setattr(server, "PreforkServer", FakeServer)
+
+    assert server.main(["--workers", "4", "--parser-workers", "8"]) == 0
+    # PARSER_WORKERS per worker sudah di-set sebelum preload meng-import worker_pool
+    assert launched == ["2", ("2", 4)]
+
+
+def test_preload_closes_template_connection(tmp_path, monkeypatch):
+    store = LayoutTemplateStore(str(tmp_path / "layout_templates.db"))
+    monkeypatch.setattr(layout_templates, "layout_templates", store)
+    monkeypatch.setattr(pdf_parser, "layout_templates", store)
+
+    timings = server.preload()
+
+    assert set(timings) == {"import", "warmup"}
+    # Koneksi store dari warm-up ditutup agar tidak dibawa melewati fork
+    assert store._conn is None
+    assert store.count() == 1
+    store.close()
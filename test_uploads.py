@@ -0,0 +1,208 @@
+"""
+Test pembacaan upload dengan memori terbatas (uploads.py): parsing multipart streaming,
+spool ke disk dan batas ukuran (413)
+"""
+
+import asyncio
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from conftest import TEST_DATA_DIR, TEST_MAX_FILE_BYTES, TEST_MAX_REQUEST_BYTES
+from uploads import (
+    UPLOAD_SPOOL_THRESHOLD, InvalidUpload, RequestSizeLimitMiddleware, UploadTooLarge, discard_uploads,
+    read_multipart_uploads
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def spool_files():
+    return [name for name in os.listdir(TEST_DATA_DIR) if name.startswith("coretax-upload-")]
+
+
+def pdf_part(field, filename, size):
+    return (field, (filename, b"%PDF-" + b"0" * (size - 5), "application/pdf"))
+
+
+def multipart_body(files, data=None):
+    """(content-type, body) multipart seperti yang dikirim client"""
+    request = httpx.Request("POST", "http://test/", files=files, data=data)
+    return request.headers["content-type"], request.read()
+
+
+def read_body(content_type, body, field_name="files", received=None, **kwargs):
+    """Jalankan read_multipart_uploads atas body yang dikirim per chunk; received mencatat jumlah byte terkirim"""
+    async def stream():
+        for start in range(0, len(body), CHUNK_SIZE):
+            if received is not None:
+                received.append(start + CHUNK_SIZE)
+            yield body[start:start + CHUNK_SIZE]
+
+    return asyncio.run(read_multipart_uploads(content_type, stream(), field_name, **kwargs))
+
+
+def test_small_upload_stays_in_memory():
+    part = pdf_part("files", "kecil.pdf", 1000)
+
+    assert read_body(*multipart_body([part])) == [("kecil.pdf", part[1][1])]
+
+
+def test_large_upload_is_spooled_to_single_file():
+    part = pdf_part("files", "besar.pdf", UPLOAD_SPOOL_THRESHOLD + 1)
+    [(filename, source)] = read_body(*multipart_body([part]))
+    try:
+        assert filename == "besar.pdf"
+        assert isinstance(source, str)
+        assert os.path.dirname(source) == TEST_DATA_DIR
+        # Isi file ditulis langsung ke satu file spool, tanpa salinan perantara
+        assert spool_files() == [os.path.basename(source)]
+        with open(source, "rb") as f:
+            assert f.read() == part[1][1]
+    finally:
+        discard_uploads([(filename, source)])
+    assert not os.path.exists(source)
+
+
+def test_upload_over_file_limit_stops_reading_and_removes_spool():
+    content_type, body = multipart_body([pdf_part("files", "besar.pdf", 4 * UPLOAD_SPOOL_THRESHOLD)])
+    received = []
+
+    with pytest.raises(UploadTooLarge, match="besar.pdf"):
+        read_body(content_type, body, received=received, max_file_bytes=UPLOAD_SPOOL_THRESHOLD + 5)
+
+    assert received[-1] < len(body)
+    assert spool_files() == []
+
+
+def test_filename_checked_before_content_is_read():
+    content_type, body = multipart_body([
+        pdf_part("files", "faktur.pdf", UPLOAD_SPOOL_THRESHOLD + 1),
+        pdf_part("files", "catatan.txt", 2 * UPLOAD_SPOOL_THRESHOLD),
+    ])
+    received = []
+    checked = []
+
+    def check_filename(filename):
+        checked.append(filename)
+        if not filename.endswith(".pdf"):
+            raise ValueError(filename)
+
+    with pytest.raises(ValueError):
+        read_body(content_type, body, received=received, check_filename=check_filename)
+
+    assert checked == ["faktur.pdf", "catatan.txt"]
+    assert received[-1] < len(body)
+    # File pertama yang sudah di-spool ikut dihapus
+    assert spool_files() == []
+
+
+def test_request_total_limit_discards_earlier_files():
+    files = [pdf_part("files", f"faktur-{index}.pdf", UPLOAD_SPOOL_THRESHOLD + 1) for index in range(3)]
+    with pytest.raises(UploadTooLarge, match="Total ukuran"):
+        read_body(*multipart_body(files), max_request_bytes=2 * UPLOAD_SPOOL_THRESHOLD + 10)
+    assert spool_files() == []
+
+
+def test_other_fields_are_ignored():
+    files = [pdf_part("lampiran", "lain.pdf", 100), pdf_part("files", "faktur.pdf", 100)]
+
+    uploads = read_body(*multipart_body(files, data={"catatan": "bukan file"}))
+
+    assert [filename for filename, _ in uploads] == ["faktur.pdf"]
+
+
+@pytest.mark.parametrize("content_type", [None, "application/json", "multipart/form-data"])
+def test_non_multipart_body_is_rejected(content_type):
+    with pytest.raises(InvalidUpload):
+        read_body(content_type, b"{}")
+
+
+def test_truncated_body_removes_spool():
+    content_type, body = multipart_body([pdf_part("files", "besar.pdf", UPLOAD_SPOOL_THRESHOLD + 1)])
+
+    with pytest.raises(InvalidUpload):
+        read_body(content_type, body[:-100])
+    assert spool_files() == []
+
+
+def test_middleware_answers_413_even_if_app_handles_error():
+    # App yang menangkap semua exception tetap tidak bisa menjawab request yang terlalu besar
+    app = FastAPI()
+
+    @app.post("/")
+    async def endpoint(request: Request):
+        try:
+            await request.body()
+        except Exception:
+            return {"status": "diabaikan"}
+        return {"status": "ok"}
+
+    limited = RequestSizeLimitMiddleware(app, max_bytes=1000)
+    with TestClient(limited) as client:
+        response = client.post("/", content=iter([b"0" * 600, b"0" * 600]))
+        assert client.post("/", content=iter([b"0" * 600])).json() == {"status": "ok"}
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Ukuran request melebihi batas 1000 byte"}
+
+
+def test_parse_rejects_file_over_limit(client):
+    response = client.post("/parse", files=[pdf_part("file", "besar.pdf", TEST_MAX_FILE_BYTES + 1)])
+
+    assert response.status_code == 413
+    assert "besar.pdf" in response.json()["detail"]
+    assert spool_files() == []
+
+
+def test_parse_multiple_rejects_request_over_limit(client):
+    size = TEST_MAX_REQUEST_BYTES // 3 + 1
+    files = [pdf_part("files", f"faktur-{index}.pdf", size) for index in range(3)]
+
+    response = client.post("/parse-multiple", files=files)
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"Ukuran request melebihi batas {TEST_MAX_REQUEST_BYTES} byte"
+    assert spool_files() == []
+
+
+def test_chunked_request_over_limit(client):
+    # Tanpa Content-Length: body dihitung oleh middleware saat diterima
+    boundary = "batas"
+    head = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"besar.pdf\"\r\n"
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    chunk = b"0" * (256 * 1024)
+    chunks = [head] + [chunk] * (TEST_MAX_REQUEST_BYTES // len(chunk) + 1) + [f"\r\n--{boundary}--\r\n".encode()]
+
+    response = client.post(
+        "/parse",
+        content=iter(chunks),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"Ukuran request melebihi batas {TEST_MAX_REQUEST_BYTES} byte"
+    assert spool_files() == []
+
+
+def test_parse_multiple_rejects_non_pdf_before_reading(client):
+    files = [pdf_part("files", "faktur.pdf", 1000), ("files", ("catatan.txt", b"teks", "text/plain"))]
+
+    response = client.post("/parse-multiple", files=files)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File 'catatan.txt' bukan PDF. Semua file harus berformat PDF"
+
+
+def test_parse_requires_one_file(client):
+    assert client.post("/parse", files=[pdf_part("lain", "faktur.pdf", 100)]).json()["detail"] == (
+        "Minimal harus upload 1 file"
+    )
+    response = client.post("/parse", files=[pdf_part("file", f"faktur-{index}.pdf", 100) for index in range(2)])
+    assert response.status_code == 400
+    assert spool_files() == []
@@ -0,0 +1,167 @@
+"""
+Test daemon watch folder (watcher.py): debounce file yang masih ditulis, manifest, dan worker crash
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import watcher
+from watcher import FolderWatcher
+
+CRASH_MARKER = "crash"
+
+
+def crash_on_marker(path):
+    """parse_path yang mematikan proses worker untuk file bertanda CRASH_MARKER"""
+    if CRASH_MARKER in os.path.basename(path):
+        os._exit(1)
+    return watcher.pdf_parser.parse_pdf_file(path, os.path.basename(path))
+
+
+def crash_once(path):
+    """parse_path yang mematikan worker satu kali per file (selama file flag-nya masih ada)"""
+    flag = path + ".flag"
+    if os.path.exists(flag):
+        os.remove(flag)
+        os._exit(1)
+    return watcher.pdf_parser.parse_pdf_file(path, os.path.basename(path))
+
+
+class Clock:
+    """Pengganti time.monotonic yang dimajukan manual"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(watcher.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    directory = tmp_path / "inbox"
+    directory.mkdir()
+    return directory
+
+
+def make_watcher(inbox, tmp_path, **kwargs):
+    kwargs = dict({"workers": 1, "poll_interval": 0.01, "settle_seconds": 0}, **kwargs)
+    return FolderWatcher(str(inbox), str(tmp_path / "parsed"), **kwargs)
+
+
+def read_manifest(tmp_path):
+    with open(tmp_path / "parsed" / watcher.MANIFEST_NAME, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_file_is_ready_after_settle_time(inbox, tmp_path, clock):
+    folder_watcher = make_watcher(inbox, tmp_path, settle_seconds=5)
+    pdf = inbox / "a" / "faktur.pdf"
+    pdf.parent.mkdir()
+    pdf.write_bytes(b"%PDF-1")
+    (inbox / "catatan.txt").write_bytes(b"bukan pdf")
+    (inbox / ".faktur.pdf").write_bytes(b"%PDF- sementara")
+
+    assert folder_watcher.ready_files() == []
+    clock.now += 4
+    assert folder_watcher.ready_files() == []
+    clock.now += 1
+    [(path, size, _)] = folder_watcher.ready_files()
+    assert (path, size) == (str(pdf), 6)
+    folder_watcher.manifest.close()
+
+
+def test_growing_file_restarts_settle_time(inbox, tmp_path, clock):
+    folder_watcher = make_watcher(inbox, tmp_path, settle_seconds=5)
+    pdf = inbox / "faktur.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    folder_watcher.ready_files()
+
+    # File masih di-copy: ukuran berubah, hitungan stabil dimulai ulang
+    clock.now += 4
+    with open(pdf, "ab") as f:
+        f.write(b" lanjutan")
+    assert folder_watcher.ready_files() == []
+    clock.now += 4
+    assert folder_watcher.ready_files() == []
+    clock.now += 1
+    assert [size for _, size, _ in folder_watcher.ready_files()] == [15]
+    folder_watcher.manifest.close()
+
+
+def test_deleted_file_is_forgotten(inbox, tmp_path, clock):
+    folder_watcher = make_watcher(inbox, tmp_path, settle_seconds=5)
+    pdf = inbox / "faktur.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    folder_watcher.ready_files()
+
+    pdf.unlink()
+    assert folder_watcher.ready_files() == []
+    assert folder_watcher.settling == {}
+    folder_watcher.manifest.close()
+
+
+def test_once_parses_each_file_once(inbox, tmp_path, sample_pdfs):
+    shutil.copy(sample_pdfs[0], inbox / "faktur-0.pdf")
+    (inbox / "sub").mkdir()
+    shutil.copy(sample_pdfs[1], inbox / "sub" / "faktur-1.pdf")
+
+    folder_watcher = make_watcher(inbox, tmp_path)
+    folder_watcher.run(once=True)
+
+    assert folder_watcher.processed == 2
+    with open(tmp_path / "parsed" / "sub" / "faktur-1.json", encoding="utf-8") as f:
+        result = json.load(f)
+    assert (result["status"], result["source_path"]) == ("success", str(inbox / "sub" / "faktur-1.pdf"))
+
+    # Restart: file yang sama tidak diparse lagi; salinan dengan isi sama hanya dicatat
+    shutil.copy(sample_pdfs[0], inbox / "salinan.pdf")
+    restarted = make_watcher(inbox, tmp_path)
+    restarted.run(once=True)
+
+    assert restarted.processed == 0
+    assert [entry["status"] for entry in read_manifest(tmp_path)] == ["success", "success", "skipped_same_content"]
+
+
+def test_worker_crash_is_retried(inbox, tmp_path, sample_pdfs, monkeypatch):
+    monkeypatch.setattr(watcher, "parse_path", crash_once)
+    shutil.copy(sample_pdfs[0], inbox / "faktur-0.pdf")
+    (inbox / "faktur-0.pdf.flag").write_bytes(b"")
+
+    folder_watcher = make_watcher(inbox, tmp_path)
+    folder_watcher.run(once=True)
+
+    # Dikirim ulang ke executor baru dan berhasil pada percobaan kedua
+    assert folder_watcher.processed == 1
+    assert folder_watcher.retries == {} and folder_watcher.abandoned == set()
+    assert [entry["status"] for entry in read_manifest(tmp_path)] == ["success"]
+
+
+def test_file_crashing_worker_is_abandoned(inbox, tmp_path, sample_pdfs, monkeypatch):
+    monkeypatch.setattr(watcher, "parse_path", crash_on_marker)
+    monkeypatch.setattr(watcher, "MAX_WORKER_RETRIES", 1)
+    shutil.copy(sample_pdfs[0], inbox / "faktur-0.pdf")
+    shutil.copy(sample_pdfs[1], inbox / f"faktur-{CRASH_MARKER}.pdf")
+
+    folder_watcher = make_watcher(inbox, tmp_path, workers=2)
+    folder_watcher.run(once=True)
+
+    # File lain yang ikut gagal saat pool rusak tetap diparse; file crash tidak dicatat di manifest
+    assert [os.path.basename(path) for path, _, _ in folder_watcher.abandoned] == [f"faktur-{CRASH_MARKER}.pdf"]
+    assert [os.path.basename(entry["path"]) for entry in read_manifest(tmp_path)] == ["faktur-0.pdf"]
+
+    # Setelah restart file crash dicoba lagi
+    monkeypatch.setattr(watcher, "parse_path", crash_once)
+    restarted = make_watcher(inbox, tmp_path)
+    restarted.run(once=True)
+    assert restarted.processed == 1
@@ -0,0 +1,93 @@
+"""
+Test process pool parser (worker_pool.py)
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import worker_pool
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    """State pool terpisah dari pool milik TestClient sesi test; pool ditutup setelah test"""
+    monkeypatch.setattr(worker_pool, "_executor", None)
+    monkeypatch.setattr(worker_pool, "_startup", None)
+    monkeypatch.setattr(worker_pool, "_ready", threading.Event())
+    yield
+    if worker_pool._executor is not None:
+        worker_pool._executor.shutdown(wait=True, cancel_futures=True)
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """Tanpa process pool: run_in_pool memakai thread pool bawaan event loop"""
+    ready = threading.Event()
+    ready.set()
+    monkeypatch.setattr(worker_pool, "_executor", None)
+    monkeypatch.setattr(worker_pool, "_ready", ready)
+
+
+def delayed(index, delay):
+    time.sleep(delay)
+    return index
+
+
+def collect_batch(args_list, concurrency):
+    async def collect():
+        return [index async for index, _ in worker_pool.iter_batch_in_pool(delayed, args_list, concurrency)]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_start_pool_starts_every_worker(fresh_pool, monkeypatch, start_method):
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(worker_pool.multiprocessing, "get_context", lambda: get_context(start_method))
+    monkeypatch.setattr(worker_pool, "PARSER_WARMUP_TIMEOUT", 60.0)
+
+    start = time.monotonic()
+    executor = worker_pool.start_pool(2)
+
+    # Semua worker sudah berjalan (spawn hanya menambah proses saat dibutuhkan) tanpa menunggu timeout warm-up
+    assert len(executor._processes) == 2
+    assert time.monotonic() - start < 30
+    assert worker_pool.is_ready()
+    pids = {executor.submit(worker_pool.os.getpid).result() for _ in range(4)}
+    assert pids <= set(executor._processes)
+
+
+def test_run_batch_keeps_input_order(thread_pool):
+    args_list = [(0, 0.3), (1, 0.0), (2, 0.2), (3, 0.1)]
+
+    results = asyncio.run(worker_pool.run_batch_in_pool(delayed, args_list, concurrency=4))
+
+    assert results == [0, 1, 2, 3]
+
+
+def test_iter_batch_yields_as_completed(thread_pool):
+    assert collect_batch([(0, 0.3), (1, 0.0), (2, 0.2), (3, 0.1)], concurrency=4) == [1, 3, 2, 0]
+
+
+def test_iter_batch_limits_concurrency(thread_pool):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def tracked(index, delay):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        try:
+            return delayed(index, delay)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    async def collect():
+        return [index async for index, _ in worker_pool.iter_batch_in_pool(tracked, [(i, 0.05) for i in range(6)], 2)]
+
+    assert sorted(asyncio.run(collect())) == list(range(6))
+    assert running[1] == 2
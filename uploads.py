@@ -0,0 +1,295 @@
+"""
+Upload Handling Module
+Membaca file upload dengan memori terbatas:
+- Body multipart dibaca langsung dari request.stream() (bukan form parser Starlette,
+  yang lebih dulu menyalin setiap file ke SpooledTemporaryFile sendiri)
+- File kecil (<= UPLOAD_SPOOL_THRESHOLD) dibaca ke bytes seperti biasa
+- File besar ditulis langsung ke satu file spool dan diteruskan ke parser sebagai path,
+  sehingga isi PDF tidak pernah disalin utuh ke memori proses API maupun
+  dikirim (pickle) ke proses worker
+- Batas ukuran per file dan per request; request yang terlalu besar ditolak (413)
+  sebelum body selesai dibaca
+
+Konfigurasi via environment variable:
+- UPLOAD_SPOOL_THRESHOLD   : ukuran (byte) di atas mana file di-spool ke disk (default: 1 MB)
+- UPLOAD_SPOOL_DIR         : direktori file spool (default: direktori temp sistem)
+- UPLOAD_MAX_FILE_BYTES    : ukuran maksimal satu file PDF (default: 20 MB)
+- UPLOAD_MAX_REQUEST_BYTES : ukuran maksimal body satu request (default: 50 MB, sama dengan nginx)
+"""
+
+import os
+import tempfile
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "")
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(50 * 1024 * 1024)))
+
+# Ukuran chunk saat membaca upload
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Isi PDF yang diteruskan ke parser: bytes (file kecil) atau path file spool
+PdfSource = Union[bytes, str]
+
+
+class UploadTooLarge(Exception):
+    """Ukuran file atau request melebihi batas"""
+
+
+class InvalidUpload(Exception):
+    """Body request bukan multipart/form-data yang valid"""
+
+
+def source_size(source: PdfSource) -> int:
+    """Ukuran isi PDF dalam byte"""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    return len(source)
+
+
+class UploadPart:
+    """Satu file upload yang sedang diterima: bytes di memori, pindah ke file spool begitu besar"""
+
+    def __init__(self, filename: str, max_bytes: int):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.buffer = bytearray()
+        self.spool: Optional[Any] = None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"File '{self.filename}' melebihi batas {self.max_bytes} byte")
+
+        if self.spool is None and self.size > UPLOAD_SPOOL_THRESHOLD:
+            self.spool = tempfile.NamedTemporaryFile(
+                dir=UPLOAD_SPOOL_DIR or None, prefix="coretax-upload-",
+                suffix=os.path.splitext(self.filename)[1], delete=False
+            )
+            self.spool.write(self.buffer)
+            self.buffer = bytearray()
+
+        if self.spool is not None:
+            self.spool.write(data)
+        else:
+            self.buffer += data
+
+    def finish(self) -> PdfSource:
+        """Tutup upload: bytes jika kecil, atau path file spool"""
+        if self.spool is not None:
+            self.spool.close()
+            return self.spool.name
+        return bytes(self.buffer)
+
+    def discard(self) -> None:
+        if self.spool is not None:
+            self.spool.close()
+            discard_uploads([(self.filename, self.spool.name)])
+
+
+async def read_multipart_uploads(
+    content_type: Optional[str],
+    stream: AsyncIterator[bytes],
+    field_name: str,
+    max_file_bytes: int = UPLOAD_MAX_FILE_BYTES,
+    max_request_bytes: int = UPLOAD_MAX_REQUEST_BYTES,
+    check_filename: Optional[Callable[[str], None]] = None
+) -> List[tuple]:
+    """
+    Parse body multipart/form-data per chunk dan kembalikan list (filename, source) untuk
+    setiap file di field field_name (urut upload; field lain diabaikan). Isi file langsung
+    ditulis ke memori atau ke satu file spool (tanpa salinan perantara), sehingga file yang
+    melebihi max_file_bytes ditolak (UploadTooLarge) sebelum sisa body dibaca.
+    check_filename dipanggil untuk setiap nama file sebelum isinya dibaca.
+    """
+    mime_type, options = parse_options_header(content_type or "")
+    boundary = options.get(b"boundary")
+    if mime_type != b"multipart/form-data" or not boundary:
+        raise InvalidUpload("Body request harus multipart/form-data")
+
+    files_data: List[tuple] = []
+    headers: Dict[bytes, bytes] = {}
+    header_field = bytearray()
+    header_value = bytearray()
+    current: Optional[UploadPart] = None
+    total = 0
+
+    def on_part_begin() -> None:
+        headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        nonlocal current
+        _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+        if disposition.get(b"name", b"").decode("utf-8", "replace") != field_name or b"filename" not in disposition:
+            return
+        filename = disposition[b"filename"].decode("utf-8", "replace")
+        if check_filename is not None:
+            check_filename(filename)
+        current = UploadPart(filename, max_file_bytes)
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        nonlocal total
+        if current is None:
+            return
+        total += end - start
+        if total > max_request_bytes:
+            raise UploadTooLarge(f"Total ukuran file melebihi batas {max_request_bytes} byte")
+        current.write(data[start:end])
+
+    def on_part_end() -> None:
+        nonlocal current
+        if current is not None:
+            files_data.append((current.filename, current.finish()))
+            current = None
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    try:
+        async for chunk in stream:
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise InvalidUpload(f"Body multipart tidak valid: {e}")
+        if current is not None:
+            raise InvalidUpload("Body multipart terpotong")
+    except BaseException:
+        if current is not None:
+            current.discard()
+        discard_uploads(files_data)
+        raise
+
+    return files_data
+
+
+async def read_request_uploads(
+    request: Request,
+    field_name: str,
+    max_file_bytes: int = UPLOAD_MAX_FILE_BYTES,
+    max_request_bytes: int = UPLOAD_MAX_REQUEST_BYTES,
+    check_filename: Optional[Callable[[str], None]] = None
+) -> List[tuple]:
+    """read_multipart_uploads atas body request (dibaca langsung dari request.stream())"""
+    return await read_multipart_uploads(
+        request.headers.get("content-type"), request.stream(), field_name,
+        max_file_bytes, max_request_bytes, check_filename
+    )
+
+
+def upload_request_body(field_name: str, multiple: bool = False) -> Dict[str, Any]:
+    """
+    openapi_extra untuk endpoint yang membaca upload sendiri lewat read_request_uploads
+    (form multipart tetap terdokumentasi di /docs)
+    """
+    file_schema: Dict[str, Any] = {"type": "string", "format": "binary"}
+    if multiple:
+        file_schema = {"type": "array", "items": file_schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "required": [field_name], "properties": {field_name: file_schema}}
+                }
+            }
+        }
+    }
+
+
+def discard_uploads(files_data: Optional[List[tuple]]) -> None:
+    """Hapus file spool milik list (filename, source) setelah selesai diparse"""
+    for _, source in files_data or []:
+        if isinstance(source, str):
+            try:
+                os.unlink(source)
+            except OSError:
+                pass
+
+
+class RequestTooLarge(Exception):
+    """Body request melebihi batas RequestSizeLimitMiddleware (dijawab 413 oleh middleware)"""
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware: tolak request dengan body lebih besar dari max_bytes (413).
+    Content-Length dicek sebelum body dibaca; body chunked dihitung saat diterima,
+    dan begitu melebihi batas receive() menghentikan app lalu middleware sendiri
+    yang mengirim response 413.
+    """
+
+    def __init__(self, app: Any, max_bytes: int = UPLOAD_MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def too_large_detail(self) -> str:
+        return f"Ukuran request melebihi batas {self.max_bytes} byte"
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": self.too_large_detail()})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Dict[str, Any]:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise RequestTooLarge(self.too_large_detail())
+            return message
+
+        async def guarded_send(message: Dict[str, Any]) -> None:
+            nonlocal response_started
+            # Response dari app (mis. 500 hasil exception handler) dibuang; 413 dikirim di bawah
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded or response_started:
+                raise
+
+        if exceeded and not response_started:
+            response = JSONResponse(status_code=413, content={"detail": self.too_large_detail()})
+            await response(scope, receive, send)
@@ -0,0 +1,362 @@
+"""
+Watch Folder Daemon
+Memantau folder inbox (misalnya shared folder tempat tim akuntansi menaruh export Coretax)
+dan mem-parse setiap PDF baru secara otomatis, tanpa upload manual lewat web_client.html.
+
+- Polling dengan os.scandir (tanpa dependency inotify; cukup murah untuk ribuan file)
+- Debounce: file baru diparse setelah ukuran & mtime tidak berubah selama WATCH_SETTLE_SECONDS,
+  sehingga file yang masih ditulis/di-copy tidak ikut diparse
+- Parse di ProcessPoolExecutor; hasil ditulis ke <output>/<path relatif>.json (atomic replace)
+  dan ke invoice store (GET /invoices) jika INVOICE_STORE_PATH aktif
+- Manifest JSONL (path, ukuran, mtime, SHA-256 isi) memastikan setiap file diparse tepat
+  sekali walaupun daemon di-restart. File dengan isi yang sama (di-rename / di-copy ulang)
+  tidak diparse lagi; file yang isinya berubah diparse ulang.
+- Hanya hasil parser (success / error dari parser) yang dicatat di manifest. Jika proses worker
+  crash (BrokenProcessPool), executor dibuat ulang dan file yang sedang diproses dikirim ulang
+  satu per satu; file yang tetap membuat worker crash setelah MAX_WORKER_RETRIES dilewati
+  sampai daemon di-restart.
+
+Konfigurasi via environment variable:
+- WATCH_POLL_INTERVAL  : jeda (detik) antar scan folder (default: 2)
+- WATCH_SETTLE_SECONDS : lama (detik) file harus stabil sebelum diparse (default: 5)
+- WATCH_WORKERS        : jumlah proses parser (default: PARSER_BATCH_MAX_WORKERS)
+
+Pemakaian:
+    python watcher.py /srv/coretax/inbox --output /srv/coretax/parsed
+    python watcher.py inbox/ --output parsed/ --once      # proses yang ada lalu keluar
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import parser as pdf_parser
+from invoice_store import invoice_store
+
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "2"))
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "5"))
+WATCH_WORKERS = int(os.getenv("WATCH_WORKERS", str(pdf_parser.BATCH_MAX_WORKERS)))
+
+# Ukuran chunk saat menghitung hash isi file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Berapa kali satu file dikirim ulang setelah worker crash sebelum dilewati (sampai restart)
+MAX_WORKER_RETRIES = 3
+
+# Nama manifest default di dalam direktori output
+MANIFEST_NAME = "manifest.jsonl"
+
+# Identitas file di filesystem: (path absolut, ukuran, mtime ns)
+FileStat = Tuple[str, int, int]
+
+
+def log(message: str) -> None:
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 isi file, dibaca per chunk"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_pdfs(inbox: str) -> Iterator[FileStat]:
+    """Semua PDF di inbox (rekursif); file tersembunyi / sementara dilewati"""
+    stack = [inbox]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    yield os.path.abspath(entry.path), stat.st_size, stat.st_mtime_ns
+            except OSError:
+                # File dihapus/di-rename di tengah scan
+                continue
+
+
+class Manifest:
+    """
+    Manifest JSONL append-only. Satu baris per file yang selesai diproses:
+    {"path", "size", "mtime_ns", "sha256", "status", "output"}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stats: Set[FileStat] = set()
+        self.hashes: Set[str] = set()
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.stats.add((entry["path"], entry["size"], entry["mtime_ns"]))
+                        self.hashes.add(entry["sha256"])
+                    except (ValueError, KeyError):
+                        # Baris terakhir terpotong saat daemon berhenti mendadak
+                        continue
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, stat: FileStat, sha256: str, status: str, output: Optional[str] = None) -> None:
+        path, size, mtime_ns = stat
+        self._file.write(json.dumps({
+            "path": path, "size": size, "mtime_ns": mtime_ns, "sha256": sha256,
+            "status": status, "output": output, "processed_at": time.time()
+        }) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.stats.add(stat)
+        self.hashes.add(sha256)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def write_json_atomic(path: str, content: Dict[str, Any]) -> None:
+    """Tulis JSON lewat file sementara + os.replace agar pembaca tidak melihat file setengah jadi"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def parse_path(path: str) -> Dict[str, Any]:
+    """Parse satu file di proses worker; parser membaca PDF langsung dari path"""
+    return pdf_parser.parse_pdf_file(path, os.path.basename(path))
+
+
+class FolderWatcher:
+    """Loop scan -> debounce -> parse -> tulis hasil -> catat manifest"""
+
+    def __init__(
+        self,
+        inbox: str,
+        output_dir: str,
+        manifest_path: Optional[str] = None,
+        workers: int = WATCH_WORKERS,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        settle_seconds: float = WATCH_SETTLE_SECONDS
+    ):
+        self.inbox = os.path.abspath(inbox)
+        self.output_dir = os.path.abspath(output_dir)
+        self.manifest = Manifest(manifest_path or os.path.join(self.output_dir, MANIFEST_NAME))
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.stopping = False
+        # File yang belum stabil: path -> (ukuran, mtime ns, waktu pertama terlihat dengan state ini)
+        self.settling: Dict[str, Tuple[int, int, float]] = {}
+        # File yang sedang diparse: future -> (stat, sha256)
+        self.pending: Dict[Future, Tuple[FileStat, str]] = {}
+        # File yang ikut gagal saat worker crash (belum dikirim ulang), jumlah crash saat
+        # diproses sendirian per path, dan file yang dilewati setelah MAX_WORKER_RETRIES
+        self.crashed: List[Tuple[FileStat, str]] = []
+        self.retries: Dict[str, int] = {}
+        self.abandoned: Set[FileStat] = set()
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.processed = 0
+
+    def output_path(self, path: str) -> str:
+        relative = os.path.relpath(path, self.inbox)
+        return os.path.join(self.output_dir, os.path.splitext(relative)[0] + ".json")
+
+    def ready_files(self) -> List[FileStat]:
+        """Scan inbox dan kembalikan file baru yang sudah stabil selama settle_seconds"""
+        now = time.monotonic()
+        in_progress = {stat for stat, _ in self.pending.values()}
+        seen = set()
+        ready = []
+
+        for stat in scan_pdfs(self.inbox):
+            path, size, mtime_ns = stat
+            if stat in self.manifest.stats or stat in in_progress or stat in self.abandoned:
+                continue
+            seen.add(path)
+
+            state = self.settling.get(path)
+            if state is None or state[:2] != (size, mtime_ns):
+                self.settling[path] = (size, mtime_ns, now)
+            elif now - state[2] >= self.settle_seconds:
+                ready.append(stat)
+
+        # Lupakan file yang sudah hilang dari inbox
+        for path in list(self.settling):
+            if path not in seen:
+                del self.settling[path]
+        return ready
+
+    def submit(self, stat: FileStat, sha256: str) -> None:
+        """Kirim file ke worker; pool yang rusak dibuat ulang dulu"""
+        try:
+            future = self.executor.submit(parse_path, stat[0])
+        except BrokenProcessPool:
+            self.restart_executor()
+            future = self.executor.submit(parse_path, stat[0])
+        self.pending[future] = (stat, sha256)
+
+    def restart_executor(self) -> None:
+        """Ganti executor yang rusak setelah worker crash"""
+        log("process pool rusak, membuat ulang worker")
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def dispatch(self, stat: FileStat) -> None:
+        """Hash file; isi yang sudah pernah diparse hanya dicatat, sisanya dikirim ke worker"""
+        path = stat[0]
+        try:
+            sha256 = file_sha256(path)
+        except OSError:
+            # Dihapus sebelum sempat dibaca; akan muncul lagi di scan berikutnya jika masih ada
+            self.settling.pop(path, None)
+            return
+
+        del self.settling[path]
+        if sha256 in self.manifest.hashes or any(sha256 == digest for _, digest in self.pending.values()):
+            self.manifest.record(stat, sha256, "skipped_same_content")
+            log(f"lewati (isi sama sudah diparse): {path}")
+            return
+
+        self.submit(stat, sha256)
+
+    def complete(self, future: Future, alone: bool) -> None:
+        """
+        Tulis hasil satu file. alone: file diproses sendirian, sehingga kegagalannya
+        dihitung terhadap MAX_WORKER_RETRIES (bukan ikut gagal karena file lain)
+        """
+        stat, sha256 = self.pending.pop(future)
+        path = stat[0]
+        try:
+            result = future.result()
+        except Exception as e:
+            # Bukan hasil parser (parse_pdf_file sendiri mengembalikan hasil error): jangan dicatat
+            # di manifest agar file dikirim ulang setelah executor dibuat ulang
+            log(f"worker gagal ({type(e).__name__}): {path}")
+            if alone:
+                self.retries[path] = self.retries.get(path, 0) + 1
+            if self.retries.get(path, 0) > MAX_WORKER_RETRIES:
+                self.abandoned.add(stat)
+                log(f"dilewati setelah {MAX_WORKER_RETRIES} kali worker crash: {path}")
+            else:
+                self.crashed.append((stat, sha256))
+            return
+        self.retries.pop(path, None)
+
+        output = self.output_path(path)
+        write_json_atomic(output, dict(result, source_path=path, sha256=sha256))
+        if invoice_store is not None:
+            invoice_store.put(result)
+        # Manifest dicatat setelah hasil tertulis: restart di antaranya hanya menulis ulang file yang sama
+        self.manifest.record(stat, sha256, result["status"], output)
+        self.processed += 1
+        log(f"{result['status']}: {path} -> {output}")
+
+    def run(self, once: bool = False) -> None:
+        """
+        Jalankan loop sampai stop() dipanggil (SIGINT/SIGTERM).
+        once=True: berhenti begitu inbox tidak lagi berisi file baru atau file yang sedang diproses.
+        """
+        log(f"memantau {self.inbox} -> {self.output_dir} ({self.workers} worker)")
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while not self.stopping:
+                if self.crashed:
+                    # Pool rusak menggagalkan semua file yang sedang diproses: kirim ulang satu per satu
+                    # agar hanya file penyebab crash yang dihitung terhadap MAX_WORKER_RETRIES
+                    if not self.pending:
+                        self.submit(*self.crashed.pop(0))
+                else:
+                    for stat in self.ready_files():
+                        # Batasi file yang sedang diproses; sisanya diambil di putaran berikutnya
+                        if len(self.pending) >= self.workers * 2:
+                            break
+                        self.dispatch(stat)
+
+                if once and not self.pending and not self.settling and not self.crashed:
+                    break
+
+                if self.pending:
+                    completed, _ = wait(self.pending, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    alone = len(self.pending) == 1
+                    for future in completed:
+                        self.complete(future, alone)
+
+                    if any(isinstance(future.exception(), BrokenProcessPool) for future in completed):
+                        # Kumpulkan semua file yang ikut gagal, lalu ganti executor yang rusak
+                        for future in wait(self.pending)[0]:
+                            self.complete(future, False)
+                        self.restart_executor()
+                else:
+                    time.sleep(self.poll_interval)
+
+            # Selesaikan file yang sudah terlanjur dikirim ke worker sebelum keluar
+            # (file yang gagal karena worker crash diparse lagi saat daemon start berikutnya)
+            wait(self.pending)
+            for future in list(self.pending):
+                self.complete(future, False)
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+        self.manifest.close()
+        log(f"berhenti, {self.processed} file diproses")
+
+    def stop(self, *_: Any) -> None:
+        self.stopping = True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Daemon watch folder untuk PDF Faktur Pajak Coretax")
+    arg_parser.add_argument("inbox", help="Folder yang dipantau (rekursif)")
+    arg_parser.add_argument("--output", required=True, help="Direktori hasil JSON")
+    arg_parser.add_argument("--manifest", help=f"File manifest (default: <output>/{MANIFEST_NAME})")
+    arg_parser.add_argument("--workers", type=int, default=WATCH_WORKERS, help="Jumlah proses parser")
+    arg_parser.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL, help="Jeda antar scan (detik)")
+    arg_parser.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                            help="Lama file harus stabil sebelum diparse (detik)")
+    arg_parser.add_argument("--once", action="store_true", help="Proses file yang ada lalu keluar")
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.isdir(args.inbox):
+        print(f"Folder tidak ditemukan: {args.inbox}", file=sys.stderr)
+        return 1
+
+    watcher = FolderWatcher(
+        args.inbox, args.output, args.manifest,
+        workers=args.workers, poll_interval=args.interval, settle_seconds=args.settle
+    )
+    signal.signal(signal.SIGINT, watcher.stop)
+    signal.signal(signal.SIGTERM, watcher.stop)
+    watcher.run(once=args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
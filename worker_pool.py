@@ -0,0 +1,199 @@
+"""
+Worker Pool Module
+Menjalankan parsing PDF (CPU-bound) di ProcessPoolExecutor agar event loop
+FastAPI tetap responsif (termasuk /health) selama PDF sedang diparse.
+
+Saat startup, pool dibuat di background thread: setiap proses worker menjalankan
+warm-up parse atas sample Coretax bawaan (warmup_sample.pdf) dan /health baru
+melaporkan siap setelah semua worker selesai warm-up. Request parse yang datang
+lebih awal menunggu warm-up selesai.
+
+Konfigurasi via environment variable:
+- PARSER_WORKERS           : jumlah proses worker (default: jumlah CPU, 0 = thread pool bawaan)
+- PARSER_WARMUP_PDF        : path PDF untuk warm-up parse (default: warmup_sample.pdf)
+- PARSER_WARMUP_TIMEOUT    : batas waktu (detik) menunggu warm-up semua worker (default: 120)
+- PARSER_BATCH_CONCURRENCY : maksimal file dari satu batch yang diproses bersamaan
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", str(os.cpu_count() or 1)))
+PARSER_WARMUP_PDF = os.getenv("PARSER_WARMUP_PDF", "")
+PARSER_WARMUP_TIMEOUT = float(os.getenv("PARSER_WARMUP_TIMEOUT", "120"))
+PARSER_BATCH_CONCURRENCY = int(os.getenv("PARSER_BATCH_CONCURRENCY", str(max(1, PARSER_WORKERS))))
+
+# Sample faktur Coretax satu halaman yang ikut didistribusikan bersama aplikasi
+WARMUP_SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warmup_sample.pdf")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_startup: Optional["asyncio.Future[Any]"] = None
+_ready = threading.Event()
+
+# Barrier startup milik proses worker (diwariskan lewat initializer)
+_worker_barrier: Any = None
+
+
+def _find_warmup_pdf() -> Optional[str]:
+    """PDF untuk warm-up: dari env, atau sample bawaan"""
+    for path in (PARSER_WARMUP_PDF, WARMUP_SAMPLE_PDF):
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+def warm_up() -> Optional[float]:
+    """
+    Import modul berat (pdfplumber/pdfminer) dan jalankan satu parse di proses ini agar
+    cache internal sudah terisi sebelum request pertama. Kembalikan durasi (detik),
+    None jika tidak ada PDF warm-up atau parse gagal.
+    """
+    import pdfplumber  # noqa: F401
+    import parser as pdf_parser
+
+    warmup_pdf = _find_warmup_pdf()
+    if not warmup_pdf:
+        return None
+
+    start = time.perf_counter()
+    try:
+        with open(warmup_pdf, "rb") as f:
+            pdf_parser.parse_pdf_file(f.read(), os.path.basename(warmup_pdf))
+    except Exception:
+        # Warm-up tidak boleh menggagalkan start worker
+        return None
+    return time.perf_counter() - start
+
+
+def _warm_up_worker(barrier: Any) -> None:
+    """Initializer tiap proses worker: simpan barrier startup lalu warm-up"""
+    global _worker_barrier
+    _worker_barrier = barrier
+    warm_up()
+
+
+def _wait_for_all_workers(timeout: float) -> int:
+    """
+    Task startup: tahan worker ini sampai semua worker selesai warm-up. Karena setiap
+    task memblokir satu worker, pool harus menjalankan semua worker sekaligus (juga
+    pada start method spawn/forkserver yang menambah proses hanya saat dibutuhkan).
+    """
+    _worker_barrier.wait(timeout)
+    return os.getpid()
+
+
+def start_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """
+    Buat process pool dan tunggu sampai semua worker selesai warm-up (dipanggil saat startup).
+    Dengan workers = 0 parsing berjalan di thread pool, jadi warm-up dilakukan di proses ini.
+    """
+    global _executor
+    if _executor is not None:
+        return _executor
+
+    workers = PARSER_WORKERS if workers is None else workers
+    if workers <= 0:
+        warm_up()
+        _ready.set()
+        return None
+
+    context = multiprocessing.get_context()
+    barrier = context.Barrier(workers)
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_warm_up_worker, initargs=(barrier,)
+    )
+    # Paksa semua worker langsung start & warm-up, bukan saat request pertama: satu task
+    # startup per worker, masing-masing menunggu di barrier sampai semua worker siap
+    startup_tasks = [executor.submit(_wait_for_all_workers, PARSER_WARMUP_TIMEOUT) for _ in range(workers)]
+    # Worker yang lambat (barrier timeout) tetap bisa dipakai; pool dianggap siap agar service tidak tertahan
+    wait(startup_tasks, timeout=PARSER_WARMUP_TIMEOUT)
+
+    _executor = executor
+    _ready.set()
+    return _executor
+
+
+def start_pool_background(workers: Optional[int] = None) -> "asyncio.Future[Any]":
+    """Jalankan start_pool di thread agar event loop (termasuk /health) tetap melayani selama warm-up"""
+    global _startup
+    if _startup is None:
+        _startup = asyncio.get_running_loop().run_in_executor(None, start_pool, workers)
+    return _startup
+
+
+def is_ready() -> bool:
+    """True jika pool sudah dibuat dan warm-up selesai"""
+    return _ready.is_set()
+
+
+async def wait_ready() -> None:
+    """Tunggu warm-up yang sedang berjalan di background (langsung kembali jika sudah siap)"""
+    if _startup is not None and not _ready.is_set():
+        await asyncio.shield(_startup)
+
+
+def shutdown_pool() -> None:
+    """Tutup process pool (dipanggil saat shutdown aplikasi)"""
+    global _executor, _startup
+    _ready.clear()
+    _startup = None
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Ambil process pool aktif (None jika memakai thread pool bawaan)"""
+    return _executor
+
+
+async def run_in_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """Jalankan fungsi sinkron di process pool tanpa memblokir event loop"""
+    await wait_ready()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def iter_batch_in_pool(
+    func: Callable[..., Any],
+    args_list: List[tuple],
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Jalankan func untuk setiap tuple argumen di process pool secara paralel dan
+    yield (index, hasil) segera setelah masing-masing task selesai.
+    Maksimal `concurrency` task dari batch ini berjalan bersamaan sehingga satu
+    batch besar tidak memonopoli pool.
+    """
+    concurrency = PARSER_BATCH_CONCURRENCY if concurrency is None else concurrency
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(index: int, args: tuple) -> Tuple[int, Any]:
+        async with semaphore:
+            return index, await run_in_pool(func, *args)
+
+    tasks = [asyncio.ensure_future(run_one(index, args)) for index, args in enumerate(args_list)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client putus / generator ditutup lebih awal: batalkan task yang belum jalan
+        for task in tasks:
+            task.cancel()
+
+
+async def run_batch_in_pool(
+    func: Callable[..., Any],
+    args_list: List[tuple],
+    concurrency: Optional[int] = None
+) -> List[Any]:
+    """Seperti iter_batch_in_pool, tetapi mengembalikan list hasil sesuai urutan input"""
+    results: List[Any] = [None] * len(args_list)
+    async for index, result in iter_batch_in_pool(func, args_list, concurrency):
+        results[index] = result
+    return results